@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark Suite v2
+Times and measures peak memory of the hot pipeline stages on synthetic dictionaries, with baseline comparison
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for subdir in ('scraping', 'processing', 'validation', 'runtime'):
+    sys.path.insert(0, os.path.join(SCRIPTS_DIR, subdir))
+
+from v2_instrumentation import peak_rss_mb, reset_peak_rss, rss_mb
+from v2_synthetic_data import (noisy_raw_entities, seed_vocabulary_digest, synthetic_entities,
+                               synthetic_mapping_rules, synthetic_mappings)
+from v2_tagger_benchmark import build_corpus
+
+RESULTS_PATH = 'data/benchmarks/v2_benchmark_results.json'
+BASELINE_PATH = 'data/benchmarks/v2_benchmark_baseline.json'
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+# Stages whose cost is quadratic in the dictionary size are only run up to these sizes by default
+DEFAULT_MAX_SIZE = {
+    'generate_mappings': 10000,   # every RE entity is compared with every GL entity (~1.5 s at 1k)
+    'run_validation': 1000        # one cosine_similarity call per same-category pair (~40 s at 1k)
+}
+
+def setup_clean_and_deduplicate(size: int, seed: int):
+    from v2_renewable_energy_scraper import RenewableEnergyScraperV2
+    re_entities, gl_entities = synthetic_entities(size, seed)
+    raw = noisy_raw_entities({**re_entities, **gl_entities}, seed=seed)
+    scraper = RenewableEnergyScraperV2()
+    return lambda: scraper.clean_and_deduplicate(raw), sum(len(items) for items in raw.values())
+
+def setup_generate_mappings(size: int, seed: int):
+    from v2_cross_domain_mapper import CrossDomainMapperV2
+    re_entities, gl_entities = synthetic_entities(size, seed)
+    mapper = CrossDomainMapperV2()
+    mapper.mapping_rules = synthetic_mapping_rules(re_entities, gl_entities, seed=seed)
+    return lambda: mapper.generate_mappings(re_entities, gl_entities), size
+
+def setup_run_validation(size: int, seed: int):
+    from v2_ai_semantic_validator import SemanticValidatorV2
+    from v2_embedding_index import HashingEncoderV2
+    re_entities, gl_entities = synthetic_entities(size, seed)
+    validator = SemanticValidatorV2(model=HashingEncoderV2())
+    return lambda: validator.run_validation({**re_entities, **gl_entities}), size
+
+def setup_generate_dictionaries(size: int, seed: int):
+    from v2_generate_final_dictionaries import DictionaryGeneratorV2
+    re_entities, gl_entities = synthetic_entities(size, seed)
+    mappings = synthetic_mappings(re_entities, gl_entities, size // 2, seed)
+
+    def run():
+        generator = DictionaryGeneratorV2()
+        generator.load_data(re_entities, gl_entities, mappings, {})
+        for data in generator.build_dictionaries().values():
+            if not isinstance(data, bytes):
+                json.dumps(data, indent=2)
+    return run, size
+
+def setup_tagging(size: int, seed: int, corpus_mb: float = 2.0):
+    from v2_gazetteer_tagger import GazetteerTaggerV2
+    re_entities, gl_entities = synthetic_entities(size, seed)
+    entries = [(entity, category, domain)
+               for domain, entities in (('renewable_energy', re_entities), ('green_logistics', gl_entities))
+               for category, entity_list in entities.items() for entity in entity_list]
+
+    # Corpus entities are sampled across all categories; a small tagger is enough to draw them
+    sample = entries[::max(1, len(entries) // 50000)]
+    corpus = build_corpus(GazetteerTaggerV2.from_entities(sample), int(corpus_mb * 1024 * 1024), seed=seed)
+
+    def run():
+        # Automaton compilation is part of the cost of shipping a new dictionary build
+        tagger = GazetteerTaggerV2.from_entities(entries)
+        tagger.tag(corpus)
+    return run, len(corpus.encode('utf-8'))
+
+STAGES: Dict[str, Callable] = {
+    'clean_and_deduplicate': setup_clean_and_deduplicate,
+    'generate_mappings': setup_generate_mappings,
+    'run_validation': setup_run_validation,
+    'generate_dictionaries': setup_generate_dictionaries,
+    'tagging': setup_tagging
+}
+
+def measure(stage: str, size: int, seed: int, repeat: int) -> Dict:
+    """Set up one stage in a fresh process and record its best-of-N time and peak memory"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        run, items = STAGES[stage](size, seed)
+        best_seconds = float('inf')
+        best_cpu = float('inf')
+        baseline_rss = rss_mb()
+        reset_peak_rss()
+        for _ in range(repeat):
+            start_cpu = time.process_time()
+            start = time.perf_counter()
+            run()
+            best_seconds = min(best_seconds, time.perf_counter() - start)
+            best_cpu = min(best_cpu, time.process_time() - start_cpu)
+        peak_rss = peak_rss_mb()
+
+    return {
+        'stage': stage,
+        'size': size,
+        'seconds': best_seconds,
+        'cpu_seconds': best_cpu,
+        'items': items,
+        'items_per_second': items / best_seconds if best_seconds > 0 else None,
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': peak_rss,
+        'stage_peak_mb': max(0.0, peak_rss - baseline_rss)
+    }
+
+def run_suite(stages: List[str], sizes: List[int], max_size: Dict[str, int], seed: int = 42,
+              repeat: int = 1) -> List[Dict]:
+    """Each measurement runs in its own forked process so memory peaks do not leak between runs"""
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    results = []
+    for stage in stages:
+        for size in sizes:
+            if size > max_size.get(stage, size):
+                print(f"{stage:<22} {size:>9,}  skipped (above --max-size {max_size[stage]:,})")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(measure, stage, size, seed, repeat).result()
+            results.append(result)
+            print(f"{stage:<22} {size:>9,}  {result['seconds']:8.2f} s  "
+                  f"{result['stage_peak_mb']:8.1f} MB peak  {result['items_per_second'] or 0:12,.0f} items/s")
+    return results
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[Dict]:
+    """Per (stage, size) time and memory ratios against the baseline; ratios above 1 + tolerance regress"""
+    previous = {(entry['stage'], entry['size']): entry for entry in baseline}
+    comparison = []
+    for entry in results:
+        reference = previous.get((entry['stage'], entry['size']))
+        if reference is None:
+            continue
+        for metric in ('seconds', 'stage_peak_mb'):
+            # Floors keep timer jitter and page-level memory accounting on tiny runs from reading as regressions
+            floor = 5.0 if metric == 'stage_peak_mb' else 0.05
+            ratio = max(entry[metric], floor) / max(reference[metric], floor)
+            comparison.append({
+                'stage': entry['stage'],
+                'size': entry['size'],
+                'metric': metric,
+                'baseline': reference[metric],
+                'current': entry[metric],
+                'ratio': ratio,
+                'regression': ratio > 1.0 + tolerance
+            })
+    return comparison
+
+def parse_max_size(values: List[str]) -> Dict[str, int]:
+    max_size = dict(DEFAULT_MAX_SIZE)
+    for value in values:
+        stage, _, limit = value.partition('=')
+        if stage not in STAGES or not limit:
+            raise ValueError(f"Expected STAGE=SIZE with a known stage, got {value!r}")
+        max_size[stage] = int(limit)
+    return max_size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hot pipeline stages on synthetic dictionaries")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--max-size', action='append', default=[], metavar='STAGE=SIZE',
+                        help='Override the size cap of a quadratic stage')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown/growth before failing')
+    args = parser.parse_args()
+
+    results = run_suite(args.stages, args.sizes, parse_max_size(args.max_size), args.seed, args.repeat)
+    report = {
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'seed_vocabulary_sha256': seed_vocabulary_digest(),
+        'results': results
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        # Different synthetic inputs would make the ratios meaningless
+        inputs = ('seed', 'seed_vocabulary_sha256')
+        if any(baseline.get(key) != report[key] for key in inputs):
+            sys.exit(f"Baseline {args.baseline} was measured on other synthetic inputs "
+                     f"({', '.join(f'{key} {baseline.get(key)}' for key in inputs)}); "
+                     f"rerun with --save-baseline to replace it")
+        report['comparison'] = compare(results, baseline['results'], args.tolerance)
+        regressions = [entry for entry in report['comparison'] if entry['regression']]
+        for entry in report['comparison']:
+            flag = 'REGRESSION' if entry['regression'] else 'ok'
+            print(f"{entry['stage']:<22} {entry['size']:>9,}  {entry['metric']:<14} x{entry['ratio']:.2f}  {flag}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%} tolerance")
+        sys.exit(1)
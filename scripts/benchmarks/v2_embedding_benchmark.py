@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Embedding Index Benchmark v2
+Per-query latency and IVF recall of EntityEmbeddingIndexV2 on a synthetic million-entity matrix
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'runtime'))
+
+from v2_embedding_index import CATEGORY_REFERENCES, EntityEmbeddingIndexV2, normalize_rows, write_embedding_index
+
+def synthetic_vectors(path: str, count: int, dim: int, topics: int, seed: int = 42,
+                      block_size: int = 65536) -> np.ndarray:
+    """Topic-clustered unit vectors written block by block to a memory map"""
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.standard_normal((topics, dim)))
+    vectors = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(count, dim))
+    for start in range(0, count, block_size):
+        size = min(block_size, count - start)
+        noise = rng.standard_normal((size, dim)).astype(np.float32) * 0.03
+        vectors[start:start + size] = normalize_rows(centers[rng.integers(0, topics, size)] + noise)
+    vectors.flush()
+    return vectors
+
+def run_benchmark(count: int, dim: int, queries: int, top_k: int, nprobe: int, topics: int) -> dict:
+    rng = np.random.default_rng(7)
+    categories = list(CATEGORY_REFERENCES)
+    entries = [(f'Synthetic Entity {i}', categories[i % len(categories)],
+                'renewable_energy' if i % 2 else 'green_logistics') for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        vectors = synthetic_vectors(os.path.join(tmp, 'source.npy'), count, dim, topics)
+        category_vectors = normalize_rows(rng.standard_normal((len(categories), dim)))
+        stats = write_embedding_index(os.path.join(tmp, 'index'), vectors, entries, categories,
+                                      category_vectors, 'synthetic')
+        build_seconds = time.perf_counter() - start
+
+        index = EntityEmbeddingIndexV2(os.path.join(tmp, 'index'))
+        # Queries are perturbed copies of indexed rows, like questions phrased close to an entity
+        rows = rng.integers(0, count, queries)
+        query_vectors = normalize_rows(np.asarray(vectors[np.sort(rows)]) +
+                                       rng.standard_normal((queries, dim)).astype(np.float32) * 0.03)
+
+        timings = {}
+        results = {}
+        modes = [('approximate', True)] if stats['nlist'] else []
+        modes.append(('exact', False))
+        for mode, approximate in modes:
+            latencies = []
+            results[mode] = []
+            for query in query_vectors:
+                start = time.perf_counter()
+                results[mode].extend(index.search_vectors(query, top_k, approximate=approximate, nprobe=nprobe))
+                latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.search_vectors(query_vectors, top_k, approximate=approximate, nprobe=nprobe)
+            batch_seconds = time.perf_counter() - start
+            timings[mode] = {
+                'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                'p99_ms': float(np.percentile(latencies, 99) * 1000),
+                'batched_ms_per_query': batch_seconds / queries * 1000
+            }
+
+        recall = None
+        if 'approximate' in results:
+            overlap = [len({hit.entity for hit in approx} & {hit.entity for hit in exact}) / max(len(exact), 1)
+                       for approx, exact in zip(results['approximate'], results['exact'])]
+            recall = float(np.mean(overlap))
+        del index, vectors
+
+    return {'entities': count, 'nlist': stats['nlist'], 'build_seconds': build_seconds,
+            'timings': timings, 'recall_at_k': recall}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency benchmark for the entity embedding index")
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--topics', type=int, default=20000, help='Synthetic topic clusters')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.size, args.dim, args.queries, args.top_k, args.nprobe, args.topics)
+    print(f"Index: {results['entities']} entities, {results['nlist']} IVF lists, built in {results['build_seconds']:.1f} s")
+    for mode, timing in results['timings'].items():
+        print(f"{mode}: p50 {timing['p50_ms']:.2f} ms, p99 {timing['p99_ms']:.2f} ms, "
+              f"batched {timing['batched_ms_per_query']:.2f} ms/query")
+    if results['recall_at_k'] is not None:
+        print(f"IVF recall@{args.top_k} vs exact: {results['recall_at_k']:.3f}")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dictionary Generator v2
+Deterministic multi-word entity dictionaries, noisy scrape output, rule tables and mappings at any scale
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+from itertools import accumulate
+from typing import Dict, List, Tuple
+
+RE_CATEGORIES = ['TECHNOLOGY_TYPE', 'SERVICE_CATEGORY', 'EQUIPMENT_COMPONENT', 'PERFORMANCE_METRIC',
+                 'REGULATORY_STANDARD']
+GL_CATEGORIES = ['TRANSPORT_MODE', 'CARBON_METRIC', 'SUPPLY_CHAIN_ELEMENT', 'EFFICIENCY_TECHNOLOGY',
+                 'ENVIRONMENTAL_STANDARD']
+RULE_TYPES = ['energy_to_transport', 'services_to_supply', 'equipment_to_efficiency', 'performance_to_carbon',
+              'standards_alignment']
+
+RAW_FILES = ['data/raw/v2_renewable_energy_entities.json', 'data/raw/v2_green_logistics_entities.json']
+# Words of the real dictionaries, frozen with the benchmark so a new build does not change its inputs
+SEED_VOCABULARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'v2_seed_vocabulary.json')
+SYLLABLES = ['ra', 'ne', 'vo', 'li', 'ta', 'mer', 'gen', 'tro', 'sol', 'ar', 'win', 'dra', 'co', 'flex',
+             'ion', 'tek', 'por', 'gri', 'ver', 'sta', 'lo', 'hy', 'mo', 'cel', 'du', 'tra', 'ke', 'zen']
+
+# Share of entities with 1, 2, 3 and 4 words, roughly matching the real dictionaries
+WORD_COUNT_WEIGHTS = [0.15, 0.45, 0.3, 0.1]
+
+def extract_vocabulary(raw_files: List[str] = RAW_FILES) -> Dict[str, List[str]]:
+    """Per-category words of the real scraped dictionaries (empty if they are absent)"""
+    vocabulary = {}
+    for path in raw_files:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            for category, entities in json.load(f).items():
+                words = {word for entity in entities for word in re.findall(r'[A-Za-z]{3,}', entity)}
+                vocabulary[category] = sorted(words)
+    return vocabulary
+
+def seed_vocabulary(path: str = SEED_VOCABULARY_PATH) -> Dict[str, List[str]]:
+    """The frozen per-category seed words shipped with the benchmark"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def seed_vocabulary_digest(path: str = SEED_VOCABULARY_PATH) -> str:
+    """SHA-256 of the seed vocabulary file; results are only comparable under the same digest"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def pseudo_word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+def category_vocabulary(category: str, size: int, seeds: Dict[str, List[str]], rng: random.Random) -> List[str]:
+    """Real category words first, padded with pronounceable pseudo-words"""
+    words = list(dict.fromkeys(seeds.get(category, [])))[:size]
+    seen = set(words)
+    while len(words) < size:
+        word = pseudo_word(rng)
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+def synthetic_entities(total: int, seed: int = 42) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """Unique multi-word entities split evenly over the ten categories, as (RE, GL) dictionaries"""
+    rng = random.Random(seed)
+    seeds = seed_vocabulary()
+    categories = RE_CATEGORIES + GL_CATEGORIES
+    per_category = max(1, total // len(categories))
+    # Vocabulary grows with sqrt(n) so multi-word combinations stay plentiful at any scale
+    vocabulary_size = max(60, int(per_category ** 0.5) * 2)
+    shared = category_vocabulary('SHARED', vocabulary_size, {}, rng)
+    word_counts = list(range(1, len(WORD_COUNT_WEIGHTS) + 1))
+
+    result = {}
+    for category in categories:
+        heads = category_vocabulary(category, vocabulary_size, seeds, rng)
+        # Zipf-like head frequencies: a few words ("Solar", "Carbon") dominate
+        head_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(heads))))
+        modifiers = heads + shared
+        entities = set()
+        while len(entities) < per_category:
+            count = rng.choices(word_counts, WORD_COUNT_WEIGHTS)[0]
+            words = [rng.choices(heads, cum_weights=head_weights)[0]]
+            words.extend(rng.choice(modifiers) for _ in range(count - 1))
+            if len(set(words)) < count:
+                continue
+            rng.shuffle(words)
+            entities.add(' '.join(words))
+        result[category] = sorted(entities)
+
+    return ({c: result[c] for c in RE_CATEGORIES}, {c: result[c] for c in GL_CATEGORIES})
+
+def noisy_raw_entities(entities: Dict[str, List[str]], duplicate_rate: float = 0.5,
+                       seed: int = 42) -> Dict[str, List[str]]:
+    """Scrape-like lists with case/whitespace duplicates and out-of-range junk for clean_and_deduplicate"""
+    rng = random.Random(seed)
+    variants = [str.lower, str.upper, lambda e: f'  {e} ', lambda e: e.replace(' ', '  ')]
+    raw = {}
+    for category, entity_list in entities.items():
+        items = []
+        for entity in entity_list:
+            items.append(entity)
+            if rng.random() < duplicate_rate:
+                items.append(rng.choice(variants)(entity))
+            if rng.random() < 0.02:
+                items.append(rng.choice(['x', 'Y' * 80]))
+        rng.shuffle(items)
+        raw[category] = items
+    return raw
+
+def synthetic_mapping_rules(re_entities: Dict[str, List[str]], gl_entities: Dict[str, List[str]],
+                            rules_per_type: int = 20, targets_per_rule: int = 3,
+                            seed: int = 42) -> Dict[str, Dict[str, List[str]]]:
+    """Rule table in the mapper's format, with single-word patterns drawn from the entities"""
+    rng = random.Random(seed)
+    re_words = sorted({word for entities in re_entities.values() for e in entities for word in e.split()})
+    gl_words = sorted({word for entities in gl_entities.values() for e in entities for word in e.split()})
+    return {
+        rule_type: {
+            pattern: rng.sample(gl_words, min(targets_per_rule, len(gl_words)))
+            for pattern in rng.sample(re_words, min(rules_per_type, len(re_words)))
+        }
+        for rule_type in RULE_TYPES
+    }
+
+def synthetic_mappings(re_entities: Dict[str, List[str]], gl_entities: Dict[str, List[str]], count: int,
+                       seed: int = 42) -> List[Dict]:
+    """Mapping records in the mapper's output format"""
+    rng = random.Random(seed)
+    re_pairs = [(entity, category) for category, entities in re_entities.items() for entity in entities]
+    gl_pairs = [(entity, category) for category, entities in gl_entities.items() for entity in entities]
+    mappings = []
+    for _ in range(count):
+        re_entity, re_category = rng.choice(re_pairs)
+        gl_entity, gl_category = rng.choice(gl_pairs)
+        rule_based = rng.random() < 0.7
+        mappings.append({
+            'renewable_energy_entity': re_entity,
+            'renewable_energy_category': re_category,
+            'green_logistics_entity': gl_entity,
+            'green_logistics_category': gl_category,
+            'relationship_type': rng.choice(RULE_TYPES) if rule_based else 'semantic_similarity',
+            'confidence_score': 0.9 if rule_based else round(rng.uniform(0.5, 1.0), 3),
+            'mapping_source': 'rule_based' if rule_based else 'semantic_analysis'
+        })
+    return mappings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preview synthetic entities or refreeze the seed vocabulary")
+    parser.add_argument('--freeze-vocabulary', action='store_true',
+                        help='Rewrite the seed vocabulary from data/raw (invalidates benchmark baselines)')
+    args = parser.parse_args()
+    if args.freeze_vocabulary:
+        with open(SEED_VOCABULARY_PATH, 'w') as f:
+            json.dump(extract_vocabulary(), f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Seed vocabulary written to {SEED_VOCABULARY_PATH} ({seed_vocabulary_digest()[:12]})")
+
+    re_entities, gl_entities = synthetic_entities(1000)
+    for category, entities in {**re_entities, **gl_entities}.items():
+        print(f"{category}: {len(entities)} entities, e.g. {', '.join(entities[:3])}")
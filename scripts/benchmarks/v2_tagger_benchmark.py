@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Gazetteer Tagger Benchmark v2
+Measures sustained single-core tagging throughput (MB/s) of GazetteerTaggerV2
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'runtime'))
+
+from v2_gazetteer_tagger import GazetteerTaggerV2
+
+FILLER_WORDS = (
+    'the of and to in a is that for on with as by this from at are be an which or it have has '
+    'report annual company operations during year increase reduce target network customers '
+    'regional investment program our their new across total compared previous percent million'
+).split()
+
+def build_corpus(tagger: GazetteerTaggerV2, size_bytes: int, entity_rate: float = 0.03,
+                 seed: int = 42) -> str:
+    """Synthetic report text with dictionary entities mixed into filler prose"""
+    rng = random.Random(seed)
+    entities = [payload[0] for payload in tagger.payloads]
+    words = []
+    size = 0
+    while size < size_bytes:
+        if rng.random() < entity_rate:
+            word = rng.choice(entities)
+            word = word.lower() if rng.random() < 0.5 else word
+        else:
+            word = rng.choice(FILLER_WORDS)
+        if rng.random() < 0.05:
+            word += '.'
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)
+
+def run_benchmark(final_dir: str, size_mb: float, repeat: int, entity_rate: float = 0.03) -> dict:
+    """Time automaton compilation and best-of-N tagging throughput"""
+    start = time.perf_counter()
+    tagger = GazetteerTaggerV2.from_dictionaries(final_dir)
+    build_seconds = time.perf_counter() - start
+
+    corpus = build_corpus(tagger, int(size_mb * 1024 * 1024), entity_rate)
+    corpus_mb = len(corpus.encode('utf-8')) / (1024 * 1024)
+
+    best = float('inf')
+    spans = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spans = tagger.tag(corpus)
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        'entities': len(tagger),
+        'build_seconds': build_seconds,
+        'corpus_mb': corpus_mb,
+        'spans': len(spans),
+        'seconds': best,
+        'mb_per_second': corpus_mb / best
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput benchmark for the gazetteer tagger")
+    parser.add_argument('--final-dir', default='data/final')
+    parser.add_argument('--size-mb', type=float, default=20.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--entity-rate', type=float, default=0.03,
+                        help='Fraction of corpus words replaced by dictionary entities')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.final_dir, args.size_mb, args.repeat, args.entity_rate)
+    print(f"Automaton: {results['entities']} entities compiled in {results['build_seconds'] * 1000:.1f} ms")
+    print(f"Corpus: {results['corpus_mb']:.1f} MB, {results['spans']} spans")
+    print(f"Throughput: {results['mb_per_second']:.1f} MB/s ({results['seconds']:.2f} s best of {args.repeat})")
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Distributed Mapping and Validation v2
+Splits mapper pair scoring and validator encoding/scoring into idempotent chunk jobs run by workers on a shared filesystem
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for subdir in ('scraping', 'processing', 'validation', 'runtime'):
+    sys.path.insert(0, os.path.join(SCRIPTS_DIR, subdir))
+
+from v2_alias_table import AliasTableV2
+from v2_cross_domain_mapper import CrossDomainMapperV2
+from v2_generate_final_dictionaries import atomic_write_bytes
+from v2_job_queue import JobQueueV2, default_worker_id
+from v2_pipeline import load_raw_entities
+from v2_sqlite_store import EntityStoreV2, configured_store
+
+QUEUE_DIR = 'data/processed/jobs'
+QUEUE_DB = 'v2_jobs.db'
+RUN_FILE = 'v2_run.json'
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+
+def job_id(kind: str, *parts) -> str:
+    """Deterministic id, so resubmitting the same chunk of the same inputs is a no-op"""
+    return kind + '-' + hashlib.sha256(json.dumps([kind, *parts]).encode('utf-8')).hexdigest()[:20]
+
+def write_json(path: str, data):
+    atomic_write_bytes(path, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+def read_json(path: str):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def result_path(queue_dir: str, job: str, suffix: str = '.json') -> str:
+    return os.path.join(queue_dir, 'results', job + suffix)
+
+def canonical_entities(inputs: Dict) -> Dict[str, List[str]]:
+    """Entities the validator scores: canonical forms of both domains"""
+    entities = {**inputs['renewable_energy'], **inputs['green_logistics']}
+    return AliasTableV2.from_entities(entities).canonical_entities(entities)
+
+def submit_run(queue_dir: str, re_entities: Dict[str, List[str]], gl_entities: Dict[str, List[str]],
+               map_entities: bool = True, validate: bool = True, model_name: str = DEFAULT_MODEL,
+               map_chunk: int = 200, fit_chunk: int = 2000, pair_rows: int = 2000) -> Dict:
+    """Snapshot the inputs, enqueue their chunk jobs and record the run for the reducer"""
+    inputs = {'renewable_energy': re_entities, 'green_logistics': gl_entities}
+    data = json.dumps(inputs).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    inputs_file = os.path.join('inputs', digest[:20] + '.json')
+    if not os.path.exists(os.path.join(queue_dir, inputs_file)):
+        atomic_write_bytes(os.path.join(queue_dir, inputs_file), data)
+
+    run = {'inputs': inputs_file, 'model': model_name, 'mapping': [], 'validation': {}}
+    added = 0
+    with JobQueueV2(os.path.join(queue_dir, QUEUE_DB)) as queue:
+        if map_entities:
+            mapper = CrossDomainMapperV2()
+            mapper.load_entities(re_entities, gl_entities)
+            re_count = len(mapper.re_items())
+            for start in range(0, re_count, map_chunk):
+                job = job_id('map', digest, start, map_chunk)
+                added += queue.submit(job, 'map', {'inputs': inputs_file, 'start': start,
+                                                   'stop': min(start + map_chunk, re_count)})
+                run['mapping'].append(job)
+
+        if validate:
+            for category, entities in canonical_entities(inputs).items():
+                fit_jobs = []
+                for start in range(0, len(entities), fit_chunk):
+                    job = job_id('fit', digest, model_name, category, start, fit_chunk)
+                    added += queue.submit(job, 'fit', {'inputs': inputs_file, 'model': model_name,
+                                                       'category': category, 'start': start,
+                                                       'stop': min(start + fit_chunk, len(entities))})
+                    fit_jobs.append(job)
+                # Duplicate row blocks need the embeddings of the whole category, so they wait for its fit jobs
+                duplicate_jobs = []
+                if len(entities) >= 2:
+                    for start in range(0, len(entities), pair_rows):
+                        job = job_id('duplicates', digest, model_name, category, start, pair_rows, fit_chunk)
+                        added += queue.submit(job, 'duplicates', {
+                            'inputs': inputs_file, 'model': model_name, 'category': category, 'start': start,
+                            'stop': min(start + pair_rows, len(entities)), 'fit_jobs': fit_jobs
+                        }, requires=fit_jobs)
+                        duplicate_jobs.append(job)
+                run['validation'][category] = {'fit': fit_jobs, 'duplicates': duplicate_jobs}
+
+    write_json(os.path.join(queue_dir, RUN_FILE), run)
+    total = len(run['mapping']) + sum(len(jobs['fit']) + len(jobs['duplicates'])
+                                      for jobs in run['validation'].values())
+    print(f"Submitted {added} new jobs ({total} in run) to {queue_dir}")
+    return run
+
+class ChunkExecutorV2:
+    """Runs chunk jobs, keeping loaded inputs, mappers and models for the lifetime of the worker"""
+
+    def __init__(self, queue_dir: str):
+        self.queue_dir = queue_dir
+        self.inputs = {}
+        self.canonical = {}
+        self.mappers = {}
+        self.validators = {}
+
+    def load_inputs(self, inputs_file: str) -> Dict:
+        if inputs_file not in self.inputs:
+            self.inputs[inputs_file] = read_json(os.path.join(self.queue_dir, inputs_file))
+        return self.inputs[inputs_file]
+
+    def mapper(self, inputs_file: str) -> CrossDomainMapperV2:
+        if inputs_file not in self.mappers:
+            inputs = self.load_inputs(inputs_file)
+            mapper = CrossDomainMapperV2()
+            mapper.load_entities(inputs['renewable_energy'], inputs['green_logistics'])
+            self.mappers[inputs_file] = mapper
+        return self.mappers[inputs_file]
+
+    def validator(self, model_name: str):
+        if model_name not in self.validators:
+            # Imported on demand so mapping-only workers need no ML dependencies
+            from v2_ai_semantic_validator import SemanticValidatorV2
+            from v2_embedding_index import load_encoder
+            self.validators[model_name] = SemanticValidatorV2(model_name, model=load_encoder(model_name))
+        return self.validators[model_name]
+
+    def category_entities(self, inputs_file: str, category: str) -> List[str]:
+        if inputs_file not in self.canonical:
+            self.canonical[inputs_file] = canonical_entities(self.load_inputs(inputs_file))
+        return self.canonical[inputs_file][category]
+
+    def run(self, job_id: str, kind: str, payload: Dict):
+        """Compute one chunk and write its partial result; rerunning a job rewrites identical output"""
+        if kind == 'map':
+            mapper = self.mapper(payload['inputs'])
+            items = mapper.re_items()[payload['start']:payload['stop']]
+            write_json(result_path(self.queue_dir, job_id), mapper.semantic_mappings_for(items))
+        elif kind == 'fit':
+            entities = self.category_entities(payload['inputs'], payload['category'])
+            records, vectors = self.validator(payload['model']).score_entities(
+                payload['category'], entities[payload['start']:payload['stop']])
+            buffer = io.BytesIO()
+            np.save(buffer, vectors)
+            atomic_write_bytes(result_path(self.queue_dir, job_id, '.npy'), buffer.getvalue())
+            write_json(result_path(self.queue_dir, job_id), records)
+        elif kind == 'duplicates':
+            entities = self.category_entities(payload['inputs'], payload['category'])
+            vectors = np.concatenate([np.load(result_path(self.queue_dir, fit_job, '.npy'))
+                                      for fit_job in payload['fit_jobs']])
+            pairs = self.validator(payload['model']).duplicate_pairs(entities, vectors,
+                                                                     payload['start'], payload['stop'])
+            write_json(result_path(self.queue_dir, job_id), pairs)
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+class LeaseKeeper(threading.Thread):
+    """Renews a job lease in the background while the job runs"""
+
+    def __init__(self, queue_path: str, job_id: str, worker: str, lease_seconds: float):
+        super().__init__(daemon=True)
+        self.queue_path = queue_path
+        self.job_id = job_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        # SQLite connections stay on the thread that opened them
+        with JobQueueV2(self.queue_path) as queue:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                if not queue.renew(self.job_id, self.worker, self.lease_seconds):
+                    self.lost = True
+                    return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def run_worker(queue_dir: str, worker: Optional[str] = None, lease_seconds: float = 60.0,
+               poll_seconds: float = 1.0, exit_when_idle: bool = True, max_jobs: Optional[int] = None) -> int:
+    """Claim and run jobs until the queue is drained (or max_jobs ran); returns the number completed"""
+    worker = worker or default_worker_id()
+    queue_path = os.path.join(queue_dir, QUEUE_DB)
+    executor = ChunkExecutorV2(queue_dir)
+    completed = 0
+    with JobQueueV2(queue_path) as queue:
+        while max_jobs is None or completed < max_jobs:
+            job = queue.claim(worker, lease_seconds)
+            if job is None:
+                if exit_when_idle and queue.unfinished() == 0:
+                    break
+                # Remaining jobs are leased elsewhere or wait for dependencies
+                time.sleep(poll_seconds)
+                continue
+
+            keeper = LeaseKeeper(queue_path, job.id, worker, lease_seconds)
+            keeper.start()
+            start = time.perf_counter()
+            try:
+                executor.run(job.id, job.kind, job.payload)
+            except Exception as e:
+                keeper.stop()
+                queue.fail(job.id, worker, f'{type(e).__name__}: {e}')
+                print(f"[{worker}] {job.id} failed (attempt {job.attempts}): {e}")
+                continue
+            keeper.stop()
+            queue.complete(job.id, worker)
+            completed += 1
+            note = ' (lease lost, result kept)' if keeper.lost else ''
+            print(f"[{worker}] {job.id} done in {time.perf_counter() - start:.2f} s{note}")
+    return completed
+
+def run_status(queue_dir: str) -> Dict:
+    """Job counts of the current run and of the whole queue"""
+    run = read_json(os.path.join(queue_dir, RUN_FILE))
+    run_jobs = run['mapping'] + [job for jobs in run['validation'].values()
+                                 for job in jobs['fit'] + jobs['duplicates']]
+    with JobQueueV2(os.path.join(queue_dir, QUEUE_DB)) as queue:
+        statuses = queue.statuses(run_jobs)
+        return {
+            'run_jobs': len(run_jobs),
+            'run_done': sum(1 for status in statuses.values() if status == 'done'),
+            'queue': queue.counts(),
+            'workers': queue.worker_stats(),
+            'failures': queue.failures()
+        }
+
+def reduce_run(queue_dir: str, output_dir: str = 'data/processed', store: Optional[EntityStoreV2] = None) -> Dict:
+    """Merge partial results of a finished run into the usual mapper and validator outputs"""
+    run = read_json(os.path.join(queue_dir, RUN_FILE))
+    status = run_status(queue_dir)
+    if status['run_done'] < status['run_jobs']:
+        raise RuntimeError(f"{status['run_jobs'] - status['run_done']} of {status['run_jobs']} jobs "
+                           f"are not done yet")
+    inputs = read_json(os.path.join(queue_dir, run['inputs']))
+    outputs = {}
+
+    if run['mapping']:
+        # Chunks are contiguous slices in visiting order, so concatenation matches a single-process run
+        semantic = [mapping for job in run['mapping'] for mapping in read_json(result_path(queue_dir, job))]
+        mapper = CrossDomainMapperV2()
+        mapper.generate_mappings(inputs['renewable_energy'], inputs['green_logistics'], semantic_mappings=semantic)
+        mapper.save_results(output_dir, store=store)
+        outputs['mappings'] = len(mapper.mappings)
+
+    if run['validation']:
+        from v2_ai_semantic_validator import NumpyEncoder, SemanticValidatorV2
+        from v2_embedding_index import load_encoder
+        entities = {**inputs['renewable_energy'], **inputs['green_logistics']}
+        records = {
+            category: [record for job in jobs['fit'] for record in read_json(result_path(queue_dir, job))]
+            for category, jobs in run['validation'].items()
+        }
+        duplicates = {
+            category: [tuple(pair) for job in jobs['duplicates'] for pair in read_json(result_path(queue_dir, job))]
+            for category, jobs in run['validation'].items()
+        }
+        validator = SemanticValidatorV2(run['model'], model=load_encoder(run['model']))
+        results = validator.merge_results(entities, records, duplicates)
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, 'v2_semantic_validation_results.json'), 'w') as f:
+            json.dump(results, f, indent=2, cls=NumpyEncoder)
+        if store is not None:
+            store.replace_validation(results, validator.entity_records)
+        outputs['validated_entities'] = results['validation_summary']['total_entities']
+
+    print(f"Reduced {status['run_jobs']} jobs into {output_dir}: {outputs}")
+    return outputs
+
+def run_local(queue_dir: str, workers: int, lease_seconds: float = 60.0) -> List[int]:
+    """Drain the queue with worker subprocesses on this machine; returns their exit codes"""
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--queue', queue_dir, 'worker',
+                          '--lease', str(lease_seconds), '--worker-id', f'{default_worker_id()}/{i}'])
+        for i in range(workers)
+    ]
+    return [process.wait() for process in processes]
+
+def add_submit_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--no-map', action='store_true', help='Skip mapping jobs')
+    parser.add_argument('--no-validate', action='store_true', help='Skip validation jobs')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Sentence transformer, or 'hashing' offline")
+    parser.add_argument('--map-chunk', type=int, default=200, help='RE entities per mapping job')
+    parser.add_argument('--fit-chunk', type=int, default=2000, help='Entities encoded per category-fit job')
+    parser.add_argument('--pair-rows', type=int, default=2000, help='Rows per duplicate-detection job')
+
+def submit_from_args(args) -> Dict:
+    store = configured_store()
+    if store is not None and store.has_entities():
+        raw = {domain: store.load_entities(domain) for domain in ('renewable_energy', 'green_logistics')}
+    else:
+        raw = load_raw_entities()
+    return submit_run(args.queue, raw['renewable_energy'], raw['green_logistics'], not args.no_map,
+                      not args.no_validate, args.model, args.map_chunk, args.fit_chunk, args.pair_rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed mapping and validation over a shared job queue")
+    parser.add_argument('--queue', default=QUEUE_DIR, help='Queue directory on a filesystem shared by all workers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add_submit_arguments(commands.add_parser('submit', help='Enqueue chunk jobs for the current entities'))
+
+    worker_parser = commands.add_parser('worker', help='Claim and run jobs until the queue is drained')
+    worker_parser.add_argument('--worker-id', default=None)
+    worker_parser.add_argument('--lease', type=float, default=60.0, help='Lease seconds, renewed while a job runs')
+    worker_parser.add_argument('--max-jobs', type=int, default=None)
+    worker_parser.add_argument('--wait', action='store_true', help='Keep polling for new jobs instead of exiting')
+
+    reduce_parser = commands.add_parser('reduce', help='Merge partial results into data/processed')
+    reduce_parser.add_argument('--output-dir', default='data/processed')
+
+    commands.add_parser('status', help='Show job counts, workers and failures')
+    commands.add_parser('retry', help='Requeue failed jobs')
+
+    local_parser = commands.add_parser('run', help='Submit, drain with local worker processes and reduce')
+    add_submit_arguments(local_parser)
+    local_parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    local_parser.add_argument('--lease', type=float, default=60.0)
+    local_parser.add_argument('--output-dir', default='data/processed')
+
+    args = parser.parse_args()
+    args.queue = os.path.abspath(args.queue)
+
+    if args.command == 'submit':
+        submit_from_args(args)
+    elif args.command == 'worker':
+        completed = run_worker(args.queue, args.worker_id, args.lease, exit_when_idle=not args.wait,
+                               max_jobs=args.max_jobs)
+        print(f"Worker finished after {completed} jobs")
+    elif args.command == 'reduce':
+        reduce_run(args.queue, args.output_dir, configured_store())
+    elif args.command == 'status':
+        print(json.dumps(run_status(args.queue), indent=2))
+    elif args.command == 'retry':
+        with JobQueueV2(os.path.join(args.queue, QUEUE_DB)) as queue:
+            print(f"Requeued {queue.retry_failed()} failed jobs")
+    elif args.command == 'run':
+        submit_from_args(args)
+        start = time.perf_counter()
+        exit_codes = run_local(args.queue, args.workers, args.lease)
+        print(f"{args.workers} workers drained the queue in {time.perf_counter() - start:.1f} s "
+              f"(exit codes {exit_codes})")
+        reduce_run(args.queue, args.output_dir, configured_store())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Job Queue v2
+SQLite-backed work queue with leases, dependencies and retries, shared by workers on any machine that sees the file
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started REAL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS job_deps (
+    job_id TEXT NOT NULL,
+    dep_id TEXT NOT NULL,
+    PRIMARY KEY (job_id, dep_id)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, seq);
+"""
+
+# Pending jobs, and leased jobs whose worker stopped renewing, whose dependencies are all done
+CLAIMABLE = """
+SELECT id, kind, payload, attempts FROM jobs
+WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+  AND NOT EXISTS (
+      SELECT 1 FROM job_deps d JOIN jobs j ON j.id = d.dep_id
+      WHERE d.job_id = jobs.id AND j.status != 'done'
+  )
+ORDER BY seq LIMIT 1
+"""
+
+class Job(NamedTuple):
+    id: str
+    kind: str
+    payload: Dict
+    attempts: int
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+class JobQueueV2:
+    """Jobs are claimed under a time-limited lease; an expired lease makes the job claimable again"""
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode; claims take the write lock up front with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'JobQueueV2':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _transaction(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def submit(self, job_id: str, kind: str, payload: Dict, requires: Iterable[str] = ()) -> bool:
+        """Add a job unless one with the same id exists (resubmitting is a no-op); True if added"""
+        self._transaction()
+        try:
+            seq = self.connection.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs').fetchone()[0]
+            added = self.connection.execute(
+                'INSERT OR IGNORE INTO jobs (id, seq, kind, payload) VALUES (?, ?, ?, ?)',
+                (job_id, seq, kind, json.dumps(payload))
+            ).rowcount == 1
+            if added:
+                requires = list(requires)
+                self.connection.executemany('INSERT OR IGNORE INTO job_deps (job_id, dep_id) VALUES (?, ?)',
+                                            [(job_id, dep_id) for dep_id in requires])
+                if any(status == 'failed' for status in self.statuses(requires).values()):
+                    self.connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = 'dependency failed', finished = ? WHERE id = ?",
+                        (time.time(), job_id))
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the next runnable job, or None when nothing is runnable right now"""
+        now = time.time()
+        self._transaction()
+        try:
+            while True:
+                row = self.connection.execute(CLAIMABLE, (now,)).fetchone()
+                if row is None:
+                    self.connection.execute('COMMIT')
+                    return None
+                job_id, kind, payload, attempts = row
+                if attempts >= self.max_attempts:
+                    # Every attempt so far died holding the lease
+                    self.connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired'), "
+                        "finished = ? WHERE id = ?", (now, job_id))
+                    self._fail_dependents(job_id, now)
+                    continue
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "started = ? WHERE id = ?", (worker, now + lease_seconds, now, job_id))
+                self.connection.execute('COMMIT')
+                return Job(job_id, kind, json.loads(payload), attempts + 1)
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def renew(self, job_id: str, worker: str, lease_seconds: float) -> bool:
+        """Extend a lease; False once the job was taken over by another worker"""
+        return self.connection.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, job_id, worker)
+        ).rowcount == 1
+
+    def complete(self, job_id: str, worker: str) -> bool:
+        """Mark a job done; results are idempotent, so a worker whose lease lapsed may still complete it"""
+        return self.connection.execute(
+            "UPDATE jobs SET status = 'done', worker = ?, lease_expires = NULL, error = NULL, finished = ? "
+            "WHERE id = ? AND status != 'done'", (worker, time.time(), job_id)
+        ).rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str):
+        """Return a job to the queue, or fail it and everything waiting on it for good after max_attempts"""
+        now = time.time()
+        self._transaction()
+        try:
+            self.connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_expires = NULL, finished = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, error, now, job_id, worker)
+            )
+            status = self.connection.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if status is not None and status[0] == 'failed':
+                self._fail_dependents(job_id, now)
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def _fail_dependents(self, job_id: str, now: float):
+        """Fail the pending jobs that (transitively) wait on a failed job, which could otherwise never run"""
+        failed = [job_id]
+        while failed:
+            dependents = [row[0] for row in self.connection.execute(
+                "SELECT d.job_id FROM job_deps d JOIN jobs j ON j.id = d.job_id "
+                "WHERE d.dep_id = ? AND j.status = 'pending'", (failed.pop(),))]
+            self.connection.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'dependency failed', finished = ? WHERE id = ?",
+                [(now, dependent) for dependent in dependents])
+            failed.extend(dependents)
+
+    def retry_failed(self) -> int:
+        """Put failed jobs, including those failed by a dependency, back in the queue with a fresh attempt budget"""
+        return self.connection.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, error = NULL WHERE status = 'failed'"
+        ).rowcount
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Job counts per kind and status"""
+        counts = {}
+        for kind, status, count in self.connection.execute(
+                'SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status ORDER BY kind, status'):
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def unfinished(self) -> int:
+        """Jobs still pending or leased"""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        statuses = {}
+        for start in range(0, len(job_ids), 500):
+            batch = job_ids[start:start + 500]
+            statuses.update(self.connection.execute(
+                f"SELECT id, status FROM jobs WHERE id IN ({','.join('?' * len(batch))})", batch).fetchall())
+        return statuses
+
+    def failures(self) -> List[Dict]:
+        return [
+            {'id': job_id, 'kind': kind, 'attempts': attempts, 'error': error}
+            for job_id, kind, attempts, error in self.connection.execute(
+                "SELECT id, kind, attempts, error FROM jobs WHERE status = 'failed' ORDER BY seq")
+        ]
+
+    def worker_stats(self) -> Dict[str, Dict[str, float]]:
+        """Completed jobs and busy seconds per worker"""
+        return {
+            worker: {'jobs': jobs, 'seconds': seconds or 0.0}
+            for worker, jobs, seconds in self.connection.execute(
+                "SELECT worker, COUNT(*), SUM(finished - started) FROM jobs WHERE status = 'done' "
+                "GROUP BY worker ORDER BY worker")
+        }
+
+if __name__ == "__main__":
+    with JobQueueV2(sys.argv[1] if len(sys.argv) > 1 else 'data/processed/jobs/v2_jobs.db') as queue:
+        print(json.dumps({'counts': queue.counts(), 'workers': queue.worker_stats(),
+                          'failures': queue.failures()}, indent=2))
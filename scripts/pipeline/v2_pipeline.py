@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+In-Process Pipeline v2
+Runs scrapers, mapper, validator and generator on in-memory objects, with disk persistence as an optional sink
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for subdir in ('scraping', 'processing', 'validation'):
+    sys.path.insert(0, os.path.join(SCRIPTS_DIR, subdir))
+
+from v2_cross_domain_mapper import CrossDomainMapperV2
+from v2_generate_final_dictionaries import DictionaryGeneratorV2
+from v2_instrumentation import StageMetricsV2
+from v2_sqlite_store import EntityStoreV2
+from v2_green_logistics_scraper import GreenLogisticsScraperV2
+from v2_renewable_energy_scraper import RenewableEnergyScraperV2
+
+class PipelineResult(NamedTuple):
+    re_entities: Dict[str, List[str]]
+    gl_entities: Dict[str, List[str]]
+    mappings: List[Dict]
+    relationships: List[Dict]
+    validation_results: Dict
+    dictionaries: Dict[str, object]
+    timings: Dict[str, float]
+    metrics: Dict[str, Dict]
+
+class DiskSinkV2:
+    """Persists stage outputs in the usual data/raw, data/processed and data/final layout"""
+
+    def __init__(self, raw_dir: str = 'data/raw', processed_dir: str = 'data/processed',
+                 final_dir: str = 'data/final'):
+        self.raw_dir = raw_dir
+        self.processed_dir = processed_dir
+        self.final_dir = final_dir
+
+    def write_entities(self, re_entities: Dict[str, List[str]], gl_entities: Dict[str, List[str]]):
+        os.makedirs(self.raw_dir, exist_ok=True)
+        for filename, entities in (('v2_renewable_energy_entities.json', re_entities),
+                                   ('v2_green_logistics_entities.json', gl_entities)):
+            with open(os.path.join(self.raw_dir, filename), 'w') as f:
+                json.dump(entities, f, indent=2)
+
+    def write_mappings(self, mapper: CrossDomainMapperV2):
+        mapper.save_results(self.processed_dir)
+
+    def write_validation(self, results: Dict):
+        from v2_ai_semantic_validator import NumpyEncoder
+        os.makedirs(self.processed_dir, exist_ok=True)
+        with open(os.path.join(self.processed_dir, 'v2_semantic_validation_results.json'), 'w') as f:
+            json.dump(results, f, indent=2, cls=NumpyEncoder)
+
+    def write_dictionaries(self, generator: DictionaryGeneratorV2) -> Dict[str, object]:
+        if os.path.abspath(generator.output_dir) != os.path.abspath(self.final_dir):
+            raise ValueError(f"Generator writes to {generator.output_dir}, sink expects {self.final_dir}")
+        generator.metrics.metrics_dir = os.path.join(self.processed_dir, 'metrics')
+        return generator.save_dictionaries()
+
+    def write_metrics(self, stage_metrics: List[StageMetricsV2]):
+        for metrics in stage_metrics:
+            metrics.metrics_dir = os.path.join(self.processed_dir, 'metrics')
+            metrics.save()
+
+def load_raw_entities(raw_dir: str = 'data/raw') -> Dict[str, Dict[str, List[str]]]:
+    """Entities from a previous scrape, for rebuilds that skip the network"""
+    entities = {}
+    for domain, filename in (('renewable_energy', 'v2_renewable_energy_entities.json'),
+                             ('green_logistics', 'v2_green_logistics_entities.json')):
+        with open(os.path.join(raw_dir, filename), 'r') as f:
+            entities[domain] = json.load(f)
+    return entities
+
+def run_pipeline(re_entities: Optional[Dict[str, List[str]]] = None,
+                 gl_entities: Optional[Dict[str, List[str]]] = None,
+                 validator=None, validate: bool = True, sink: Optional[DiskSinkV2] = None,
+                 store: Optional[EntityStoreV2] = None) -> PipelineResult:
+    """Build the dictionaries in memory; entities not passed in are scraped"""
+    timings = {}
+    stage_metrics = []
+
+    start = time.perf_counter()
+    if re_entities is None:
+        scraper = RenewableEnergyScraperV2()
+        re_entities = scraper.scrape_all_sources()
+        stage_metrics.append(scraper.metrics)
+    if gl_entities is None:
+        scraper = GreenLogisticsScraperV2()
+        gl_entities = scraper.scrape_all_sources()
+        stage_metrics.append(scraper.metrics)
+    timings['scrape'] = time.perf_counter() - start
+    if sink is not None:
+        sink.write_entities(re_entities, gl_entities)
+    if store is not None:
+        store.replace_entities('renewable_energy', re_entities, full=True)
+        store.replace_entities('green_logistics', gl_entities, full=True)
+
+    if validate and validator is None:
+        # Imported on demand so in-memory rebuilds without validation need no ML dependencies
+        from v2_ai_semantic_validator import SemanticValidatorV2
+        validator = SemanticValidatorV2()
+
+    def timed(name, function, *args):
+        stage_start = time.perf_counter()
+        result = function(*args)
+        timings[name] = time.perf_counter() - stage_start
+        return result
+
+    # Mapper and validator only share read-only entity dicts, so they run side by side
+    # (their CPU time and RSS readings are process-wide, so each includes the other's share)
+    mapper = CrossDomainMapperV2()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        mapping_future = pool.submit(timed, 'map', mapper.generate_mappings, re_entities, gl_entities)
+        validation_future = None
+        if validate:
+            validation_future = pool.submit(timed, 'validate', validator.run_validation,
+                                            {**re_entities, **gl_entities})
+        mappings = mapping_future.result()
+        validation_results = validation_future.result() if validation_future else {}
+
+    if sink is not None:
+        sink.write_mappings(mapper)
+        if validate:
+            sink.write_validation(validation_results)
+    if store is not None:
+        store.replace_mappings(mappings)
+        if validate:
+            store.replace_validation(validation_results, validator.entity_records)
+    stage_metrics.append(mapper.metrics)
+    if validate:
+        stage_metrics.append(validator.metrics)
+
+    start = time.perf_counter()
+    generator = DictionaryGeneratorV2(sink.final_dir) if sink is not None else DictionaryGeneratorV2()
+    generator.load_data(re_entities, gl_entities, mappings, validation_results)
+    generator.stage_metrics = {metrics.stage: metrics.finish() for metrics in stage_metrics}
+    if sink is not None:
+        dictionaries = sink.write_dictionaries(generator)
+    else:
+        dictionaries = generator.build_dictionaries()
+    timings['generate'] = time.perf_counter() - start
+    stage_metrics.append(generator.metrics)
+
+    if sink is not None:
+        sink.write_metrics(stage_metrics)
+    return PipelineResult(re_entities, gl_entities, mappings, mapper.relationships, validation_results,
+                          dictionaries, timings, {metrics.stage: metrics.finish() for metrics in stage_metrics})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the v2 dictionaries in a single process")
+    parser.add_argument('--scrape', action='store_true', help='Scrape sources instead of reusing data/raw')
+    parser.add_argument('--no-validate', action='store_true', help='Skip semantic validation')
+    parser.add_argument('--persist', action='store_true', help='Write every stage output under data/')
+    parser.add_argument('--store', metavar='PATH', help='Also write entities, mappings and scores to a SQLite store')
+    args = parser.parse_args()
+
+    raw = {} if args.scrape else load_raw_entities()
+    store = EntityStoreV2(args.store) if args.store else None
+    result = run_pipeline(raw.get('renewable_energy'), raw.get('green_logistics'),
+                          validate=not args.no_validate, sink=DiskSinkV2() if args.persist else None, store=store)
+
+    summary = result.dictionaries['v2_project_summary.json']['project_overview']
+    print(f"Built {summary['total_entities']} entities and {summary['cross_domain_mappings']} mappings in memory")
+    for stage, seconds in result.timings.items():
+        print(f"  {stage:<10} {seconds:7.2f} s")
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner v2
+Runs the dictionary build DAG, skipping stages whose code and inputs are unchanged and running independent stages in parallel
+"""
+
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'processing'))
+
+from v2_generate_final_dictionaries import sha256_file
+
+STATE_PATH = 'data/processed/v2_pipeline_state.json'
+LOG_DIR = 'data/processed/logs'
+SCRIPTS_DIR = 'scripts'
+
+class Stage(NamedTuple):
+    name: str
+    script: str
+    code: List[str]       # source files whose edits invalidate the stage; their local imports are added
+    inputs: List[str]
+    outputs: List[str]
+    deps: List[str]
+
+RAW_ENTITIES = ['data/raw/v2_renewable_energy_entities.json', 'data/raw/v2_green_logistics_entities.json']
+FINAL_OUTPUTS = [
+    'data/final/v2_renewable_energy_services_dictionary.json',
+    'data/final/v2_green_logistics_dictionary.json',
+    'data/final/v2_cross_domain_mappings_dictionary.json',
+    'data/final/v2_cross_domain_mappings/index.json',
+    'data/final/v2_dictionaries.bin',
+    'data/final/v2_project_summary.json'
+]
+
+# Scrapers -> (mapper, validator in parallel) -> generator
+PIPELINE_STAGES = [
+    Stage('renewable_energy_scraper', 'scripts/scraping/v2_renewable_energy_scraper.py',
+          ['scripts/scraping/v2_renewable_energy_scraper.py'],
+          [], [RAW_ENTITIES[0]], []),
+    Stage('green_logistics_scraper', 'scripts/scraping/v2_green_logistics_scraper.py',
+          ['scripts/scraping/v2_green_logistics_scraper.py'],
+          [], [RAW_ENTITIES[1]], []),
+    Stage('cross_domain_mapper', 'scripts/processing/v2_cross_domain_mapper.py',
+          ['scripts/processing/v2_cross_domain_mapper.py', 'scripts/runtime/v2_fuzzy_matcher.py',
+           'scripts/runtime/v2_dictionary_lookup.py'],
+          RAW_ENTITIES,
+          ['data/processed/v2_cross_domain_mappings.json', 'data/processed/v2_entity_relationships.csv'],
+          ['renewable_energy_scraper', 'green_logistics_scraper']),
+    Stage('semantic_validator', 'scripts/validation/v2_ai_semantic_validator.py',
+          ['scripts/validation/v2_ai_semantic_validator.py'],
+          RAW_ENTITIES,
+          ['data/processed/v2_semantic_validation_results.json'],
+          ['renewable_energy_scraper', 'green_logistics_scraper']),
+    Stage('dictionary_generator', 'scripts/processing/v2_generate_final_dictionaries.py',
+          ['scripts/processing/v2_generate_final_dictionaries.py', 'scripts/processing/v2_binary_dictionary.py'],
+          RAW_ENTITIES + ['data/processed/v2_cross_domain_mappings.json',
+                          'data/processed/v2_semantic_validation_results.json'],
+          FINAL_OUTPUTS,
+          ['cross_domain_mapper', 'semantic_validator'])
+]
+
+def local_modules(scripts_dir: str = SCRIPTS_DIR) -> Dict[str, str]:
+    """Module name -> source path of every repo script importable through the scripts/<area> path entries"""
+    modules = {}
+    for path in sorted(glob.glob(os.path.join(scripts_dir, '*', '*.py'))):
+        modules.setdefault(os.path.splitext(os.path.basename(path))[0], path)
+    return modules
+
+def code_closure(paths: List[str], modules: Dict[str, str]) -> List[str]:
+    """Source files plus every repo module they import, directly or transitively (lazy imports included)"""
+    seen = set()
+    pending = list(paths)
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            pending.extend(modules[name] for name in names if name in modules)
+    return sorted(seen)
+
+class PipelineRunnerV2:
+    """Content-hash driven scheduler for the v2 build stages"""
+
+    def __init__(self, stages: List[Stage] = PIPELINE_STAGES, state_path: str = STATE_PATH,
+                 log_dir: str = LOG_DIR, jobs: int = 2):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.log_dir = log_dir
+        self.jobs = jobs
+        self.state = {}
+        self.results = {}
+        self.modules = local_modules()
+
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                self.state = json.load(f)
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def stage_key(self, stage: Stage) -> Tuple[str, Dict[str, Optional[str]]]:
+        """Hash of the stage's code and current input contents
+
+        Only files are hashed. With V2_STORE set, stages read the store, which mirrors the
+        JSON stage outputs; a store edited outside the runner needs --force to take effect.
+        """
+        fingerprint = {
+            'script': stage.script,
+            'code': {path: sha256_file(path) for path in code_closure([stage.script] + stage.code, self.modules)},
+            'inputs': {path: sha256_file(path) for path in stage.inputs}
+        }
+        key = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+        return key, fingerprint
+
+    def is_up_to_date(self, stage: Stage, key: str) -> bool:
+        """Same key as the last successful run and outputs untouched since"""
+        previous = self.state.get(stage.name)
+        if not previous or previous.get('key') != key:
+            return False
+        return all(sha256_file(path) == previous['outputs'].get(path) for path in stage.outputs)
+
+    def select(self, targets: Optional[List[str]]) -> List[str]:
+        """Requested stages plus everything upstream of them, in declaration order"""
+        if not targets:
+            return list(self.stages)
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def execute(self, stage: Stage) -> Tuple[int, float, str]:
+        """Run one stage script from the repo root, logging its output"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_path = os.path.join(self.log_dir, f'{stage.name}.log')
+        start = time.perf_counter()
+        with open(log_path, 'w') as log:
+            process = subprocess.run([sys.executable, stage.script], stdout=log, stderr=subprocess.STDOUT)
+        return process.returncode, time.perf_counter() - start, log_path
+
+    def run(self, targets: Optional[List[str]] = None, force: Optional[List[str]] = None,
+            dry_run: bool = False) -> Dict[str, Dict]:
+        """Schedule selected stages as soon as their dependencies finish"""
+        self.load_state()
+        selected = self.select(targets)
+        force = set(force or [])
+        if 'all' in force:
+            force = set(selected)
+        status = {}
+        self.results = {}
+
+        def ready(name):
+            return all(status.get(dep) in ('ran', 'skipped', 'would run') for dep in self.stages[name].deps
+                       if dep in selected)
+
+        def blocked(name):
+            return any(status.get(dep) in ('failed', 'blocked') for dep in self.stages[name].deps
+                       if dep in selected)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while len(status) < len(selected):
+                progressed = False
+                for name in selected:
+                    if name in status or name in running.values():
+                        continue
+                    if blocked(name):
+                        status[name] = 'blocked'
+                        progressed = True
+                        self.results[name] = {'status': 'blocked', 'seconds': 0.0}
+                        print(f"[{name}] blocked by a failed dependency")
+                        continue
+                    if not ready(name):
+                        continue
+
+                    progressed = True
+                    stage = self.stages[name]
+                    upstream_changes = any(status.get(dep) == 'would run' for dep in stage.deps)
+                    # Keys are computed only once upstream outputs are final
+                    key, _ = self.stage_key(stage)
+                    if name not in force and not upstream_changes and self.is_up_to_date(stage, key):
+                        status[name] = 'skipped'
+                        self.results[name] = {'status': 'skipped', 'seconds': 0.0}
+                        print(f"[{name}] up to date")
+                        continue
+                    if dry_run:
+                        status[name] = 'would run'
+                        self.results[name] = {'status': 'would run', 'seconds': 0.0}
+                        print(f"[{name}] would run")
+                        continue
+                    print(f"[{name}] running {stage.script}")
+                    running[pool.submit(self.execute, stage)] = name
+
+                if not running:
+                    if not progressed:
+                        raise ValueError(f"Dependency cycle among stages {sorted(set(selected) - set(status))}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    returncode, seconds, log_path = future.result()
+                    if returncode == 0:
+                        key, fingerprint = self.stage_key(stage)
+                        self.state[name] = {
+                            'key': key,
+                            'fingerprint': fingerprint,
+                            'outputs': {path: sha256_file(path) for path in stage.outputs},
+                            'seconds': seconds,
+                            'completed': time.strftime('%Y-%m-%dT%H:%M:%S')
+                        }
+                        self.save_state()
+                        status[name] = 'ran'
+                        print(f"[{name}] done in {seconds:.1f} s")
+                    else:
+                        status[name] = 'failed'
+                        print(f"[{name}] failed (exit {returncode}), see {log_path}")
+                    self.results[name] = {'status': status[name], 'seconds': seconds, 'log': log_path}
+
+        return self.results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the v2 dictionary build pipeline")
+    parser.add_argument('targets', nargs='*', help='Stages to build (with their upstream stages); default all')
+    parser.add_argument('--force', action='append', default=[],
+                        help="Re-run a stage even if up to date (repeatable, or 'all')")
+    parser.add_argument('--jobs', type=int, default=2, help='Stages allowed to run at the same time')
+    parser.add_argument('--dry-run', action='store_true', help='Only report which stages would run')
+    args = parser.parse_args()
+
+    runner = PipelineRunnerV2(jobs=args.jobs)
+    start = time.perf_counter()
+    results = runner.run(args.targets, args.force, args.dry_run)
+    total = time.perf_counter() - start
+
+    print("\nStage timings:")
+    for name, result in results.items():
+        print(f"  {name:<26} {result['status']:<9} {result['seconds']:7.2f} s")
+    print(f"  {'total wall time':<26} {'':<9} {total:7.2f} s")
+    if any(result['status'] in ('failed', 'blocked') for result in results.values()):
+        sys.exit(1)
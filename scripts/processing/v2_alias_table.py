@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Canonical Alias Table v2
+Groups variant surface forms ("Ev", "Electric Vehicles", "Iso 14001") under one canonical entity per category
+"""
+
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'runtime'))
+
+from v2_dictionary_lookup import initials, normalize_entity_text
+from v2_fuzzy_matcher import normalize_variant
+
+# Abbreviations expanded before grouping, so "Ev" and "Electric Vehicle" share a key
+ABBREVIATIONS = {
+    'ev': 'electric vehicle',
+    'evs': 'electric vehicle',
+    'pv': 'photovoltaic',
+    'csp': 'concentrated solar power',
+    'lca': 'life cycle assessment',
+    'lcoe': 'levelized cost of energy',
+    'ghg': 'greenhouse gas',
+    'co2': 'carbon dioxide',
+    'co2e': 'carbon dioxide equivalent',
+    'rec': 'renewable energy certificate',
+    'res': 'renewable energy source',
+    'iot': 'internet of thing',
+    'ai': 'artificial intelligence',
+    'ml': 'machine learning',
+    'ems': 'energy management system',
+    'maas': 'mobility as a service'
+}
+
+# Bare standard codes ("iso 14001") alias the single titled entry for the same code
+STANDARD_CODE_RE = re.compile(r'^[a-z]+ \d+$')
+
+class AliasGroup(NamedTuple):
+    id: str
+    canonical: str
+    category: str
+    aliases: List[str]
+
+# Matched on normalized text, where "co2" has become "co 2"
+_EXPANSIONS = {normalize_variant(short): normalize_variant(full) for short, full in ABBREVIATIONS.items()}
+_EXPANSION_RE = re.compile(r'\b(' + '|'.join(re.escape(short) for short in
+                                           sorted(_EXPANSIONS, key=len, reverse=True)) + r')\b')
+
+# Normalization is token-local and dictionary tokens repeat heavily, so tokens are normalized once
+_normalize_token = lru_cache(maxsize=1 << 16)(normalize_variant)
+
+def normalize_words(entity: str) -> str:
+    """normalize_variant() of an entity, computed token by token"""
+    return ' '.join(_normalize_token(token) for token in entity.split())
+
+def alias_key(normalized: str) -> str:
+    """Spacing-, hyphen-, plural- and abbreviation-insensitive grouping key of normalize_variant() text"""
+    expanded = _EXPANSION_RE.sub(lambda match: _EXPANSIONS[match.group(1)], normalized)
+    return expanded.replace(' ', '')
+
+def canonical_id(category: str, canonical: str) -> str:
+    return f"{category}:{'_'.join(normalize_entity_text(canonical).split())}"
+
+def canonical_rank(entity: str) -> Tuple[int, int, str]:
+    """Most descriptive form first: more words, then longer, then alphabetical"""
+    return (-len(entity.split()), -len(entity), entity)
+
+class AliasTableV2:
+    """Canonical entity and aliases for every surface form, per category"""
+
+    def __init__(self):
+        self.groups = {}        # id -> AliasGroup, only for entities that have aliases
+        self.group_of = {}      # (category, entity) -> id
+
+    @classmethod
+    def from_entities(cls, entities_dict: Dict[str, List[str]]) -> 'AliasTableV2':
+        table = cls()
+        for category, entity_list in entities_dict.items():
+            buckets = {}
+            normalized = {}
+            for entity in dict.fromkeys(entity_list):
+                normalized[entity] = normalize_words(entity)
+                buckets.setdefault(alias_key(normalized[entity]) or entity, []).append(entity)
+
+            # Single-token forms may be acronyms of one multi-word entry ("Lca" -> "Life Cycle Assessment");
+            # bare standard codes may prefix one titled entry ("Iso 14001" -> "Iso 14001 Environmental Management")
+            short_forms = {}
+            for key, members in buckets.items():
+                if len(members[0].split()) == 1 or STANDARD_CODE_RE.match(normalized[members[0]]):
+                    short_forms[key] = members[0]
+            if not short_forms:
+                continue
+
+            acronyms = {re.sub(r'\W+', '', form.lower()) for form in short_forms.values()}
+            first_letters = {acronym[:1] for acronym in acronyms}
+            by_initials = {}
+            by_code = {}
+            for key, members in buckets.items():
+                for member in members:
+                    if member[:1].lower() in first_letters:
+                        member_initials = initials(member)
+                        if member_initials in acronyms:
+                            by_initials.setdefault(member_initials, set()).add(key)
+                words = normalized[members[0]].split()
+                if len(words) > 2 and STANDARD_CODE_RE.match(' '.join(words[:2])):
+                    by_code.setdefault(' '.join(words[:2]), set()).add(key)
+
+            for key, form in short_forms.items():
+                targets = by_initials.get(re.sub(r'\W+', '', form.lower()), set()) - {key}
+                if not targets:
+                    targets = by_code.get(normalized[form], set()) - {key}
+                if len(targets) == 1:
+                    target = targets.pop()
+                    if target in buckets and key in buckets:
+                        buckets[target].extend(buckets.pop(key))
+
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                canonical = min(members, key=canonical_rank)
+                group = AliasGroup(canonical_id(category, canonical), canonical, category,
+                                   [member for member in members if member != canonical])
+                table.groups[group.id] = group
+                for member in members:
+                    table.group_of[(category, member)] = group.id
+        return table
+
+    def group(self, entity: str, category: str) -> Optional[AliasGroup]:
+        group_id = self.group_of.get((category, entity))
+        return self.groups[group_id] if group_id is not None else None
+
+    def canonical_of(self, entity: str, category: str) -> str:
+        group = self.group(entity, category)
+        return group.canonical if group is not None else entity
+
+    def forms(self, entity: str, category: str) -> List[str]:
+        """Canonical form followed by its aliases"""
+        group = self.group(entity, category)
+        return [group.canonical] + group.aliases if group is not None else [entity]
+
+    def canonical_entities(self, entities_dict: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Entity lists with aliases removed, in the original order"""
+        return {
+            category: list(dict.fromkeys(self.canonical_of(entity, category) for entity in entity_list))
+            for category, entity_list in entities_dict.items()
+        }
+
+    def fan_out(self, entities_dict: Dict[str, List[str]],
+                canonical_results: Dict[str, Dict[str, Dict]]) -> Dict[str, List[Dict]]:
+        """Per-entity records for every surface form, copied from the record of its canonical entity"""
+        records = {}
+        for category, entity_list in entities_dict.items():
+            records[category] = []
+            for entity in entity_list:
+                canonical = self.canonical_of(entity, category)
+                record = dict(canonical_results[category][canonical], entity=entity)
+                if canonical != entity:
+                    record['canonical'] = canonical
+                records[category].append(record)
+        return records
+
+    def alias_groups(self) -> List[AliasGroup]:
+        return list(self.groups.values())
+
+    def to_dict(self) -> Dict[str, Dict[str, Dict]]:
+        """Groups with aliases, as {category: {canonical: {'id', 'aliases'}}}"""
+        result = {}
+        for group in self.alias_groups():
+            result.setdefault(group.category, {})[group.canonical] = {'id': group.id, 'aliases': group.aliases}
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, Dict]]) -> 'AliasTableV2':
+        table = cls()
+        for category, groups in data.items():
+            for canonical, info in groups.items():
+                group = AliasGroup(info['id'], canonical, category, list(info['aliases']))
+                table.groups[group.id] = group
+                for member in [canonical] + group.aliases:
+                    table.group_of[(category, member)] = group.id
+        return table
+
+    def stats(self) -> Dict[str, int]:
+        groups = self.alias_groups()
+        return {'alias_groups': len(groups), 'aliases': sum(len(group.aliases) for group in groups)}
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ['data/raw/v2_renewable_energy_entities.json',
+                                 'data/raw/v2_green_logistics_entities.json']:
+        with open(path, 'r') as f:
+            table = AliasTableV2.from_entities(json.load(f))
+        print(f"{path}: {table.stats()}")
+        for group in table.alias_groups():
+            print(f"  {group.category}: {group.canonical} <- {', '.join(group.aliases)}")
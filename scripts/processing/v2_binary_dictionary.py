@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Compact Binary Dictionary Format v2
+Memory-mappable artifact for the final NER dictionaries and cross-domain mappings
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+MAGIC = b'NERDICT2'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# Section order inside the file; every section is 8-byte aligned
+SECTIONS = [
+    'metadata',          # UTF-8 JSON, stored once for all domains
+    'string_offsets',    # uint32[n_strings + 1] into string_data
+    'string_data',       # concatenated UTF-8 strings
+    'domains',           # uint32[n_domains]: name string id
+    'categories',        # uint32[n_categories * 2]: name string id, domain id
+    'entities',          # uint32[n_entities * 2]: name string id, category id
+    'keys',              # uint32[n_keys * 2]: normalized key string id, entity id (sorted by key bytes)
+    'mappings',          # uint32[n_mappings * 4]: source entity, target entity, relationship type, mapping source
+    'mapping_scores',    # float32[n_mappings]: confidence scores, aligned with mappings
+    'mapping_by_target', # uint32[n_mappings]: mapping ids ordered by target entity
+]
+
+HEADER = struct.Struct('<8sII')
+SECTION_ENTRY = struct.Struct('<QQ')
+
+def normalize_key(text: str) -> str:
+    """Normalize entity text for binary-search lookups"""
+    text = text.casefold().replace('-', ' ').replace('_', ' ')
+    return re.sub(r'\s+', ' ', text).strip()
+
+def _little_endian(values: array) -> bytes:
+    """Serialize a numeric array as little-endian bytes"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def encode_binary_dictionary(domains: Dict[str, Dict[str, List[str]]], mappings: List[Dict],
+                             metadata: Dict) -> Tuple[bytes, Dict[str, int]]:
+    """Encode entities and mappings of all domains into binary dictionary bytes"""
+    strings = []
+    string_ids = {}
+
+    def intern(value: str) -> int:
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    domain_rows = array('I')
+    category_rows = array('I')
+    entity_rows = array('I')
+    category_ids = {}
+    entity_ids = {}
+    keys = []
+
+    for domain_id, (domain, categories) in enumerate(domains.items()):
+        domain_rows.append(intern(domain))
+        for category, entities in categories.items():
+            category_id = len(category_rows) // 2
+            category_ids[(domain, category)] = category_id
+            category_rows.extend((intern(category), domain_id))
+            for entity in entities:
+                entity_id = len(entity_rows) // 2
+                entity_ids[(domain, category, entity)] = entity_id
+                entity_rows.extend((intern(entity), category_id))
+                keys.append((normalize_key(entity).encode('utf-8'), entity_id))
+
+    keys.sort()
+    key_rows = array('I')
+    for key, entity_id in keys:
+        key_rows.extend((intern(key.decode('utf-8')), entity_id))
+
+    # Resolve mappings to entity ids, ordered by source entity for range lookups
+    resolved = []
+    for mapping in mappings:
+        source = entity_ids.get(('renewable_energy', mapping.get('renewable_energy_category'),
+                                 mapping.get('renewable_energy_entity')))
+        target = entity_ids.get(('green_logistics', mapping.get('green_logistics_category'),
+                                 mapping.get('green_logistics_entity')))
+        if source is None or target is None:
+            continue
+        resolved.append((source, target,
+                         intern(mapping.get('relationship_type', 'unknown')),
+                         intern(mapping.get('mapping_source', 'unknown')),
+                         float(mapping.get('confidence_score', 0.0))))
+    resolved.sort()
+
+    mapping_rows = array('I')
+    mapping_scores = array('f')
+    for source, target, rel_type, mapping_source, score in resolved:
+        mapping_rows.extend((source, target, rel_type, mapping_source))
+        mapping_scores.append(score)
+    mapping_by_target = array('I', sorted(range(len(resolved)), key=lambda i: (resolved[i][1], i)))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = array('I', [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    payloads = {
+        'metadata': json.dumps(metadata, sort_keys=True).encode('utf-8'),
+        'string_offsets': _little_endian(string_offsets),
+        'string_data': b''.join(encoded),
+        'domains': _little_endian(domain_rows),
+        'categories': _little_endian(category_rows),
+        'entities': _little_endian(entity_rows),
+        'keys': _little_endian(key_rows),
+        'mappings': _little_endian(mapping_rows),
+        'mapping_scores': _little_endian(mapping_scores),
+        'mapping_by_target': _little_endian(mapping_by_target),
+    }
+
+    offset = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    table = []
+    body = []
+    for name in SECTIONS:
+        padding = (-offset) % ALIGNMENT
+        body.append(b'\0' * padding)
+        offset += padding
+        table.append(SECTION_ENTRY.pack(offset, len(payloads[name])))
+        body.append(payloads[name])
+        offset += len(payloads[name])
+
+    data = HEADER.pack(MAGIC, FORMAT_VERSION, len(SECTIONS)) + b''.join(table) + b''.join(body)
+    return data, {
+        'strings': len(strings),
+        'entities': len(entity_rows) // 2,
+        'mappings': len(resolved),
+        'bytes': len(data)
+    }
+
+def write_binary_dictionary(path: str, domains: Dict[str, Dict[str, List[str]]],
+                            mappings: List[Dict], metadata: Dict) -> Dict[str, int]:
+    """Write entities and mappings of all domains to one binary dictionary file"""
+    data, stats = encode_binary_dictionary(domains, mappings, metadata)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return stats
+
+class BinaryDictionaryV2:
+    """Read-only, memory-mapped view over a binary dictionary file"""
+
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            raise ValueError("Binary dictionaries can only be memory-mapped on little-endian hosts")
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic, version, n_sections = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary NER dictionary")
+        if version != FORMAT_VERSION or n_sections != len(SECTIONS):
+            raise ValueError(f"Unsupported binary dictionary version {version} in {path}")
+
+        self._sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(self._mm, HEADER.size + i * SECTION_ENTRY.size)
+            self._sections[name] = (offset, length)
+
+        # Zero-copy typed views into the mapped file
+        self._string_offsets = self._array('string_offsets', 'I')
+        self._string_base = self._sections['string_data'][0]
+        self._domains = self._array('domains', 'I')
+        self._categories = self._array('categories', 'I')
+        self._entities = self._array('entities', 'I')
+        self._keys = self._array('keys', 'I')
+        self._mappings = self._array('mappings', 'I')
+        self._mapping_scores = self._array('mapping_scores', 'f')
+        self._mapping_by_target = self._array('mapping_by_target', 'I')
+
+        self._key_ids = self._keys[0::2]
+        self._mapping_sources = self._mappings[0::4]
+        self._metadata = None
+
+    def _array(self, name: str, typecode: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[offset:offset + length].cast(typecode)
+
+    def close(self):
+        """Release the memory map"""
+        views = [self._key_ids, self._mapping_sources, self._string_offsets, self._domains,
+                 self._categories, self._entities, self._keys, self._mappings,
+                 self._mapping_scores, self._mapping_by_target, self._view]
+        for view in views:
+            view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def metadata(self) -> Dict:
+        """Shared metadata, parsed on first access"""
+        if self._metadata is None:
+            offset, length = self._sections['metadata']
+            self._metadata = json.loads(self._mm[offset:offset + length].decode('utf-8'))
+        return self._metadata
+
+    def __len__(self) -> int:
+        return len(self._entities) // 2
+
+    @property
+    def mapping_count(self) -> int:
+        return len(self._mapping_scores)
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        start = self._string_base + self._string_offsets[string_id]
+        end = self._string_base + self._string_offsets[string_id + 1]
+        return self._mm[start:end]
+
+    def string(self, string_id: int) -> str:
+        return self._string_bytes(string_id).decode('utf-8')
+
+    def entity(self, entity_id: int) -> Tuple[str, str, str]:
+        """Return (entity, category, domain) for an entity id"""
+        name_id = self._entities[2 * entity_id]
+        category_id = self._entities[2 * entity_id + 1]
+        category_name_id = self._categories[2 * category_id]
+        domain_id = self._categories[2 * category_id + 1]
+        return self.string(name_id), self.string(category_name_id), self.string(self._domains[domain_id])
+
+    def _key_bytes(self, index: int) -> bytes:
+        return self._string_bytes(self._key_ids[index])
+
+    def lookup_ids(self, text: str) -> List[int]:
+        """Binary-search the normalized key array and return matching entity ids"""
+        key = normalize_key(text).encode('utf-8')
+        lo, hi = 0, len(self._key_ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        entity_ids = []
+        while lo < len(self._key_ids) and self._key_bytes(lo) == key:
+            entity_ids.append(self._keys[2 * lo + 1])
+            lo += 1
+        return entity_ids
+
+    def lookup(self, text: str) -> List[Tuple[str, str, str]]:
+        """Return (entity, category, domain) for every entity matching the text"""
+        return [self.entity(entity_id) for entity_id in self.lookup_ids(text)]
+
+    def _mapping(self, mapping_id: int) -> Dict:
+        row = 4 * mapping_id
+        source, target, rel_type, mapping_source = self._mappings[row:row + 4]
+        source_name, source_category, _ = self.entity(source)
+        target_name, target_category, _ = self.entity(target)
+        return {
+            'renewable_energy_entity': source_name,
+            'renewable_energy_category': source_category,
+            'green_logistics_entity': target_name,
+            'green_logistics_category': target_category,
+            'relationship_type': self.string(rel_type),
+            'confidence_score': self._mapping_scores[mapping_id],
+            'mapping_source': self.string(mapping_source)
+        }
+
+    def mappings_for_id(self, entity_id: int) -> List[Dict]:
+        """Return cross-domain mappings in which the entity id is source or target"""
+        results = []
+        start = bisect_left(self._mapping_sources, entity_id)
+        while start < len(self._mapping_sources) and self._mapping_sources[start] == entity_id:
+            results.append(self._mapping(start))
+            start += 1
+
+        lo, hi = 0, len(self._mapping_by_target)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._mappings[4 * self._mapping_by_target[mid] + 1] < entity_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < len(self._mapping_by_target) and self._mappings[4 * self._mapping_by_target[lo] + 1] == entity_id:
+            results.append(self._mapping(self._mapping_by_target[lo]))
+            lo += 1
+        return results
+
+    def mappings_for(self, text: str) -> List[Dict]:
+        """Return cross-domain mappings for every entity matching the text"""
+        results = []
+        for entity_id in self.lookup_ids(text):
+            results.extend(self.mappings_for_id(entity_id))
+        return results
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data/final/v2_dictionaries.bin'
+    with BinaryDictionaryV2(path) as dictionary:
+        print(f"{path}: {len(dictionary)} entities, {dictionary.mapping_count} mappings")
+        for query in sys.argv[2:]:
+            for entity_id in dictionary.lookup_ids(query):
+                entity, category, domain = dictionary.entity(entity_id)
+                print(f"  {query!r} -> {entity} [{category}, {domain}]")
+                for mapping in dictionary.mappings_for_id(entity_id):
+                    print(f"    {mapping['renewable_energy_entity']} -> {mapping['green_logistics_entity']} "
+                          f"({mapping['relationship_type']}, {mapping['confidence_score']:.2f})")
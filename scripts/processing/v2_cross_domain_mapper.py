@@ -6,13 +6,25 @@ Maps relationships between renewable energy and green logistics entities
 
 import json
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'runtime'))
+
+from v2_alias_table import AliasTableV2
+from v2_fuzzy_matcher import FuzzyMatch, FuzzyMatcherV2
+from v2_instrumentation import StageMetricsV2
+from v2_sqlite_store import EntityStoreV2, configured_store
 
 class CrossDomainMapperV2:
     def __init__(self):
         self.mappings = []
         self.relationships = []
+        self.fuzzy_matcher = None
+        self.re_aliases = AliasTableV2()
+        self.gl_aliases = AliasTableV2()
+        self.metrics = StageMetricsV2('cross_domain_mapper')
         
         # Enhanced mapping rules for better cross-domain connections
         self.mapping_rules = {
@@ -57,16 +69,39 @@ class CrossDomainMapperV2:
             }
         }
 
-    def load_entities(self):
-        """Load v2 entity data"""
-        with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
-            self.re_entities = json.load(f)
+    def load_entities(self, re_entities: Optional[Dict[str, List[str]]] = None,
+                      gl_entities: Optional[Dict[str, List[str]]] = None):
+        """Load v2 entity data (in-memory scraper output skips the data/raw round-trip)"""
+        if re_entities is None:
+            with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
+                re_entities = json.load(f)
+        if gl_entities is None:
+            with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
+                gl_entities = json.load(f)
+        # Mappings are generated between canonical entities only; aliases resolve to them downstream
+        self.re_aliases = AliasTableV2.from_entities(re_entities)
+        self.gl_aliases = AliasTableV2.from_entities(gl_entities)
+        self.re_entities = self.re_aliases.canonical_entities(re_entities)
+        self.gl_entities = self.gl_aliases.canonical_entities(gl_entities)
         
-        with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
-            self.gl_entities = json.load(f)
+        # Typo/variant-tolerant index over GL entities ("Photo-voltaic", "Co₂", "Iso14001")
+        self.fuzzy_matcher = FuzzyMatcherV2.from_entities(
+            (gl_entity, gl_category)
+            for gl_category, gl_entities in self.gl_entities.items()
+            for gl_entity in gl_entities
+        )
 
-    def find_semantic_matches(self, re_entity: str, gl_entities: List[str]) -> List[Tuple[str, float]]:
-        """Find semantic matches between entities"""
+    def fuzzy_matches_by_category(self, re_entity: str) -> Dict[str, List[FuzzyMatch]]:
+        """Every fuzzy match of an RE entity, grouped by GL category, from a single unlimited query"""
+        grouped = {}
+        if self.fuzzy_matcher is not None:
+            for fuzzy_match in self.fuzzy_matcher.match(re_entity, limit=None):
+                grouped.setdefault(fuzzy_match.payload, []).append(fuzzy_match)
+        return grouped
+
+    def find_semantic_matches(self, re_entity: str, gl_entities: List[str],
+                              fuzzy_matches: Optional[List[FuzzyMatch]] = None) -> List[Tuple[str, float]]:
+        """Find semantic matches between entities (fuzzy_matches: those of this GL category, if already known)"""
         matches = []
         re_lower = re_entity.lower()
         
@@ -89,20 +124,38 @@ class CrossDomainMapperV2:
                     if similarity >= 0.3:
                         matches.append((gl_entity, similarity))
         
+        # Fuzzy fallback: spelling or formatting variants just below an exact match
+        if fuzzy_matches is None and self.fuzzy_matcher is not None:
+            fuzzy_matches = self.fuzzy_matcher.match(re_entity, limit=None)
+        if fuzzy_matches:
+            matched = {gl_entity for gl_entity, _ in matches}
+            candidates = set(gl_entities)
+            for fuzzy_match in fuzzy_matches:
+                if fuzzy_match.entity in candidates and fuzzy_match.entity not in matched:
+                    matches.append((fuzzy_match.entity, 0.95 * fuzzy_match.score))
+                    matched.add(fuzzy_match.entity)
+        
         return sorted(matches, key=lambda x: x[1], reverse=True)
 
     def apply_mapping_rules(self):
         """Apply predefined mapping rules"""
+        # Rule patterns may name an alias ("Ev"), so every surface form of an entity is checked
+        gl_forms = {
+            (gl_category, gl_entity): [form.lower() for form in self.gl_aliases.forms(gl_entity, gl_category)]
+            for gl_category, gl_entities in self.gl_entities.items() for gl_entity in gl_entities
+        }
         for rule_type, rules in self.mapping_rules.items():
             for re_pattern, gl_patterns in rules.items():
                 # Find matching RE entities
                 for re_category, re_entities in self.re_entities.items():
                     for re_entity in re_entities:
-                        if any(pattern.lower() in re_entity.lower() for pattern in [re_pattern]):
+                        re_forms = [form.lower() for form in self.re_aliases.forms(re_entity, re_category)]
+                        if any(re_pattern.lower() in form for form in re_forms):
                             # Find matching GL entities
                             for gl_category, gl_entities in self.gl_entities.items():
                                 for gl_entity in gl_entities:
-                                    if any(pattern.lower() in gl_entity.lower() for pattern in gl_patterns):
+                                    if any(pattern.lower() in form for pattern in gl_patterns
+                                           for form in gl_forms[(gl_category, gl_entity)]):
                                         self.mappings.append({
                                             'renewable_energy_entity': re_entity,
                                             'renewable_energy_category': re_category,
@@ -113,24 +166,36 @@ class CrossDomainMapperV2:
                                             'mapping_source': 'rule_based'
                                         })
 
+    def re_items(self) -> List[Tuple[str, str]]:
+        """(category, entity) for every RE entity, in the order semantic matching visits them"""
+        return [(re_category, re_entity)
+                for re_category, re_entities in self.re_entities.items() for re_entity in re_entities]
+
+    def semantic_mappings_for(self, re_items: List[Tuple[str, str]]) -> List[Dict]:
+        """Semantic similarity mappings of a slice of RE entities against every GL entity"""
+        mappings = []
+        for re_category, re_entity in re_items:
+            # One fuzzy query per RE entity, so other categories' hits cannot crowd out this category's
+            fuzzy_matches = self.fuzzy_matches_by_category(re_entity)
+            for gl_category, gl_entities in self.gl_entities.items():
+                matches = self.find_semantic_matches(re_entity, gl_entities, fuzzy_matches.get(gl_category, []))
+                
+                for gl_entity, similarity in matches[:3]:  # Top 3 matches
+                    if similarity >= 0.5:  # Minimum threshold
+                        mappings.append({
+                            'renewable_energy_entity': re_entity,
+                            'renewable_energy_category': re_category,
+                            'green_logistics_entity': gl_entity,
+                            'green_logistics_category': gl_category,
+                            'relationship_type': 'semantic_similarity',
+                            'confidence_score': similarity,
+                            'mapping_source': 'semantic_analysis'
+                        })
+        return mappings
+
     def generate_semantic_mappings(self):
         """Generate mappings using semantic similarity"""
-        for re_category, re_entities in self.re_entities.items():
-            for re_entity in re_entities:
-                for gl_category, gl_entities in self.gl_entities.items():
-                    matches = self.find_semantic_matches(re_entity, gl_entities)
-                    
-                    for gl_entity, similarity in matches[:3]:  # Top 3 matches
-                        if similarity >= 0.5:  # Minimum threshold
-                            self.mappings.append({
-                                'renewable_energy_entity': re_entity,
-                                'renewable_energy_category': re_category,
-                                'green_logistics_entity': gl_entity,
-                                'green_logistics_category': gl_category,
-                                'relationship_type': 'semantic_similarity',
-                                'confidence_score': similarity,
-                                'mapping_source': 'semantic_analysis'
-                            })
+        self.mappings.extend(self.semantic_mappings_for(self.re_items()))
 
     def create_relationship_matrix(self):
         """Create relationship matrix for analysis"""
@@ -157,41 +222,71 @@ class CrossDomainMapperV2:
         
         self.mappings = unique_mappings
 
-    def generate_mappings(self):
-        """Generate all cross-domain mappings"""
+    def generate_mappings(self, re_entities: Optional[Dict[str, List[str]]] = None,
+                          gl_entities: Optional[Dict[str, List[str]]] = None,
+                          semantic_mappings: Optional[List[Dict]] = None) -> List[Dict]:
+        """Generate all cross-domain mappings (semantic ones may be precomputed, e.g. by distributed workers)"""
+        # Each call starts from scratch, so a reused mapper does not accumulate earlier results
+        self.mappings = []
+        self.relationships = []
         print("Loading v2 entity data...")
-        self.load_entities()
+        with self.metrics.step('load') as step:
+            self.load_entities(re_entities, gl_entities)
+            step['items'] = sum(len(v) for v in self.re_entities.values()) + \
+                sum(len(v) for v in self.gl_entities.values())
+        re_count = sum(len(v) for v in self.re_entities.values())
         
         print("Applying mapping rules...")
-        self.apply_mapping_rules()
+        with self.metrics.step('rule_matching', items=re_count):
+            self.apply_mapping_rules()
+        self.metrics.count('rule_mappings', len(self.mappings))
         
         print("Generating semantic mappings...")
-        self.generate_semantic_mappings()
+        with self.metrics.step('similarity', items=re_count):
+            if semantic_mappings is None:
+                self.generate_semantic_mappings()
+            else:
+                self.mappings.extend(semantic_mappings)
         
         print("Removing duplicates...")
-        self.remove_duplicates()
+        with self.metrics.step('dedupe', items=len(self.mappings)):
+            self.remove_duplicates()
         
         print("Creating relationship matrix...")
-        self.create_relationship_matrix()
+        with self.metrics.step('relationship_matrix', items=len(self.mappings)):
+            self.create_relationship_matrix()
+        self.metrics.count('mappings', len(self.mappings))
+        self.metrics.count('alias_groups', self.re_aliases.stats()['alias_groups'] +
+                           self.gl_aliases.stats()['alias_groups'])
         
         print(f"Generated {len(self.mappings)} cross-domain mappings")
+        return self.mappings
 
-    def save_results(self):
-        """Save mapping results"""
-        os.makedirs('data/processed', exist_ok=True)
+    def save_results(self, output_dir: str = 'data/processed', store: Optional[EntityStoreV2] = None):
+        """Save mapping results (mirrored to the SQLite store if given)"""
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Save detailed mappings
-        with open('data/processed/v2_cross_domain_mappings.json', 'w') as f:
-            json.dump(self.mappings, f, indent=2)
-        
-        # Save relationship matrix as CSV
-        df = pd.DataFrame(self.relationships)
-        df.to_csv('data/processed/v2_entity_relationships.csv', index=False)
+        with self.metrics.step('write', items=len(self.mappings)):
+            # Save detailed mappings
+            with open(os.path.join(output_dir, 'v2_cross_domain_mappings.json'), 'w') as f:
+                json.dump(self.mappings, f, indent=2)
+            
+            # Save relationship matrix as CSV
+            df = pd.DataFrame(self.relationships)
+            df.to_csv(os.path.join(output_dir, 'v2_entity_relationships.csv'), index=False)
+            
+            if store is not None:
+                store.replace_mappings(self.mappings)
         
         print(f"Saved mappings to v2_cross_domain_mappings.json")
         print(f"Saved relationships to v2_entity_relationships.csv")
 
 if __name__ == "__main__":
     mapper = CrossDomainMapperV2()
-    mapper.generate_mappings()
-    mapper.save_results()
+    store = configured_store()
+    if store is not None and store.has_entities():
+        mapper.generate_mappings(store.load_entities('renewable_energy'), store.load_entities('green_logistics'))
+    else:
+        mapper.generate_mappings()
+    mapper.save_results(store=store)
+    mapper.metrics.save()
@@ -4,17 +4,270 @@ Enhanced Final Dictionary Generator v2
 Creates publication-ready NER dictionaries with comprehensive metadata
 """
 
+import hashlib
 import json
 import os
+import re
+import sys
+import tempfile
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'runtime'))
+
+from v2_alias_table import AliasTableV2
+from v2_binary_dictionary import encode_binary_dictionary
+from v2_dictionary_lookup import iter_mappings
+from v2_dictionary_releases import RELEASE_DIR, RELEASE_LOG, delta_counts, load_release_log
+from v2_instrumentation import StageMetricsV2, load_stage_metrics, summarize_metrics
+from v2_sqlite_store import EntityStoreV2, configured_store
+
+INPUT_FILES = [
+    'data/raw/v2_renewable_energy_entities.json',
+    'data/raw/v2_green_logistics_entities.json',
+    'data/processed/v2_cross_domain_mappings.json',
+    'data/processed/v2_semantic_validation_results.json'
+]
+
+# Cross-domain mappings are streamed into size-bounded JSONL shards per relationship type
+MAPPING_SHARD_DIR = 'v2_cross_domain_mappings'
+SHARD_INDEX_FILE = 'index.json'
+DEFAULT_MAX_SHARD_BYTES = 4 * 1024 * 1024
+SHARD_NAME_RE = re.compile(r'\W+')
+
+DOMAIN_DICTIONARIES = {
+    'renewable_energy': 'v2_renewable_energy_services_dictionary.json',
+    'green_logistics': 'v2_green_logistics_dictionary.json'
+}
+
+# Deltas kept in the release log; consumers further behind reload in full
+MAX_RELEASE_DELTAS = 50
+# Build metrics live next to the stage metrics, outside the published (byte-stable) outputs
+BUILD_SUMMARY_FILE = 'v2_build_summary.json'
+
+def sha256_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of a byte string"""
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path: str) -> Optional[str]:
+    """SHA-256 hex digest of a file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def published_mode(path: str) -> int:
+    """Permissions for a published file: those of the file it replaces, else the umask default"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Write a file via a temporary sibling and rename, so readers never see partial output"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        # mkstemp creates the file 0600; published files keep the usual permissions
+        os.fchmod(fd, published_mode(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def mapping_line(mapping: Dict) -> str:
+    """Compact JSON of a mapping, as stored in the shards"""
+    return json.dumps(mapping, separators=(',', ':'), default=float)
+
+def mapping_key(mapping: Dict) -> Tuple[str, str]:
+    """Identity of a mapping (the mapper keeps one mapping per entity pair)"""
+    return mapping['renewable_energy_entity'], mapping['green_logistics_entity']
+
+def entity_table(dictionaries: Dict[str, Dict]) -> Dict[Tuple[str, str, str], str]:
+    """(domain, category, entity) -> canonical entity across the domain dictionaries of a build"""
+    table = {}
+    for domain, filename in DOMAIN_DICTIONARIES.items():
+        dictionary = dictionaries.get(filename) or {}
+        canonical_of = {
+            (category, alias): canonical
+            for category, groups in dictionary.get('aliases', {}).items()
+            for canonical, group in groups.items() for alias in group['aliases']
+        }
+        for category, entity_list in dictionary.get('entities', {}).items():
+            for entity in entity_list:
+                table[(domain, category, entity)] = canonical_of.get((category, entity), entity)
+    return table
+
+def compute_release_delta(previous_entities: Dict[Tuple[str, str, str], str],
+                          entities: Dict[Tuple[str, str, str], str],
+                          previous_mappings: Iterable[Dict], mappings: Iterable[Dict]) -> Dict:
+    """Added, removed and changed entities and mappings between two builds"""
+    delta = {
+        'entities': {
+            'added': [[*key, canonical] for key, canonical in entities.items() if key not in previous_entities],
+            'removed': [list(key) for key in previous_entities if key not in entities],
+            'changed': [[*key, canonical] for key, canonical in entities.items()
+                        if key in previous_entities and previous_entities[key] != canonical]
+        },
+        'mappings': {'added': [], 'removed': [], 'changed': []}
+    }
+
+    # Compared in their stored serialization, so float formatting cannot produce spurious changes
+    previous_lines = {mapping_key(mapping): mapping_line(mapping) for mapping in previous_mappings}
+    current_keys = set()
+    for mapping in mappings:
+        key = mapping_key(mapping)
+        current_keys.add(key)
+        line = mapping_line(mapping)
+        previous = previous_lines.get(key)
+        if previous is None:
+            delta['mappings']['added'].append(json.loads(line))
+        elif previous != line:
+            delta['mappings']['changed'].append(json.loads(line))
+    delta['mappings']['removed'] = [list(key) for key in previous_lines if key not in current_keys]
+    return delta
+
+def relationship_type_stats(mappings: Iterable[Dict]) -> Dict[str, Dict]:
+    """Count and average confidence per relationship type, in one pass and first-seen order"""
+    totals = {}
+    for mapping in mappings:
+        total = totals.setdefault(mapping.get('relationship_type', 'unknown'), [0, 0.0])
+        total[0] += 1
+        total[1] += mapping.get('confidence_score', 0)
+    return stats_from_totals(totals)
+
+def stats_from_totals(totals: Dict[str, List]) -> Dict[str, Dict]:
+    """Relationship type stats from [count, confidence sum] totals"""
+    return {
+        rel_type: {
+            'description': f'Mappings of type: {rel_type}',
+            'count': count,
+            'avg_confidence': confidence / count
+        }
+        for rel_type, (count, confidence) in totals.items()
+    }
+
+class MappingShardWriterV2:
+    """Streams mappings into compact JSONL shards per relationship type, plus an index of shard ranges"""
+
+    def __init__(self, directory: str, max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES):
+        self.directory = directory
+        self.max_shard_bytes = max_shard_bytes
+        self.buffers = {}       # relationship type -> [encoded lines, bytes, first position, last position, type offset]
+        self.totals = {}        # relationship type -> [count, confidence sum]
+        self.shards = []
+        self.type_shards = {}   # relationship type -> shard file names
+        self.written = []
+        self.skipped = []
+        self.position = 0
+        self.index_digest = None
+
+    def add(self, mapping: Dict):
+        rel_type = mapping.get('relationship_type', 'unknown')
+        line = mapping_line(mapping).encode('utf-8') + b'\n'
+        buffer = self.buffers.get(rel_type)
+        if buffer is not None and buffer[0] and buffer[1] + len(line) > self.max_shard_bytes:
+            self._flush(rel_type)
+            buffer = None
+        if buffer is None:
+            buffer = self.buffers[rel_type] = [[], 0, self.position, self.position,
+                                               self.totals.get(rel_type, [0])[0]]
+        buffer[0].append(line)
+        buffer[1] += len(line)
+        buffer[3] = self.position
+        total = self.totals.setdefault(rel_type, [0, 0.0])
+        total[0] += 1
+        total[1] += mapping.get('confidence_score', 0)
+        self.position += 1
+
+    def type_stats(self) -> Dict[str, Dict]:
+        """Count and average confidence per relationship type of the mappings added so far"""
+        return stats_from_totals(self.totals)
+
+    def _flush(self, rel_type: str):
+        lines, size, first, last, type_offset = self.buffers.pop(rel_type)
+        data = b''.join(lines)
+        type_shards = self.type_shards.setdefault(rel_type, [])
+        digest = sha256_bytes(data)
+        # Named by content: a changed shard is a new file, so shards listed by the previous index stay intact
+        filename = f"{SHARD_NAME_RE.sub('_', rel_type)}-{len(type_shards):05d}-{digest[:16]}.jsonl"
+        type_shards.append(filename)
+        path = os.path.join(self.directory, filename)
+        if sha256_file(path) == digest:
+            self.skipped.append(filename)
+        else:
+            atomic_write_bytes(path, data)
+            self.written.append(filename)
+        self.shards.append({
+            'file': filename,
+            'relationship_type': rel_type,
+            'count': len(lines),
+            'type_offset': type_offset,     # index of the first mapping among mappings of its type
+            'first_position': first,        # range in the original mapping order
+            'last_position': last,
+            'bytes': size,
+            'sha256': digest
+        })
+
+    def close(self) -> Dict:
+        """Flush open shards, swap in the new index, then drop shards it no longer lists; returns the index"""
+        for rel_type in list(self.buffers):
+            self._flush(rel_type)
+        os.makedirs(self.directory, exist_ok=True)
+
+        index = {
+            'format': 'jsonl',
+            'max_shard_bytes': self.max_shard_bytes,
+            'total_mappings': self.position,
+            'relationship_types': {
+                rel_type: {
+                    'count': count,
+                    'avg_confidence': confidence / count,
+                    'shards': self.type_shards[rel_type]
+                }
+                for rel_type, (count, confidence) in self.totals.items()
+            },
+            'shards': self.shards
+        }
+        data = json.dumps(index, indent=2).encode('utf-8')
+        self.index_digest = {'sha256': sha256_bytes(data), 'bytes': len(data)}
+        if sha256_file(os.path.join(self.directory, SHARD_INDEX_FILE)) == self.index_digest['sha256']:
+            self.skipped.append(SHARD_INDEX_FILE)
+        else:
+            atomic_write_bytes(os.path.join(self.directory, SHARD_INDEX_FILE), data)
+            self.written.append(SHARD_INDEX_FILE)
+
+        # Only after the swap: until then readers of the previous index still open its shards
+        current = {shard['file'] for shard in self.shards}
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.jsonl') and filename not in current:
+                os.remove(os.path.join(self.directory, filename))
+        return index
 
 class DictionaryGeneratorV2:
-    def __init__(self):
+    def __init__(self, output_dir: str = 'data/final', max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES):
+        self.output_dir = output_dir
+        self.max_shard_bytes = max_shard_bytes
+        self.manifest_path = os.path.join(output_dir, 'v2_manifest.json')
         self.re_entities = {}
         self.logistics_entities = {}
         self.cross_mappings = []
         self.validation_results = {}
+        self.input_hashes = None
+        self.binary_stats = {}
+        self.metrics = StageMetricsV2('dictionary_generator')
+        self.stage_metrics = {}     # upstream stage metrics summarized in the build summary
         
         # Enhanced metadata
         self.metadata = {
@@ -40,31 +293,67 @@ class DictionaryGeneratorV2:
     
     def load_processed_data(self):
         """Load validated and processed entity data"""
-        # Load v2 renewable energy entities
-        with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
-            self.re_entities = json.load(f)
-        
-        # Load v2 green logistics entities
-        with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
-            self.logistics_entities = json.load(f)
-        
-        # Load v2 cross-domain mappings
-        try:
-            with open('data/processed/v2_cross_domain_mappings.json', 'r') as f:
-                self.cross_mappings = json.load(f)
-        except FileNotFoundError:
-            print("Warning: v2_cross_domain_mappings.json not found. Run v2_cross_domain_mapper.py first.")
-            self.cross_mappings = []
-        
-        # Load v2 validation results
-        try:
-            with open('data/processed/v2_semantic_validation_results.json', 'r') as f:
-                self.validation_results = json.load(f)
-        except FileNotFoundError:
-            print("Warning: v2_semantic_validation_results.json not found. Run v2_ai_semantic_validator.py first.")
-            self.validation_results = {}
-        
-        # Update total entities count
+        with self.metrics.step('load'):
+            # Load v2 renewable energy entities
+            with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
+                self.re_entities = json.load(f)
+            
+            # Load v2 green logistics entities
+            with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
+                self.logistics_entities = json.load(f)
+            
+            # Load v2 cross-domain mappings
+            try:
+                with open('data/processed/v2_cross_domain_mappings.json', 'r') as f:
+                    self.cross_mappings = json.load(f)
+            except FileNotFoundError:
+                print("Warning: v2_cross_domain_mappings.json not found. Run v2_cross_domain_mapper.py first.")
+                self.cross_mappings = []
+            
+            # Load v2 validation results
+            try:
+                with open('data/processed/v2_semantic_validation_results.json', 'r') as f:
+                    self.validation_results = json.load(f)
+            except FileNotFoundError:
+                print("Warning: v2_semantic_validation_results.json not found. Run v2_ai_semantic_validator.py first.")
+                self.validation_results = {}
+            
+            self.input_hashes = self.hash_inputs()
+        self.load_stage_metrics()
+        self.update_entity_count()
+
+    def load_from_store(self, store: EntityStoreV2):
+        """Load stage outputs from the SQLite store instead of data/raw and data/processed"""
+        with self.metrics.step('load'):
+            self.load_data(store.load_entities('renewable_energy'), store.load_entities('green_logistics'),
+                           store.load_mappings(), store.load_validation_results())
+        self.load_stage_metrics()
+
+    def load_stage_metrics(self):
+        """Saved metrics of the upstream stages, summarized in the build summary"""
+        self.stage_metrics = {
+            stage: metrics for stage, metrics in load_stage_metrics(self.metrics.metrics_dir).items()
+            if stage != self.metrics.stage
+        }
+
+    def load_data(self, re_entities: Dict[str, List[str]], logistics_entities: Dict[str, List[str]],
+                  cross_mappings: List[Dict], validation_results: Optional[Dict] = None):
+        """Use in-memory stage outputs instead of reading data/raw and data/processed"""
+        self.re_entities = re_entities
+        self.logistics_entities = logistics_entities
+        self.cross_mappings = cross_mappings
+        self.validation_results = validation_results or {}
+
+        # Hash the serialization the stages would have written, so digests match the on-disk inputs
+        self.input_hashes = {
+            path: sha256_bytes(json.dumps(data, indent=2, default=float).encode('utf-8'))
+            for path, data in zip(INPUT_FILES, (re_entities, logistics_entities, cross_mappings,
+                                                self.validation_results))
+        }
+        self.update_entity_count()
+
+    def update_entity_count(self):
+        """Update total entities count"""
         self.metadata['total_entities'] = (
             sum(len(entities) for entities in self.re_entities.values()) +
             sum(len(entities) for entities in self.logistics_entities.values())
@@ -112,6 +401,11 @@ class DictionaryGeneratorV2:
             'quality_assessment': self.validation_results.get('quality_assessment', {})
         }
         
+        # Canonical form and aliases per variant group, so consumers can resolve mappings for any surface form
+        aliases = AliasTableV2.from_entities(self.re_entities).to_dict()
+        if aliases:
+            dictionary['aliases'] = aliases
+        
         return dictionary
     
     def create_green_logistics_dictionary(self) -> Dict:
@@ -156,24 +450,27 @@ class DictionaryGeneratorV2:
             'quality_assessment': self.validation_results.get('quality_assessment', {})
         }
         
+        # Canonical form and aliases per variant group, so consumers can resolve mappings for any surface form
+        aliases = AliasTableV2.from_entities(self.logistics_entities).to_dict()
+        if aliases:
+            dictionary['aliases'] = aliases
+        
         return dictionary
     
-    def create_cross_domain_dictionary(self) -> Dict:
-        """Create enhanced cross-domain mappings dictionary"""
-        # Organize mappings by relationship type
-        mappings_by_type = {}
-        for mapping in self.cross_mappings:
-            rel_type = mapping.get('relationship_type', 'unknown')
-            if rel_type not in mappings_by_type:
-                mappings_by_type[rel_type] = []
-            mappings_by_type[rel_type].append(mapping)
+    def create_cross_domain_dictionary(self, type_stats: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Create enhanced cross-domain mappings dictionary (mappings themselves live in the JSONL shards)
+
+        type_stats comes from the shard writer's streaming pass when the build is written to disk.
+        """
+        if type_stats is None:
+            type_stats = relationship_type_stats(self.cross_mappings)
         
         dictionary = {
             'dictionary_info': {
                 'name': 'Cross-Domain Mappings Dictionary v2',
                 'domain': 'Renewable Energy ↔ Green Logistics Relationships',
                 'total_mappings': len(self.cross_mappings),
-                'relationship_types': list(mappings_by_type.keys()),
+                'relationship_types': list(type_stats.keys()),
                 **self.metadata
             },
             'mapping_methodology': {
@@ -182,15 +479,12 @@ class DictionaryGeneratorV2:
                 'confidence_scoring': 'Numerical confidence scores for each mapping relationship',
                 'validation_process': 'Multi-stage validation using semantic analysis'
             },
-            'relationship_types': {
-                rel_type: {
-                    'description': f'Mappings of type: {rel_type}',
-                    'count': len(mappings),
-                    'avg_confidence': sum(m.get('confidence_score', 0) for m in mappings) / len(mappings) if mappings else 0
-                }
-                for rel_type, mappings in mappings_by_type.items()
+            'relationship_types': type_stats,
+            'mapping_shards': {
+                'format': 'jsonl',
+                'directory': MAPPING_SHARD_DIR,
+                'index': f'{MAPPING_SHARD_DIR}/{SHARD_INDEX_FILE}'
             },
-            'cross_domain_mappings': self.cross_mappings,
             'usage_guidelines': {
                 'rag_applications': 'Use for context-aware retrieval in sustainability consulting',
                 'ner_enhancement': 'Improve entity recognition across renewable energy and logistics',
@@ -201,27 +495,57 @@ class DictionaryGeneratorV2:
         
         return dictionary
     
-    def save_dictionaries(self):
-        """Save all enhanced dictionaries"""
-        os.makedirs('data/final', exist_ok=True)
-        
-        # Save renewable energy dictionary
-        re_dict = self.create_renewable_energy_dictionary()
-        with open('data/final/v2_renewable_energy_services_dictionary.json', 'w') as f:
-            json.dump(re_dict, f, indent=2)
-        
-        # Save green logistics dictionary
-        gl_dict = self.create_green_logistics_dictionary()
-        with open('data/final/v2_green_logistics_dictionary.json', 'w') as f:
-            json.dump(gl_dict, f, indent=2)
-        
-        # Save cross-domain mappings dictionary
-        cd_dict = self.create_cross_domain_dictionary()
-        with open('data/final/v2_cross_domain_mappings_dictionary.json', 'w') as f:
-            json.dump(cd_dict, f, indent=2)
-        
+    def hash_inputs(self) -> Dict[str, Optional[str]]:
+        """SHA-256 digests of every input file (None for missing optional inputs)"""
+        return {path: sha256_file(path) for path in INPUT_FILES}
+
+    def load_manifest(self) -> Dict:
+        """Load the manifest of the previous run, if any"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def write_outputs(self, outputs: Dict[str, bytes]) -> Tuple[List[str], List[str]]:
+        """Atomically write outputs whose content changed; return (written, skipped) file names"""
+        written, skipped = [], []
+        for filename, data in outputs.items():
+            path = os.path.join(self.output_dir, filename)
+            if sha256_file(path) == sha256_bytes(data):
+                skipped.append(filename)
+            else:
+                atomic_write_bytes(path, data)
+                written.append(filename)
+        return written, skipped
+
+    def build_dictionaries(self, type_stats: Optional[Dict[str, Dict]] = None) -> Dict[str, object]:
+        """Build every output in memory, keyed by output file name"""
+        dictionaries = {}
+
+        with self.metrics.step('build', items=self.metadata['total_entities']):
+            # Renewable energy dictionary
+            dictionaries['v2_renewable_energy_services_dictionary.json'] = self.create_renewable_energy_dictionary()
+
+            # Green logistics dictionary
+            dictionaries['v2_green_logistics_dictionary.json'] = self.create_green_logistics_dictionary()
+
+            # Cross-domain mappings dictionary
+            dictionaries['v2_cross_domain_mappings_dictionary.json'] = self.create_cross_domain_dictionary(type_stats)
+
+        # Compact binary artifact for memory-mapped lookups
+        with self.metrics.step('binary_encode', items=self.metadata['total_entities']):
+            dictionaries['v2_dictionaries.bin'], self.binary_stats = encode_binary_dictionary(
+                {
+                    'renewable_energy': self.re_entities,
+                    'green_logistics': self.logistics_entities
+                },
+                self.cross_mappings,
+                self.metadata
+            )
+
         # Create project summary
-        summary = {
+        dictionaries['v2_project_summary.json'] = {
             'project_overview': {
                 'title': 'Enhanced NER Dictionaries for Sustainable Technology Applications v2',
                 'total_entities': self.metadata['total_entities'],
@@ -231,29 +555,165 @@ class DictionaryGeneratorV2:
                 'data_sources': len(self.metadata['data_sources']),
                 'validation_status': self.metadata['validation_status']
             },
-            'dictionary_files': [
-                'v2_renewable_energy_services_dictionary.json',
-                'v2_green_logistics_dictionary.json', 
-                'v2_cross_domain_mappings_dictionary.json'
-            ],
+            'dictionary_files': list(dictionaries.keys()),
+            # Where the timings of the build went; a pointer only, so this summary stays byte-stable
+            'build_metrics_file': os.path.relpath(self.build_summary_path(), self.output_dir),
             'metadata': self.metadata,
             'validation_summary': self.validation_results.get('validation_summary', {})
         }
-        
-        with open('data/final/v2_project_summary.json', 'w') as f:
-            json.dump(summary, f, indent=2)
-        
+        return dictionaries
+
+    def build_summary_path(self) -> str:
+        return os.path.join(self.metrics.metrics_dir, BUILD_SUMMARY_FILE)
+
+    def save_build_summary(self) -> str:
+        """Write per-stage totals and slowest steps of this build to the metrics directory; returns its path
+
+        The generator's own steps are always included, upstream stages when their metrics exist.
+        """
+        path = self.build_summary_path()
+        os.makedirs(self.metrics.metrics_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(summarize_metrics({**self.stage_metrics, self.metrics.stage: self.metrics.as_dict()}), f,
+                      indent=2)
+        return path
+
+    def save_dictionaries(self) -> Dict[str, object]:
+        """Save all enhanced dictionaries"""
+        # Identical inputs keep the previous creation date so outputs stay byte-identical
+        input_hashes = self.input_hashes or self.hash_inputs()
+        previous = self.load_manifest()
+        if previous.get('inputs') == input_hashes and previous.get('creation_date'):
+            self.metadata['creation_date'] = previous['creation_date']
+
+        # One streaming pass writes the shards and gathers the per-type stats of the mappings dictionary
+        with self.metrics.step('shard_mappings', items=len(self.cross_mappings)):
+            shard_writer = MappingShardWriterV2(os.path.join(self.output_dir, MAPPING_SHARD_DIR),
+                                                self.max_shard_bytes)
+            for mapping in self.cross_mappings:
+                shard_writer.add(mapping)
+        dictionaries = self.build_dictionaries(shard_writer.type_stats())
+        # Diffed against the current release before its files are replaced (the old index is still in place)
+        release_log = load_release_log(self.output_dir)
+        delta = None
+        if release_log['latest']:
+            with self.metrics.step('release_delta', items=len(self.cross_mappings)):
+                delta = self.release_delta(dictionaries)
+        with self.metrics.step('shard_index'):
+            shard_index = shard_writer.close()
+        with self.metrics.step('serialize') as step:
+            outputs = {
+                filename: data if isinstance(data, bytes) else json.dumps(data, indent=2).encode('utf-8')
+                for filename, data in dictionaries.items()
+            }
+            step['items'] = sum(len(data) for data in outputs.values())
+        summary = dictionaries['v2_project_summary.json']
+        binary_stats = self.binary_stats
+
+        with self.metrics.step('write', items=len(outputs)):
+            written, skipped = self.write_outputs(outputs)
+        written += [f'{MAPPING_SHARD_DIR}/{filename}' for filename in shard_writer.written]
+        skipped += [f'{MAPPING_SHARD_DIR}/{filename}' for filename in shard_writer.skipped]
+        self.metrics.count('files_written', len(written))
+        self.metrics.count('files_skipped', len(skipped))
+        self.metrics.count('mapping_shards', len(shard_index['shards']))
+
+        # A new release only when entities or mappings changed; consumers skip metadata-only rebuilds
+        changed = delta is None or any(changes for changes in delta_counts(delta).values())
+        release_version = release_log['latest'] + 1 if changed else release_log['latest']
+
+        # Manifest of SHA-256 digests for cheap change detection by consumers
+        manifest = {
+            'algorithm': 'sha256',
+            'creation_date': self.metadata['creation_date'],
+            'release': release_version,
+            'inputs': input_hashes,
+            'outputs': {
+                **{filename: {'sha256': sha256_bytes(data), 'bytes': len(data)}
+                   for filename, data in outputs.items()},
+                **{f"{MAPPING_SHARD_DIR}/{shard['file']}": {'sha256': shard['sha256'], 'bytes': shard['bytes']}
+                   for shard in shard_index['shards']},
+                f'{MAPPING_SHARD_DIR}/{SHARD_INDEX_FILE}': shard_writer.index_digest
+            }
+        }
+        manifest_written, _ = self.write_outputs({
+            os.path.basename(self.manifest_path): json.dumps(manifest, indent=2).encode('utf-8')
+        })
+        # The release log is written last, so consumers never see a release before its files
+        if changed:
+            self.publish_release(release_log, delta)
+        build_summary_path = self.save_build_summary()
+
         print(f"Enhanced dictionaries saved successfully!")
         print(f"Total entities: {summary['project_overview']['total_entities']}")
         print(f"Renewable Energy: {summary['project_overview']['renewable_energy_entities']} entities")
         print(f"Green Logistics: {summary['project_overview']['green_logistics_entities']} entities")
-        print(f"Cross-domain mappings: {summary['project_overview']['cross_domain_mappings']}")
+        print(f"Cross-domain mappings: {summary['project_overview']['cross_domain_mappings']} "
+              f"in {len(shard_index['shards'])} shards under {MAPPING_SHARD_DIR}/")
+        print(f"Binary dictionary: {binary_stats['entities']} entities, {binary_stats['mappings']} mappings, "
+              f"{binary_stats['bytes']} bytes")
+        print(f"Wrote {len(written)} files, skipped {len(skipped)} unchanged"
+              f"{'' if manifest_written else ' (manifest unchanged)'}")
+        if changed and delta is not None:
+            print(f"Release {release_version}: " +
+                  ', '.join(f'{key} {count}' for key, count in delta_counts(delta).items() if count))
+        elif changed:
+            print(f"Release {release_version}: full release")
+        print(f"Build metrics: {build_summary_path}")
+        return dictionaries
+
+    def release_delta(self, dictionaries: Dict[str, object]) -> Dict:
+        """Entity and mapping changes of this build against the release in output_dir"""
+        previous = {}
+        for filename in DOMAIN_DICTIONARIES.values():
+            try:
+                with open(os.path.join(self.output_dir, filename), 'r') as f:
+                    previous[filename] = json.load(f)
+            except FileNotFoundError:
+                previous[filename] = {}
+        return compute_release_delta(entity_table(previous), entity_table(dictionaries),
+                                     iter_mappings(self.output_dir), self.cross_mappings)
+
+    def publish_release(self, release_log: Dict, delta: Optional[Dict]) -> Dict:
+        """Append a release, with its delta against the previous one, to the release log"""
+        release_dir = os.path.join(self.output_dir, RELEASE_DIR)
+        version = release_log['latest'] + 1
+        release = {
+            'version': version,
+            'creation_date': self.metadata['creation_date'],
+            'entities': self.metadata['total_entities'],
+            'mappings': len(self.cross_mappings),
+            'delta': None,
+            'changes': None
+        }
+        if delta is not None:
+            release['delta'] = f'delta-{version:05d}.json'
+            release['changes'] = delta_counts(delta)
+            atomic_write_bytes(os.path.join(release_dir, release['delta']), json.dumps(
+                {'from_version': version - 1, 'to_version': version, **delta}, separators=(',', ':')
+            ).encode('utf-8'))
+
+        releases = release_log['releases'] + [release]
+        for old in releases[:-MAX_RELEASE_DELTAS]:
+            if old['delta']:
+                path = os.path.join(release_dir, old['delta'])
+                if os.path.exists(path):
+                    os.remove(path)
+                old['delta'] = None
+        atomic_write_bytes(os.path.join(release_dir, RELEASE_LOG),
+                           json.dumps({'latest': version, 'releases': releases}, indent=2).encode('utf-8'))
+        return release
 
 if __name__ == "__main__":
     generator = DictionaryGeneratorV2()
     print("Generating enhanced final NER dictionaries v2...")
     
-    generator.load_processed_data()
+    store = configured_store()
+    if store is not None and store.has_entities():
+        generator.load_from_store(store)
+    else:
+        generator.load_processed_data()
     generator.save_dictionaries()
+    generator.metrics.save()
     
     print("Enhanced final dictionaries generated successfully!")
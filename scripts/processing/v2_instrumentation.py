@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Pipeline Instrumentation v2
+Wall/CPU time, peak RSS, item counts and throughput per stage and sub-step, with optional profiling hooks
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+METRICS_DIR = 'data/processed/metrics'
+
+# Per-stage profiler switch, e.g. V2_PROFILE="cross_domain_mapper=cprofile,semantic_validator=tracemalloc"
+PROFILE_ENV = 'V2_PROFILE'
+
+# Highest VmHWM seen before a step window reset it, so whole-run peaks survive per-step resets
+_process_peak = 0.0
+
+def rss_mb(field: str = 'VmRSS') -> float:
+    """Current (VmRSS) or peak (VmHWM) resident set size; ru_maxrss where /proc is unavailable"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+def _clear_peak_counter():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def _start_peak_window() -> float:
+    """Peak since the previous window; the kernel counter restarts from the current RSS"""
+    global _process_peak
+    peak = rss_mb('VmHWM')
+    _process_peak = max(_process_peak, peak)
+    _clear_peak_counter()
+    return peak
+
+def reset_peak_rss():
+    """Reset the peak RSS so the next peak_rss_mb() covers only what follows (Linux)"""
+    global _process_peak
+    _process_peak = 0.0
+    _clear_peak_counter()
+
+def peak_rss_mb() -> float:
+    """Peak RSS since the last reset_peak_rss(), including peaks of instrumented steps"""
+    return max(_process_peak, rss_mb('VmHWM'))
+
+def profile_mode(stage: str) -> Optional[str]:
+    """Profiler requested for a stage through V2_PROFILE ('all' matches every stage)"""
+    for item in os.environ.get(PROFILE_ENV, '').split(','):
+        name, _, mode = item.strip().partition('=')
+        if name in (stage, 'all') and mode in ('cprofile', 'tracemalloc'):
+            return mode
+    return None
+
+class StageMetricsV2:
+    """Collects timings, memory peaks and counts for one pipeline stage and its named sub-steps"""
+
+    def __init__(self, stage: str, metrics_dir: str = METRICS_DIR, profile: Optional[str] = None):
+        self.stage = stage
+        self.metrics_dir = metrics_dir
+        self.profile = profile if profile is not None else profile_mode(stage)
+        self.started = datetime.now().isoformat()
+        self.steps = {}     # step name -> aggregated record over all calls
+        self.counts = {}
+        self.active = []    # open step records, outermost first
+        self.result = None
+        self.profile_report = None
+
+        self.profiler = None
+        if self.profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profile == 'tracemalloc':
+            tracemalloc.start()
+
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.peak_rss = rss_mb()
+        _start_peak_window()
+
+    def _update_peaks(self):
+        """Fold the peak since the last reset into every open step, then start a new window"""
+        peak = _start_peak_window()
+        self.peak_rss = max(self.peak_rss, peak)
+        for record in self.active:
+            record['peak_rss_mb'] = max(record['peak_rss_mb'], peak)
+
+    @contextmanager
+    def step(self, name: str, items: Optional[int] = None):
+        """Time a sub-step; set record['items'] inside the block when the count is only known later"""
+        self._update_peaks()
+        record = {'items': items, 'peak_rss_mb': rss_mb()}
+        self.active.append(record)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            self._update_peaks()
+            self.active = [other for other in self.active if other is not record]
+
+            total = self.steps.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                 'items': 0, 'peak_rss_mb': 0.0})
+            total['calls'] += 1
+            total['wall_seconds'] += wall
+            total['cpu_seconds'] += cpu
+            total['items'] += record['items'] or 0
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], record['peak_rss_mb'])
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def _stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            path = os.path.join(self.metrics_dir, f'v2_{self.stage}.prof')
+            self.profiler.dump_stats(path)
+            listing = io.StringIO()
+            pstats.Stats(self.profiler, stream=listing).sort_stats('cumulative').print_stats(15)
+            self.profile_report = {'mode': 'cprofile', 'path': path, 'top_cumulative': listing.getvalue()}
+            self.profiler = None
+        elif self.profile == 'tracemalloc' and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.profile_report = {
+                'mode': 'tracemalloc',
+                'traced_peak_mb': traced_peak / (1024 * 1024),
+                'top_allocations': [
+                    {'location': str(stat.traceback), 'size_mb': stat.size / (1024 * 1024), 'blocks': stat.count}
+                    for stat in snapshot.statistics('lineno')[:15]
+                ]
+            }
+
+    def as_dict(self) -> Dict:
+        """Structured metrics (final once finish() has run)"""
+        if self.result is not None:
+            return self.result
+        self._update_peaks()
+        wall = time.perf_counter() - self.start_wall
+        return {
+            'stage': self.stage,
+            'started': self.started,
+            'wall_seconds': wall,
+            'cpu_seconds': time.process_time() - self.start_cpu,
+            'peak_rss_mb': self.peak_rss,
+            'counts': dict(self.counts),
+            'steps': {
+                name: {**record, 'items_per_second': record['items'] / record['wall_seconds']
+                       if record['items'] and record['wall_seconds'] > 0 else None}
+                for name, record in self.steps.items()
+            },
+            'profile': self.profile_report
+        }
+
+    def finish(self) -> Dict:
+        if self.result is None:
+            self._stop_profiler()
+            self.result = self.as_dict()
+        return self.result
+
+    def save(self) -> str:
+        """Write metrics JSON to the metrics directory; returns its path"""
+        metrics = self.finish()
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = os.path.join(self.metrics_dir, f'v2_{self.stage}_metrics.json')
+        with open(path, 'w') as f:
+            json.dump(metrics, f, indent=2)
+        print(f"{self.stage}: {metrics['wall_seconds']:.2f} s wall, {metrics['cpu_seconds']:.2f} s CPU, "
+              f"{metrics['peak_rss_mb']:.0f} MB peak RSS -> {path}")
+        return path
+
+def load_stage_metrics(metrics_dir: str = METRICS_DIR) -> Dict[str, Dict]:
+    """Latest saved metrics of every stage"""
+    metrics = {}
+    if not os.path.isdir(metrics_dir):
+        return metrics
+    for filename in sorted(os.listdir(metrics_dir)):
+        if filename.endswith('_metrics.json'):
+            with open(os.path.join(metrics_dir, filename), 'r') as f:
+                data = json.load(f)
+            metrics[data['stage']] = data
+    return metrics
+
+def summarize_metrics(metrics: Dict[str, Dict], top_steps: int = 3) -> Dict[str, Dict]:
+    """Compact per-stage totals with the slowest sub-steps, for the build summary"""
+    summary = {}
+    for stage, data in metrics.items():
+        slowest = sorted(data['steps'].items(), key=lambda item: item[1]['wall_seconds'], reverse=True)
+        summary[stage] = {
+            'started': data['started'],
+            'wall_seconds': round(data['wall_seconds'], 3),
+            'cpu_seconds': round(data['cpu_seconds'], 3),
+            'peak_rss_mb': round(data['peak_rss_mb'], 1),
+            'counts': data['counts'],
+            'slowest_steps': [
+                {'step': name, 'wall_seconds': round(record['wall_seconds'], 3), 'items': record['items']}
+                for name, record in slowest[:top_steps]
+            ]
+        }
+    return summary
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+SQLite Entity Store v2
+Indexed storage and query layer for entities, cross-domain mappings and validation results
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+STORE_PATH = 'data/processed/v2_entities.db'
+
+# Setting V2_STORE=<path> makes the stage scripts read their inputs from and mirror their outputs to the store
+STORE_ENV = 'V2_STORE'
+
+DOMAIN_FILES = {
+    'renewable_energy': 'data/raw/v2_renewable_energy_entities.json',
+    'green_logistics': 'data/raw/v2_green_logistics_entities.json'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    domain TEXT NOT NULL,
+    category TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    category_rank INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (domain, category, entity)
+);
+CREATE INDEX IF NOT EXISTS idx_entities_entity ON entities (entity);
+CREATE INDEX IF NOT EXISTS idx_entities_category ON entities (category);
+CREATE INDEX IF NOT EXISTS idx_entities_order ON entities (domain, category_rank, position);
+
+CREATE TABLE IF NOT EXISTS mappings (
+    id INTEGER PRIMARY KEY,
+    re_entity TEXT NOT NULL,
+    re_category TEXT NOT NULL,
+    gl_entity TEXT NOT NULL,
+    gl_category TEXT NOT NULL,
+    relationship_type TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mappings_re ON mappings (re_entity, re_category);
+CREATE INDEX IF NOT EXISTS idx_mappings_gl ON mappings (gl_entity, gl_category);
+CREATE INDEX IF NOT EXISTS idx_mappings_re_category ON mappings (re_category, confidence);
+CREATE INDEX IF NOT EXISTS idx_mappings_gl_category ON mappings (gl_category, confidence);
+CREATE INDEX IF NOT EXISTS idx_mappings_type ON mappings (relationship_type, confidence);
+CREATE INDEX IF NOT EXISTS idx_mappings_confidence ON mappings (confidence);
+
+CREATE TABLE IF NOT EXISTS entity_validation (
+    category TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    is_valid INTEGER NOT NULL,
+    quality REAL,
+    PRIMARY KEY (entity, category)
+);
+CREATE INDEX IF NOT EXISTS idx_validation_category ON entity_validation (category, is_valid, similarity);
+CREATE INDEX IF NOT EXISTS idx_validation_similarity ON entity_validation (similarity);
+
+CREATE TABLE IF NOT EXISTS duplicates (
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    entity1 TEXT NOT NULL,
+    entity2 TEXT NOT NULL,
+    similarity REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_duplicates_category ON duplicates (category, position);
+
+-- Aggregate validation sections (summary, per-category stats) as JSON
+CREATE TABLE IF NOT EXISTS reports (
+    name TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+"""
+
+MAPPING_COLUMNS = [
+    ('re_entity', 'renewable_energy_entity'),
+    ('re_category', 'renewable_energy_category'),
+    ('gl_entity', 'green_logistics_entity'),
+    ('gl_category', 'green_logistics_category'),
+    ('relationship_type', 'relationship_type'),
+    ('confidence', 'confidence_score'),
+    ('source', 'mapping_source')
+]
+
+class EntityStoreV2:
+    """SQLite backend (WAL mode) with bulk, transactional writes and indexed queries"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        # WAL lets readers query while a stage writes; NORMAL sync is durable at checkpoint granularity
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Writes: each call is one transaction; only the given domain/categories/types are replaced
+
+    def replace_entities(self, domain: str, entities: Dict[str, List[str]], full: bool = False):
+        """Replace the listed categories of a domain; other categories keep their entities and order
+
+        With full=True the given categories become the whole domain: categories missing from
+        entities (e.g. dropped by a scraper) are deleted as well.
+        """
+        with self.connection:
+            if full:
+                self.connection.execute('DELETE FROM entities WHERE domain = ?', (domain,))
+            ranks = dict(self.connection.execute(
+                'SELECT category, MIN(category_rank) FROM entities WHERE domain = ? GROUP BY category', (domain,)
+            ).fetchall())
+            if set(ranks) <= set(entities):
+                ranks = {}    # full replacement: categories take the order given
+            for category in entities:
+                ranks.setdefault(category, max(ranks.values(), default=-1) + 1)
+
+            self.connection.executemany('DELETE FROM entities WHERE domain = ? AND category = ?',
+                                        [(domain, category) for category in entities])
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO entities (domain, category, entity, category_rank, position) '
+                'VALUES (?, ?, ?, ?, ?)',
+                ((domain, category, entity, ranks[category], index)
+                 for category, entity_list in entities.items() for index, entity in enumerate(entity_list))
+            )
+
+    def replace_mappings(self, mappings: Iterable[Dict], relationship_types: Optional[List[str]] = None):
+        """Replace all mappings, or only those of the given relationship types"""
+        with self.connection:
+            if relationship_types is None:
+                self.connection.execute('DELETE FROM mappings')
+            else:
+                self.connection.executemany('DELETE FROM mappings WHERE relationship_type = ?',
+                                            [(rule_type,) for rule_type in relationship_types])
+            self.connection.executemany(
+                f"INSERT INTO mappings ({', '.join(column for column, _ in MAPPING_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in MAPPING_COLUMNS)})",
+                (tuple(mapping[key] for _, key in MAPPING_COLUMNS) for mapping in mappings)
+            )
+
+    def replace_validation(self, results: Dict, entity_records: Optional[Dict[str, List[Dict]]] = None):
+        """Store validation results; per-entity records replace only their categories"""
+        with self.connection:
+            for name in ('validation_summary', 'category_validation', 'quality_assessment',
+                         'cross_domain_validation'):
+                if name in results:
+                    self.connection.execute('INSERT OR REPLACE INTO reports (name, payload) VALUES (?, ?)',
+                                            (name, json.dumps(results[name])))
+            duplicates = results.get('duplicate_detection', {})
+            # Category order of the report, used to rebuild results in their original layout
+            self.connection.execute('INSERT OR REPLACE INTO reports (name, payload) VALUES (?, ?)',
+                                    ('duplicate_categories', json.dumps(list(duplicates))))
+            self.connection.executemany('DELETE FROM duplicates WHERE category = ?',
+                                        [(category,) for category in duplicates])
+            self.connection.executemany(
+                'INSERT INTO duplicates (category, position, entity1, entity2, similarity) VALUES (?, ?, ?, ?, ?)',
+                ((category, index, dup['entity1'], dup['entity2'], float(dup['similarity']))
+                 for category, dup_list in duplicates.items() for index, dup in enumerate(dup_list))
+            )
+
+            for category, records in (entity_records or {}).items():
+                self.connection.execute('DELETE FROM entity_validation WHERE category = ?', (category,))
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO entity_validation (category, entity, similarity, is_valid, quality) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    ((category, record['entity'], float(record['similarity']), int(bool(record['is_valid'])),
+                      float(record['quality']['overall_quality']) if record.get('quality') else None)
+                     for record in records)
+                )
+
+    # Reads
+
+    def has_entities(self) -> bool:
+        return self.connection.execute('SELECT 1 FROM entities LIMIT 1').fetchone() is not None
+
+    def load_entities(self, domain: str) -> Dict[str, List[str]]:
+        """Entities of a domain by category, in stored order"""
+        entities = {}
+        for row in self.connection.execute(
+                'SELECT category, entity FROM entities WHERE domain = ? ORDER BY category_rank, position',
+                (domain,)):
+            entities.setdefault(row['category'], []).append(row['entity'])
+        return entities
+
+    def load_mappings(self) -> List[Dict]:
+        return self.query_mappings()
+
+    def load_validation_results(self) -> Dict:
+        """Validation results in the validator's JSON layout"""
+        reports = {row['name']: json.loads(row['payload'])
+                   for row in self.connection.execute('SELECT name, payload FROM reports')}
+        if 'validation_summary' not in reports:
+            return {}
+        duplicates = {category: [] for category in reports.get('duplicate_categories', [])}
+        for row in self.connection.execute(
+                'SELECT category, entity1, entity2, similarity FROM duplicates ORDER BY category, position'):
+            duplicates.setdefault(row['category'], []).append(
+                {'entity1': row['entity1'], 'entity2': row['entity2'], 'similarity': row['similarity']}
+            )
+        return {
+            'validation_summary': reports['validation_summary'],
+            'category_validation': reports.get('category_validation', {}),
+            'duplicate_detection': duplicates,
+            'quality_assessment': reports.get('quality_assessment', {}),
+            'cross_domain_validation': reports.get('cross_domain_validation', {})
+        }
+
+    def query_mappings(self, category: Optional[str] = None, relationship_type: Optional[str] = None,
+                       min_confidence: Optional[float] = None, entity: Optional[str] = None,
+                       valid: Optional[bool] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Mappings filtered by endpoint category or entity, type, confidence and endpoint validity
+
+        With valid set, a mapping matches when an endpoint (the one in `category`, if given)
+        has that validation outcome; endpoints never validated do not match.
+        """
+        sides = []
+        params = []
+        for prefix, alias in (('re', 'rv'), ('gl', 'gv')):
+            side = []
+            if category is not None:
+                side.append(f'm.{prefix}_category = ?')
+                params.append(category)
+            if entity is not None:
+                side.append(f'm.{prefix}_entity = ?')
+                params.append(entity)
+            if valid is not None:
+                side.append(f'{alias}.is_valid = ?')
+                params.append(int(valid))
+            if side:
+                sides.append('(' + ' AND '.join(side) + ')')
+
+        conditions = ['(' + ' OR '.join(sides) + ')'] if sides else []
+        if relationship_type is not None:
+            conditions.append('m.relationship_type = ?')
+            params.append(relationship_type)
+        if min_confidence is not None:
+            conditions.append('m.confidence >= ?')
+            params.append(min_confidence)
+
+        sql = (f"SELECT {', '.join('m.' + column for column, _ in MAPPING_COLUMNS)}, "
+               "rv.is_valid AS re_valid, gv.is_valid AS gl_valid FROM mappings m "
+               "LEFT JOIN entity_validation rv ON rv.entity = m.re_entity AND rv.category = m.re_category "
+               "LEFT JOIN entity_validation gv ON gv.entity = m.gl_entity AND gv.category = m.gl_category")
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY m.id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        mappings = []
+        for row in self.connection.execute(sql, params):
+            mapping = {key: row[column] for column, key in MAPPING_COLUMNS}
+            if valid is not None:
+                mapping['renewable_energy_valid'] = None if row['re_valid'] is None else bool(row['re_valid'])
+                mapping['green_logistics_valid'] = None if row['gl_valid'] is None else bool(row['gl_valid'])
+            mappings.append(mapping)
+        return mappings
+
+    def query_entities(self, category: Optional[str] = None, domain: Optional[str] = None,
+                       valid: Optional[bool] = None, max_similarity: Optional[float] = None,
+                       limit: Optional[int] = None) -> List[Dict]:
+        """Entities with their validation scores (None where never validated)"""
+        conditions = []
+        params = []
+        for condition, value in (('e.category = ?', category), ('e.domain = ?', domain),
+                                 ('v.is_valid = ?', None if valid is None else int(valid)),
+                                 ('v.similarity <= ?', max_similarity)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        sql = ("SELECT e.domain, e.category, e.entity, v.similarity, v.is_valid, v.quality FROM entities e "
+               "LEFT JOIN entity_validation v ON v.entity = e.entity AND v.category = e.category")
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY e.domain, e.category_rank, e.position'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [
+            {**dict(row), 'is_valid': None if row['is_valid'] is None else bool(row['is_valid'])}
+            for row in self.connection.execute(sql, params)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {table: self.connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('entities', 'mappings', 'entity_validation', 'duplicates')}
+
+    def import_files(self, processed_dir: str = 'data/processed'):
+        """Bulk-load the current JSON stage outputs (validation without per-entity scores)"""
+        for domain, path in DOMAIN_FILES.items():
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    self.replace_entities(domain, json.load(f), full=True)
+        mappings_path = os.path.join(processed_dir, 'v2_cross_domain_mappings.json')
+        if os.path.exists(mappings_path):
+            with open(mappings_path, 'r') as f:
+                self.replace_mappings(json.load(f))
+        validation_path = os.path.join(processed_dir, 'v2_semantic_validation_results.json')
+        if os.path.exists(validation_path):
+            with open(validation_path, 'r') as f:
+                self.replace_validation(json.load(f))
+
+def configured_store() -> Optional[EntityStoreV2]:
+    """Store named by V2_STORE, or None when the stages should use files only"""
+    path = os.environ.get(STORE_ENV)
+    return EntityStoreV2(path) if path else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or populate the v2 SQLite entity store")
+    parser.add_argument('--db', default=os.environ.get(STORE_ENV) or STORE_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('import', help='Load the current JSON stage outputs into the store')
+    subparsers.add_parser('stats', help='Row counts per table')
+    mappings_parser = subparsers.add_parser('mappings', help='Query cross-domain mappings')
+    entities_parser = subparsers.add_parser('entities', help='Query entities and their validation scores')
+    for sub in (mappings_parser, entities_parser):
+        sub.add_argument('--category')
+        sub.add_argument('--limit', type=int)
+        validity = sub.add_mutually_exclusive_group()
+        validity.add_argument('--valid', dest='valid', action='store_const', const=True)
+        validity.add_argument('--invalid', dest='valid', action='store_const', const=False)
+    mappings_parser.add_argument('--type', dest='relationship_type')
+    mappings_parser.add_argument('--min-confidence', type=float)
+    mappings_parser.add_argument('--entity')
+    entities_parser.add_argument('--domain', choices=list(DOMAIN_FILES))
+    entities_parser.add_argument('--max-similarity', type=float)
+    args = parser.parse_args()
+
+    with EntityStoreV2(args.db) as store:
+        if args.command == 'import':
+            store.import_files()
+            print(f"Imported into {args.db}: {store.stats()}")
+        elif args.command == 'stats':
+            print(json.dumps(store.stats(), indent=2))
+        elif args.command == 'mappings':
+            rows = store.query_mappings(args.category, args.relationship_type, args.min_confidence, args.entity,
+                                        args.valid, args.limit)
+            print(json.dumps(rows, indent=2))
+        else:
+            rows = store.query_entities(args.category, args.domain, args.valid, args.max_similarity, args.limit)
+            print(json.dumps(rows, indent=2))
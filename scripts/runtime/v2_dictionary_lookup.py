@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Runtime Dictionary Lookup v2
+Normalized constant-time entity resolution over the final NER dictionaries
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# Acronyms that appear title-cased in the dictionaries ("Ev", "Lcoe", "Iso 14001")
+KNOWN_ACRONYMS = {
+    'ai', 'astm', 'breeam', 'cdp', 'ce', 'co2', 'csp', 'esg', 'eu', 'ev', 'ghg', 'gri',
+    'iec', 'ieee', 'iot', 'iso', 'lca', 'lcoe', 'leed', 'pv', 'rec', 'res', 'sasb',
+    'sbti', 'tcfd', 'ul', 'ungc'
+}
+
+DICTIONARY_FILES = {
+    'renewable_energy': 'v2_renewable_energy_services_dictionary.json',
+    'green_logistics': 'v2_green_logistics_dictionary.json'
+}
+MAPPINGS_FILE = 'v2_cross_domain_mappings_dictionary.json'
+MAPPING_SHARD_DIR = 'v2_cross_domain_mappings'
+SHARD_INDEX_FILE = 'index.json'
+
+class LookupResult(NamedTuple):
+    canonical: str
+    category: str
+    domain: str
+    entity: str
+
+def singularize(token: str) -> str:
+    """Fold simple English plurals onto their singular form"""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith(('sses', 'shes', 'ches', 'xes')):
+        return token[:-2]
+    if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+def normalize_entity_text(text: str) -> str:
+    """Normalize case, hyphens, spacing and plurals into a lookup key"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = re.sub(r'[-_/]+', ' ', text)
+    text = re.sub(r'[^\w\s.]', '', text)
+    return ' '.join(singularize(token) for token in text.split())
+
+def fold_acronyms(entity: str, acronyms=KNOWN_ACRONYMS) -> str:
+    """Restore acronym casing in title-cased entities ("Ev" -> "EV")"""
+    return ' '.join(word.upper() if word.lower() in acronyms else word for word in entity.split())
+
+def initials(entity: str) -> str:
+    """Initials of a multi-word entity ("Life Cycle Assessment" -> "lca")"""
+    words = re.sub(r'[-_/]+', ' ', entity).split()
+    return ''.join(word[0] for word in words if word[0].isalpha()).lower() if len(words) > 1 else ''
+
+def load_shard_index(final_dir: str = 'data/final') -> Optional[Dict]:
+    """Index of the cross-domain mapping shards, or None for builds that embed the mappings"""
+    path = os.path.join(final_dir, MAPPING_SHARD_DIR, SHARD_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def iter_mappings(final_dir: str = 'data/final',
+                  relationship_types: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """Cross-domain mappings grouped by relationship type, reading only the shards of the requested types"""
+    wanted = set(relationship_types) if relationship_types is not None else None
+    index = load_shard_index(final_dir)
+    if index is None:
+        path = os.path.join(final_dir, MAPPINGS_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            mappings = json.load(f).get('cross_domain_mappings', [])
+        for mapping in mappings:
+            if wanted is None or mapping.get('relationship_type', 'unknown') in wanted:
+                yield mapping
+        return
+
+    for shard in index['shards']:
+        if wanted is not None and shard['relationship_type'] not in wanted:
+            continue
+        with open(os.path.join(final_dir, MAPPING_SHARD_DIR, shard['file']), 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+class DictionaryLookupV2:
+    """Lazily loaded normalized hash index over the v2 final dictionaries"""
+
+    def __init__(self, final_dir: str = 'data/final', cache_size: int = 65536):
+        self.final_dir = final_dir
+        self.cache_size = cache_size
+        self._index = None
+        self._acronym_index = None
+        self._acronym_candidates = None     # initials -> results, before the unambiguity filter
+        self._acronyms = None
+        self._single_words = Counter()      # lowercased single-word entities
+        self._initials = Counter()          # initials of multi-word entities
+        self._related = None
+        self._canonical_of = {}     # (category, alias) -> canonical entity
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+        self.lookup_all = lru_cache(maxsize=cache_size)(self._lookup_all)
+
+    @property
+    def index(self) -> Dict[str, List[LookupResult]]:
+        if self._index is None:
+            self.load()
+        return self._index
+
+    def load(self):
+        """Load the dictionaries and build the normalized key indexes"""
+        index = {}
+        acronym_candidates = {}
+        entities_by_domain = {}
+        canonical_of = {}
+
+        for domain, filename in DICTIONARY_FILES.items():
+            with open(os.path.join(self.final_dir, filename), 'r') as f:
+                dictionary = json.load(f)
+            entities_by_domain[domain] = dictionary.get('entities', {})
+            for category, groups in dictionary.get('aliases', {}).items():
+                for canonical, group in groups.items():
+                    for alias in group['aliases']:
+                        canonical_of[(category, alias)] = canonical
+
+        # Acronyms are known ones plus single-word entities that abbreviate another entity ("Lca")
+        all_entities = [entity for entities in entities_by_domain.values()
+                        for entity_list in entities.values() for entity in entity_list]
+        single_words = Counter(entity.lower() for entity in all_entities if len(entity.split()) == 1)
+        entity_initials = Counter(key for key in map(initials, all_entities) if key)
+        acronyms = set(KNOWN_ACRONYMS) | (single_words.keys() & entity_initials.keys())
+
+        for domain, entities in entities_by_domain.items():
+            for category, entity_list in entities.items():
+                for entity in entity_list:
+                    result = LookupResult(fold_acronyms(entity, acronyms), category, domain, entity)
+                    index.setdefault(normalize_entity_text(entity), []).append(result)
+                    key = initials(entity)
+                    if key:
+                        acronym_candidates.setdefault(key, []).append(result)
+
+        # Initials only resolve when unambiguous, 3+ letters and not colliding with a real entity
+        self._acronym_index = {
+            key: results for key, results in acronym_candidates.items()
+            if len(key) >= 3 and len(results) == 1 and key not in index
+        }
+        self._acronym_candidates = acronym_candidates
+        self._acronyms = acronyms
+        self._single_words = single_words
+        self._initials = entity_initials
+        self._index = index
+        self._canonical_of = canonical_of
+        self._related = self._load_related()
+        self.lookup.cache_clear()
+        self.lookup_all.cache_clear()
+
+    def _load_related(self) -> Dict[str, List[Dict]]:
+        """Index cross-domain mappings by the normalized key of both endpoints"""
+        related = {}
+        for mapping in iter_mappings(self.final_dir):
+            for side in ('renewable_energy_entity', 'green_logistics_entity'):
+                related.setdefault(normalize_entity_text(mapping[side]), []).append(mapping)
+        return related
+
+    def with_delta(self, delta: Dict) -> 'DictionaryLookupV2':
+        """Copy with a release delta applied; untouched keys share their result lists with this lookup"""
+        if self._index is None:
+            self.load()
+        index = dict(self._index)
+        candidates = dict(self._acronym_candidates)
+        related = dict(self._related)
+        canonical_of = dict(self._canonical_of)
+        single_words = Counter(self._single_words)
+        entity_initials = Counter(self._initials)
+        touched = set()     # normalized and initials keys whose acronym entry must be re-derived
+
+        def without(table, key, keep):
+            results = [result for result in table.get(key, ()) if keep(result)]
+            if results:
+                table[key] = results
+            else:
+                table.pop(key, None)
+
+        for domain, category, entity in delta['entities']['removed']:
+            key = normalize_entity_text(entity)
+            if not any(result[1:] == (category, domain, entity) for result in index.get(key, ())):
+                continue
+            without(index, key, lambda result: result[1:] != (category, domain, entity))
+            acronym_key = initials(entity)
+            if acronym_key:
+                without(candidates, acronym_key, lambda result: result[1:] != (category, domain, entity))
+                entity_initials[acronym_key] -= 1
+            if len(entity.split()) == 1:
+                single_words[entity.lower()] -= 1
+            canonical_of.pop((category, entity), None)
+            touched.update((key, acronym_key))
+
+        added = []
+        for domain, category, entity, canonical in delta['entities']['added'] + delta['entities']['changed']:
+            if canonical != entity:
+                canonical_of[(category, entity)] = canonical
+            else:
+                canonical_of.pop((category, entity), None)
+            key = normalize_entity_text(entity)
+            if any(result[1:] == (category, domain, entity) for result in index.get(key, ())):
+                continue
+            added.append((key, LookupResult(entity, category, domain, entity)))
+            acronym_key = initials(entity)
+            if acronym_key:
+                entity_initials[acronym_key] += 1
+            if len(entity.split()) == 1:
+                single_words[entity.lower()] += 1
+            touched.update((key, acronym_key))
+
+        single_words = +single_words
+        entity_initials = +entity_initials
+        acronyms = set(KNOWN_ACRONYMS) | (single_words.keys() & entity_initials.keys())
+        for key, result in added:
+            result = result._replace(canonical=fold_acronyms(result.entity, acronyms))
+            index[key] = index.get(key, []) + [result]
+            acronym_key = initials(result.entity)
+            if acronym_key:
+                candidates[acronym_key] = candidates.get(acronym_key, []) + [result]
+
+        if acronyms != self._acronyms:
+            # Rare: the acronym set changed, so displayed forms of entities using those words are refolded
+            changed_words = acronyms ^ self._acronyms
+            for table in (index, candidates):
+                for key, results in table.items():
+                    if any(word.lower() in changed_words for result in results for word in result.entity.split()):
+                        table[key] = [result._replace(canonical=fold_acronyms(result.entity, acronyms))
+                                      for result in results]
+                        touched.add(key)
+
+        acronym_index = dict(self._acronym_index)
+        for key in touched:
+            results = candidates.get(key, [])
+            if len(key) >= 3 and len(results) == 1 and key not in index:
+                acronym_index[key] = results
+            else:
+                acronym_index.pop(key, None)
+
+        mappings = delta['mappings']
+        stale = {tuple(key) for key in mappings['removed']}
+        stale.update((mapping['renewable_energy_entity'], mapping['green_logistics_entity'])
+                     for mapping in mappings['changed'])
+        for re_entity, gl_entity in stale:
+            for entity in (re_entity, gl_entity):
+                without(related, normalize_entity_text(entity),
+                        lambda mapping: (mapping['renewable_energy_entity'],
+                                         mapping['green_logistics_entity']) != (re_entity, gl_entity))
+        for mapping in mappings['added'] + mappings['changed']:
+            keys = [normalize_entity_text(mapping['renewable_energy_entity']),
+                    normalize_entity_text(mapping['green_logistics_entity'])]
+            if mapping in related.get(keys[0], ()):
+                continue
+            for key in keys:
+                related[key] = related.get(key, []) + [mapping]
+
+        lookup = DictionaryLookupV2(self.final_dir, self.cache_size)
+        lookup._index = index
+        lookup._acronym_index = acronym_index
+        lookup._acronym_candidates = candidates
+        lookup._acronyms = acronyms
+        lookup._single_words = single_words
+        lookup._initials = entity_initials
+        lookup._related = related
+        lookup._canonical_of = canonical_of
+        return lookup
+
+    def _lookup_all(self, text: str) -> List[LookupResult]:
+        key = normalize_entity_text(text)
+        results = self.index.get(key)
+        if results is None:
+            results = self._acronym_index.get(re.sub(r'\W+', '', text.casefold()), [])
+        return list(results)
+
+    def _lookup(self, text: str) -> Optional[LookupResult]:
+        results = self._lookup_all(text)
+        return results[0] if results else None
+
+    def related(self, entity: str) -> List[Dict]:
+        """Cross-domain mappings for an entity, resolved through the lookup index and alias table"""
+        if self._related is None:
+            self.load()
+        result = self.lookup(entity)
+        if result is not None:
+            # Mappings are stored for canonical entities only
+            entity = self._canonical_of.get((result.category, result.entity), result.entity)
+        key = normalize_entity_text(entity)
+        return list(self._related.get(key, []))
+
+    def __contains__(self, text: str) -> bool:
+        return self.lookup(text) is not None
+
+    def __len__(self) -> int:
+        return sum(len(results) for results in self.index.values())
+
+if __name__ == "__main__":
+    lookup = DictionaryLookupV2()
+    for query in sys.argv[1:]:
+        result = lookup.lookup(query)
+        if result is None:
+            print(f"{query!r}: not found")
+            continue
+        print(f"{query!r} -> {result.canonical} [{result.category}, {result.domain}]")
+        for mapping in lookup.related(query):
+            print(f"  {mapping['renewable_energy_entity']} -> {mapping['green_logistics_entity']} "
+                  f"({mapping['relationship_type']}, {mapping['confidence_score']:.2f})")
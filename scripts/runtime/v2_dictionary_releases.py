@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Dictionary Releases v2
+Release log of the final dictionaries and hot reloading of long-running consumers from release deltas
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+RELEASE_DIR = 'v2_releases'
+RELEASE_LOG = 'releases.json'
+
+def load_release_log(final_dir: str = 'data/final') -> Dict:
+    """Release log of a final directory ({'latest': 0, 'releases': []} before the first release)"""
+    path = os.path.join(final_dir, RELEASE_DIR, RELEASE_LOG)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'latest': 0, 'releases': []}
+
+def latest_release(final_dir: str = 'data/final') -> int:
+    return load_release_log(final_dir)['latest']
+
+def release_deltas(final_dir: str, since: int, until: Optional[int] = None) -> Optional[List[Dict]]:
+    """Deltas taking a consumer from release `since` to `until` (default latest), or None if one is missing"""
+    log = load_release_log(final_dir)
+    until = log['latest'] if until is None else until
+    releases = {release['version']: release for release in log['releases']}
+    deltas = []
+    for version in range(since + 1, until + 1):
+        release = releases.get(version)
+        if since == 0 or release is None or not release.get('delta'):
+            # First release, or a delta pruned from the log: only a full reload gets there
+            return None
+        try:
+            with open(os.path.join(final_dir, RELEASE_DIR, release['delta']), 'r') as f:
+                deltas.append(json.load(f))
+        except FileNotFoundError:
+            return None
+    return deltas
+
+def delta_counts(delta: Dict) -> Dict[str, int]:
+    """Number of added, removed and changed entities and mappings in a delta"""
+    return {
+        f'{section}_{change}': len(delta[section][change])
+        for section in ('entities', 'mappings') for change in ('added', 'removed', 'changed')
+    }
+
+class HotReloaderV2:
+    """Keeps a consumer current: release deltas are applied to a copy, which then replaces the served object"""
+
+    def __init__(self, load: Callable[[], object], final_dir: str = 'data/final'):
+        self.load = load
+        self.final_dir = final_dir
+        # Read before loading: a release published meanwhile is applied again, and deltas are idempotent
+        self.version = latest_release(final_dir)
+        self.current = load()
+        self.stats = {'deltas_applied': 0, 'full_reloads': 0, 'last_reload_seconds': 0.0}
+        self.lock = threading.Lock()    # serializes refreshes; readers never take it
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self) -> bool:
+        """Catch up with the latest release; True if the served object was replaced"""
+        with self.lock:
+            latest = latest_release(self.final_dir)
+            if latest == self.version:
+                return False
+            start = time.perf_counter()
+            deltas = release_deltas(self.final_dir, self.version, latest) if latest > self.version else None
+            if deltas is None:
+                updated = self.load()
+                self.stats['full_reloads'] += 1
+            else:
+                updated = self.current
+                for delta in deltas:
+                    updated = updated.with_delta(delta)
+                self.stats['deltas_applied'] += len(deltas)
+            # A single reference assignment, so readers see either the old or the new object, never a mix
+            self.current = updated
+            self.version = latest
+            self.stats['last_reload_seconds'] = time.perf_counter() - start
+            return True
+
+    def start(self, poll_seconds: float = 5.0) -> 'HotReloaderV2':
+        """Poll the release log from a daemon thread"""
+        def poll():
+            while not self.stopped.wait(poll_seconds):
+                try:
+                    if self.refresh():
+                        print(f"Reloaded dictionaries at release {self.version} "
+                              f"in {self.stats['last_reload_seconds']:.2f} s")
+                except Exception as e:
+                    # Keep serving the previous release until the next poll
+                    print(f"Dictionary reload failed: {e}")
+
+        self.thread = threading.Thread(target=poll, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+if __name__ == "__main__":
+    final_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/final'
+    log = load_release_log(final_dir)
+    print(f"Latest release: {log['latest']}")
+    for release in log['releases']:
+        changes = release.get('changes') or {}
+        summary = ', '.join(f'{key} {value}' for key, value in changes.items() if value) or 'full release'
+        print(f"  {release['version']}: {release['creation_date']} "
+              f"({release['entities']} entities, {release['mappings']} mappings) {summary}")
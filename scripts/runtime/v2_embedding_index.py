@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Entity Embedding Index v2
+Memory-mapped entity embeddings with batched exact or IVF top-k retrieval for free-text queries
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'validation'))
+
+from v2_dictionary_lookup import DICTIONARY_FILES
+from v2_ai_semantic_validator import CATEGORY_REFERENCES
+
+INDEX_DIR = 'data/final/v2_embedding_index'
+
+# Below this size an exact scan is already fast, so no IVF lists are built by default
+APPROXIMATE_MIN_SIZE = 50000
+
+TOKEN_RE = re.compile(r'\w+')
+
+class EntityHit(NamedTuple):
+    entity: str
+    category: str
+    domain: str
+    score: float
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows as float32 (zero rows stay zero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if len(scores) > k:
+        candidates = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+class HashingEncoderV2:
+    """Deterministic feature-hashing stand-in for a sentence transformer in offline tests"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def features(self, text: str) -> Iterable[str]:
+        """Word, word-bigram and character-trigram features of casefolded text"""
+        tokens = TOKEN_RE.findall(text.casefold())
+        for token in tokens:
+            yield 'w:' + token
+            padded = f'#{token}#'
+            for i in range(len(padded) - 2):
+                yield 'c:' + padded[i:i + 3]
+        for first, second in zip(tokens, tokens[1:]):
+            yield f'b:{first} {second}'
+
+    def encode(self, texts: Sequence[str], batch_size: int = 256, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                h = int.from_bytes(digest, 'little')
+                vectors[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+        return vectors
+
+def load_encoder(model_name: str):
+    """Sentence transformer by name, or the hashing stand-in for 'hashing'"""
+    if model_name == 'hashing':
+        return HashingEncoderV2()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def encode_normalized(encoder, texts: Sequence[str], batch_size: int = 256) -> np.ndarray:
+    return normalize_rows(encoder.encode(list(texts), batch_size=batch_size))
+
+def entries_from_dictionaries(final_dir: str = 'data/final') -> List[Tuple[str, str, str]]:
+    """(entity, category, domain) for every entity of the final dictionaries"""
+    entries = []
+    for domain, filename in DICTIONARY_FILES.items():
+        with open(os.path.join(final_dir, filename), 'r') as f:
+            entities = json.load(f).get('entities', {})
+        for category, entity_list in entities.items():
+            entries.extend((entity, category, domain) for entity in entity_list)
+    return entries
+
+def assign_clusters(vectors: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    """Nearest centroid (by cosine) for every row, computed in blocks"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size])
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+def spherical_kmeans(sample: np.ndarray, nlist: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit-norm k-means centroids trained on a sample of rows"""
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_clusters(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        if empty.any():
+            # Reseed empty lists from random rows so every list stays in use
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+def write_embedding_index(output_dir: str, vectors: np.ndarray, entries: Sequence[Tuple[str, str, str]],
+                          category_names: List[str], category_vectors: np.ndarray, model_name: str,
+                          nlist: Optional[int] = None, block_size: int = 65536, train_size: int = 100000,
+                          iterations: int = 10, seed: int = 0) -> Dict:
+    """Persist normalized entity vectors (grouped by IVF list when nlist > 0) with their id table"""
+    count, dim = vectors.shape
+    if nlist is None:
+        nlist = int(np.sqrt(count)) if count >= APPROXIMATE_MIN_SIZE else 0
+    os.makedirs(output_dir, exist_ok=True)
+
+    order = np.arange(count)
+    for filename in ('centroids.npy', 'offsets.npy'):
+        path = os.path.join(output_dir, filename)
+        if os.path.exists(path):
+            os.remove(path)
+    if nlist:
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, min(train_size, count), replace=False))
+        centroids = spherical_kmeans(np.asarray(vectors[sample_rows]), nlist, iterations, rng)
+        assignments = assign_clusters(vectors, centroids, block_size)
+        order = np.argsort(assignments, kind='stable')
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1)).astype(np.int64)
+        np.save(os.path.join(output_dir, 'centroids.npy'), centroids)
+        np.save(os.path.join(output_dir, 'offsets.npy'), offsets)
+
+    # Rows of one IVF list are contiguous, so a probe reads a single slice of the memory map
+    matrix = np.lib.format.open_memmap(os.path.join(output_dir, 'vectors.npy'), mode='w+',
+                                       dtype=np.float32, shape=(count, dim))
+    for start in range(0, count, block_size):
+        rows = order[start:start + block_size]
+        matrix[start:start + len(rows)] = vectors[rows]
+    matrix.flush()
+    del matrix
+
+    category_index = {category: i for i, category in enumerate(category_names)}
+    domains = sorted({domain for _, _, domain in entries})
+    domain_index = {domain: i for i, domain in enumerate(domains)}
+    table = []
+    category_ids = np.empty(count, dtype=np.int16)
+    for position, row in enumerate(order.tolist()):
+        entity, category, domain = entries[row]
+        table.append([entity, category_index[category], domain_index[domain]])
+        category_ids[position] = category_index[category]
+
+    np.save(os.path.join(output_dir, 'category_ids.npy'), category_ids)
+    np.save(os.path.join(output_dir, 'categories.npy'), normalize_rows(category_vectors))
+    with open(os.path.join(output_dir, 'ids.json'), 'w') as f:
+        json.dump({
+            'model': model_name,
+            'dim': dim,
+            'count': count,
+            'nlist': nlist,
+            'categories': category_names,
+            'domains': domains,
+            'entities': table
+        }, f, ensure_ascii=False)
+
+    return {'entities': count, 'dim': dim, 'nlist': nlist}
+
+def build_embedding_index(entries: Iterable[Tuple[str, str, str]], output_dir: str = INDEX_DIR, encoder=None,
+                          model_name: str = 'all-MiniLM-L6-v2', batch_size: int = 4096, **kwargs) -> Dict:
+    """Encode entities and category descriptions, then write the index"""
+    entries = list(entries)
+    if not entries:
+        raise ValueError("Cannot build an embedding index without entities")
+    encoder = encoder or load_encoder(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Encode straight into a scratch memory map so the full matrix never has to fit in RAM
+    first = encode_normalized(encoder, [entries[0][0]])
+    scratch_path = os.path.join(output_dir, 'vectors.scratch.npy')
+    vectors = np.lib.format.open_memmap(scratch_path, mode='w+', dtype=np.float32,
+                                        shape=(len(entries), first.shape[1]))
+    for start in range(0, len(entries), batch_size):
+        block = entries[start:start + batch_size]
+        vectors[start:start + len(block)] = encode_normalized(encoder, [entity for entity, _, _ in block])
+    vectors.flush()
+
+    category_names = list(CATEGORY_REFERENCES) + sorted(
+        {category for _, category, _ in entries} - set(CATEGORY_REFERENCES))
+    descriptions = [CATEGORY_REFERENCES.get(category, category.replace('_', ' ').lower())
+                    for category in category_names]
+    category_vectors = encode_normalized(encoder, descriptions)
+
+    try:
+        return write_embedding_index(output_dir, vectors, entries, category_names, category_vectors,
+                                     model_name, **kwargs)
+    finally:
+        del vectors
+        os.remove(scratch_path)
+
+class EntityEmbeddingIndexV2:
+    """Top-k semantic entity retrieval over a memory-mapped embedding matrix"""
+
+    def __init__(self, index_dir: str = INDEX_DIR, encoder=None):
+        with open(os.path.join(index_dir, 'ids.json'), 'r') as f:
+            table = json.load(f)
+        self.model_name = table['model']
+        self.categories = table['categories']
+        self.domains = table['domains']
+        self.entities = table['entities']
+        self.category_index = {category: i for i, category in enumerate(self.categories)}
+
+        self.vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+        self.category_ids = np.load(os.path.join(index_dir, 'category_ids.npy'))
+        self.category_vectors = np.load(os.path.join(index_dir, 'categories.npy'))
+        self.centroids = None
+        self.offsets = None
+        if table['nlist']:
+            self.centroids = np.load(os.path.join(index_dir, 'centroids.npy'))
+            self.offsets = np.load(os.path.join(index_dir, 'offsets.npy'))
+        self.encoder = encoder
+
+        # Release deltas: rows added since the build live in memory after the memory-mapped ones
+        self.extra_vectors = np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+        self.removed = None     # rows masked out by release deltas
+        self._row_of = None
+
+    def row_table(self) -> Dict[Tuple[str, str, str], int]:
+        """Row of every live (entity, category, domain)"""
+        if self._row_of is None:
+            self._row_of = {
+                (entity, self.categories[category_id], self.domains[domain_id]): row
+                for row, (entity, category_id, domain_id) in enumerate(self.entities)
+            }
+        return self._row_of
+
+    def with_delta(self, delta: Dict) -> 'EntityEmbeddingIndexV2':
+        """Copy with a release delta applied: only added entities are encoded, removed rows are masked out"""
+        index = copy.copy(self)
+        index.entities = list(self.entities)
+        index.categories = list(self.categories)
+        index.domains = list(self.domains)
+        index.category_index = dict(self.category_index)
+        index.removed = (np.zeros(len(self.entities), dtype=bool) if self.removed is None
+                         else self.removed.copy())
+        index._row_of = dict(self.row_table())
+
+        for domain, category, entity in delta['entities']['removed']:
+            row = index._row_of.pop((entity, category, domain), None)
+            if row is not None:
+                index.removed[row] = True
+
+        added = [(entity, category, domain) for domain, category, entity, _ in delta['entities']['added']
+                 if (entity, category, domain) not in index._row_of]
+        if added:
+            new_categories = sorted({category for _, category, _ in added} - set(index.category_index))
+            if new_categories:
+                descriptions = [CATEGORY_REFERENCES.get(category, category.replace('_', ' ').lower())
+                                for category in new_categories]
+                index.category_vectors = np.vstack([self.category_vectors, self.encode(descriptions)])
+                for category in new_categories:
+                    index.category_index[category] = len(index.categories)
+                    index.categories.append(category)
+            for domain in sorted({domain for _, _, domain in added} - set(index.domains)):
+                index.domains.append(domain)
+            domain_index = {domain: i for i, domain in enumerate(index.domains)}
+
+            index.extra_vectors = np.vstack([self.extra_vectors, self.encode([entity for entity, _, _ in added])])
+            index.category_ids = np.concatenate([self.category_ids, np.array(
+                [index.category_index[category] for _, category, _ in added], dtype=self.category_ids.dtype)])
+            index.removed = np.concatenate([index.removed, np.zeros(len(added), dtype=bool)])
+            for entity, category, domain in added:
+                index._row_of[(entity, category, domain)] = len(index.entities)
+                index.entities.append([entity, index.category_index[category], domain_index[domain]])
+        if not index.removed.any():
+            index.removed = None
+        return index
+
+    def _rows(self, start: int, end: int) -> np.ndarray:
+        """Vectors of a row range within the memory map or within the rows added by deltas"""
+        base = len(self.vectors)
+        if start >= base:
+            return self.extra_vectors[start - base:end - base]
+        return np.asarray(self.vectors[start:end])
+
+    def encode(self, queries: Sequence[str]) -> np.ndarray:
+        if self.encoder is None:
+            self.encoder = load_encoder(self.model_name)
+        return encode_normalized(self.encoder, queries)
+
+    def search(self, queries, top_k: int = 10, categories: Optional[Iterable[str]] = None,
+               approximate: Optional[bool] = None, nprobe: int = 8, category_weight: float = 0.1):
+        """Top-k entities for one query string, or a list of hit lists for a batch of queries"""
+        single = isinstance(queries, str)
+        batch = [queries] if single else list(queries)
+        results = self.search_vectors(self.encode(batch), top_k, categories, approximate, nprobe, category_weight)
+        return results[0] if single else results
+
+    def _score(self, start: int, end: int, query_vectors: np.ndarray, category_scores: np.ndarray,
+               allowed: Optional[np.ndarray], category_weight: float) -> np.ndarray:
+        """(rows, queries) scores for a contiguous row range, blended with category fit"""
+        scores = self._rows(start, end) @ query_vectors.T
+        category_ids = self.category_ids[start:end]
+        if category_weight:
+            scores = (1.0 - category_weight) * scores + category_weight * category_scores[:, category_ids].T
+        if allowed is not None:
+            scores[~allowed[category_ids]] = -np.inf
+        if self.removed is not None:
+            scores[self.removed[start:end]] = -np.inf
+        return scores
+
+    def search_vectors(self, query_vectors: np.ndarray, top_k: int = 10, categories: Optional[Iterable[str]] = None,
+                       approximate: Optional[bool] = None, nprobe: int = 8, category_weight: float = 0.1,
+                       block_size: int = 65536) -> List[List[EntityHit]]:
+        """Batched top-k over pre-encoded queries"""
+        query_vectors = normalize_rows(np.atleast_2d(query_vectors))
+        category_scores = query_vectors @ self.category_vectors.T
+        allowed = None
+        if categories is not None:
+            allowed = np.zeros(len(self.categories), dtype=bool)
+            for category in categories:
+                if category in self.category_index:
+                    allowed[self.category_index[category]] = True
+
+        if approximate is None:
+            approximate = self.centroids is not None
+        if approximate and self.centroids is None:
+            raise ValueError("Index was built without IVF lists; rebuild with nlist > 0 for approximate search")
+
+        # Each work item is a contiguous row range and the queries that need it
+        all_queries = list(range(len(query_vectors)))
+        if approximate:
+            probe_scores = query_vectors @ self.centroids.T
+            by_list = {}
+            for query in all_queries:
+                for list_id in top_indices(probe_scores[query], nprobe).tolist():
+                    by_list.setdefault(list_id, []).append(query)
+            work = [(int(self.offsets[list_id]), int(self.offsets[list_id + 1]), queries)
+                    for list_id, queries in sorted(by_list.items())]
+        else:
+            work = [(start, min(start + block_size, len(self.vectors)), all_queries)
+                    for start in range(0, len(self.vectors), block_size)]
+        # Rows added by release deltas sit in no IVF list, so every query scans them
+        if len(self.extra_vectors):
+            work.append((len(self.vectors), len(self.entities), all_queries))
+
+        candidates = [[] for _ in all_queries]
+        for start, end, queries in work:
+            if start == end:
+                continue
+            scores = self._score(start, end, query_vectors[queries], category_scores[queries],
+                                 allowed, category_weight)
+            for column, query in enumerate(queries):
+                top = top_indices(scores[:, column], top_k)
+                candidates[query].append((top + start, scores[top, column]))
+
+        results = []
+        for query_candidates in candidates:
+            if not query_candidates:
+                results.append([])
+                continue
+            rows = np.concatenate([rows for rows, _ in query_candidates])
+            scores = np.concatenate([scores for _, scores in query_candidates])
+            hits = []
+            for i in top_indices(scores, top_k).tolist():
+                if not np.isfinite(scores[i]):
+                    break
+                entity, category_id, domain_id = self.entities[int(rows[i])]
+                hits.append(EntityHit(entity, self.categories[category_id], self.domains[domain_id],
+                                      float(scores[i])))
+            results.append(hits)
+        return results
+
+    def __len__(self) -> int:
+        return len(self.entities) - (int(self.removed.sum()) if self.removed is not None else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the entity embedding index")
+    parser.add_argument('queries', nargs='*', help='Free-text queries to run against the index')
+    parser.add_argument('--build', action='store_true', help='(Re)build the index from the final dictionaries')
+    parser.add_argument('--final-dir', default='data/final')
+    parser.add_argument('--index-dir', default=INDEX_DIR)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2', help="Sentence transformer, or 'hashing' offline")
+    parser.add_argument('--nlist', type=int, default=None, help='IVF lists (default: sqrt(n) above 50k entities)')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--category', action='append', help='Restrict results to a category (repeatable)')
+    parser.add_argument('--exact', action='store_true', help='Scan every entity even if IVF lists exist')
+    args = parser.parse_args()
+
+    if args.build:
+        start = time.perf_counter()
+        stats = build_embedding_index(entries_from_dictionaries(args.final_dir), args.index_dir,
+                                      model_name=args.model, nlist=args.nlist)
+        print(f"Indexed {stats['entities']} entities ({stats['dim']} dims, {stats['nlist']} IVF lists) "
+              f"in {time.perf_counter() - start:.1f} s -> {args.index_dir}")
+
+    if args.queries:
+        index = EntityEmbeddingIndexV2(args.index_dir)
+        start = time.perf_counter()
+        results = index.search(args.queries, args.top_k, args.category, False if args.exact else None)
+        elapsed = time.perf_counter() - start
+        for query, hits in zip(args.queries, results):
+            print(f"{query!r}:")
+            for hit in hits:
+                print(f"  {hit.score:.3f}  {hit.entity} [{hit.category}, {hit.domain}]")
+        print(f"{len(args.queries)} queries in {elapsed * 1000:.1f} ms")
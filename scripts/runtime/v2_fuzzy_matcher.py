@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Entity Matcher v2
+Typo- and variant-tolerant entity matching with a symmetric-deletion (SymSpell-style) index
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+from itertools import combinations
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from v2_dictionary_lookup import DICTIONARY_FILES, singularize
+
+class FuzzyMatch(NamedTuple):
+    entity: str
+    distance: int
+    score: float
+    payload: object
+
+def normalize_variant(text: str) -> str:
+    """Fold unicode subscripts, case, hyphens, digit/letter joins and plurals into spaced tokens"""
+    text = unicodedata.normalize('NFKC', text).casefold()      # "co₂" -> "co2"
+    text = re.sub(r'[-_/.]+', ' ', text)                        # "photo-voltaic" -> "photo voltaic"
+    text = re.sub(r'(?<=[^\W\d])(?=\d)|(?<=\d)(?=[^\W\d])', ' ', text)  # "iso14001" -> "iso 14001"
+    text = re.sub(r'[^\w\s]', '', text)
+    return ' '.join(singularize(token) for token in text.split())
+
+def compact_key(text: str) -> str:
+    """Space-free normalized key, so spacing and hyphenation variants coincide"""
+    return normalize_variant(text).replace(' ', '')
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or max_distance + 1 once the bound is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+def deletes(key: str, max_distance: int) -> Set[str]:
+    """All strings reachable from key by deleting up to max_distance characters"""
+    variants = {key}
+    for count in range(1, min(max_distance, len(key)) + 1):
+        for positions in combinations(range(len(key)), count):
+            skip = set(positions)
+            variants.add(''.join(char for i, char in enumerate(key) if i not in skip))
+    return variants
+
+class FuzzyMatcherV2:
+    """Symmetric-deletion index over compact entity keys"""
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.entries = {}   # compact key -> list of (entity, payload)
+        self.index = {}     # deletion of a key prefix -> set of compact keys
+
+    @classmethod
+    def from_entities(cls, entries: Iterable[Tuple[str, object]], **kwargs) -> 'FuzzyMatcherV2':
+        """Index (entity, payload) pairs"""
+        matcher = cls(**kwargs)
+        for entity, payload in entries:
+            matcher.add(entity, payload)
+        return matcher
+
+    @classmethod
+    def from_dictionaries(cls, final_dir: str = 'data/final', **kwargs) -> 'FuzzyMatcherV2':
+        """Index every entity of the final dictionaries with (category, domain) payloads"""
+        matcher = cls(**kwargs)
+        for domain, filename in DICTIONARY_FILES.items():
+            with open(os.path.join(final_dir, filename), 'r') as f:
+                entities = json.load(f).get('entities', {})
+            for category, entity_list in entities.items():
+                for entity in entity_list:
+                    matcher.add(entity, (category, domain))
+        return matcher
+
+    def allowed_distance(self, key: str) -> int:
+        """Scale the edit budget with key length so short acronyms only match exactly"""
+        if len(key) <= 4:
+            return 0
+        if len(key) <= 8:
+            return min(1, self.max_distance)
+        return self.max_distance
+
+    def add(self, entity: str, payload: object = None):
+        """Index an entity under its compact key and the deletions of its prefix"""
+        key = compact_key(entity)
+        if not key:
+            return
+        if key not in self.entries:
+            for variant in deletes(key[:self.prefix_length], self.max_distance):
+                self.index.setdefault(variant, set()).add(key)
+        self.entries.setdefault(key, []).append((entity, payload))
+
+    def with_delta(self, delta: Dict) -> 'FuzzyMatcherV2':
+        """Copy with a release delta applied; untouched keys share their entries and index sets"""
+        matcher = FuzzyMatcherV2(self.max_distance, self.prefix_length)
+        matcher.entries = dict(self.entries)
+        matcher.index = dict(self.index)
+        copied = set()
+
+        def variants(key):
+            for variant in deletes(key[:self.prefix_length], self.max_distance):
+                if variant not in copied:
+                    matcher.index[variant] = set(matcher.index.get(variant, ()))
+                    copied.add(variant)
+                yield variant
+
+        for domain, category, entity in delta['entities']['removed']:
+            key = compact_key(entity)
+            entries = [entry for entry in matcher.entries.get(key, ()) if entry != (entity, (category, domain))]
+            if entries:
+                matcher.entries[key] = entries
+            elif key in matcher.entries:
+                del matcher.entries[key]
+                for variant in variants(key):
+                    matcher.index[variant].discard(key)
+        for domain, category, entity, _ in delta['entities']['added']:
+            key = compact_key(entity)
+            if not key or (entity, (category, domain)) in matcher.entries.get(key, ()):
+                continue
+            if key not in matcher.entries:
+                for variant in variants(key):
+                    matcher.index[variant].add(key)
+            matcher.entries[key] = matcher.entries.get(key, []) + [(entity, (category, domain))]
+        return matcher
+
+    def match(self, text: str, max_distance: Optional[int] = None, limit: Optional[int] = 5) -> List[FuzzyMatch]:
+        """Entities within the edit budget of the text, best first (all of them with limit=None)"""
+        key = compact_key(text)
+        if not key:
+            return []
+        budget = self.allowed_distance(key) if max_distance is None else max_distance
+
+        if key in self.entries and budget == 0:
+            candidates = {key}
+        else:
+            candidates = set()
+            for variant in deletes(key[:self.prefix_length], budget):
+                candidates.update(self.index.get(variant, ()))
+
+        results = []
+        for candidate in candidates:
+            if abs(len(candidate) - len(key)) > budget:
+                continue
+            distance = edit_distance(key, candidate, budget)
+            if distance > budget:
+                continue
+            score = 1.0 - distance / max(len(key), len(candidate))
+            for entity, payload in self.entries[candidate]:
+                results.append(FuzzyMatch(entity, distance, score, payload))
+
+        results.sort(key=lambda m: (m.distance, -m.score, m.entity))
+        return results if limit is None else results[:limit]
+
+    def best(self, text: str, max_distance: Optional[int] = None) -> Optional[FuzzyMatch]:
+        """Closest entity, or None"""
+        results = self.match(text, max_distance, limit=1)
+        return results[0] if results else None
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.entries.values())
+
+if __name__ == "__main__":
+    matcher = FuzzyMatcherV2.from_dictionaries()
+    for query in sys.argv[1:]:
+        results = matcher.match(query)
+        if not results:
+            print(f"{query!r}: no match")
+        for result in results:
+            category, domain = result.payload
+            print(f"{query!r} -> {result.entity} [{category}, {domain}] distance={result.distance} score={result.score:.2f}")
@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick Gazetteer Tagger v2
+Single-pass dictionary entity tagging with word boundaries and longest-match resolution
+"""
+
+import codecs
+import copy
+import json
+import os
+import re
+import sys
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from v2_dictionary_lookup import DICTIONARY_FILES
+from v2_fuzzy_matcher import FuzzyMatcherV2, compact_key
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Above this vocabulary size the prefilter regex gets too large; tag every token instead
+MAX_PREFILTER_VOCABULARY = 50000
+
+# Bytes read per chunk when tagging a file as a stream
+STREAM_CHUNK_SIZE = 1 << 20
+# Characters a stream may hold back while waiting for a safe cut (only reached by runs of vocabulary tokens)
+MAX_STREAM_CARRY = 1 << 20
+
+# A delta relinks incrementally only while its candidate scan stays below this fraction of the states
+MAX_RELINK_SCAN = 0.5
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    entity: str
+    category: str
+    domain: str
+    canonical: Optional[str] = None     # canonical entity when the matched form is an alias
+
+def fold_tokens(text: str) -> List[str]:
+    """Case-folded word tokens of an entity or query"""
+    return TOKEN_RE.findall(text.lower())
+
+def trie_regex(words: Iterable[str]) -> str:
+    """Regex alternation of words factored into a character trie"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return emit(trie)
+
+class GazetteerTaggerV2:
+    """Aho-Corasick automaton over case-folded word tokens of every dictionary entity"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]     # (length in tokens, payload id) of the entity ending at a state
+        self.dict_link = [0]     # nearest proper suffix state with an output
+        self.parent = [0]        # state the transition into a state leaves from
+        self.token = [None]      # token of the transition into a state
+        self.entering = {}       # token -> states entered through it, to find the states ending with a suffix
+        self.payloads = []       # (entity, category, domain, canonical entity)
+        self.canonical_of = {}   # (category, alias) -> canonical entity
+        self.shadowed = {}       # state -> later entries with the same surface form, promoted on removal
+        self.retired = 0         # payloads no longer reachable after release deltas
+        self.copied = None       # while applying a delta: states whose transitions are no longer shared
+        self.copied_tokens = None   # ... tokens whose entering list is no longer shared
+        self.toggled = None      # ... states whose output appeared or vanished
+        self.vocabulary = set()
+        self.max_entity_tokens = 0
+        self.max_token_length = 0   # longer tokens are never in the vocabulary
+        self.prefilter = None
+        self.prefilter_size = None   # (first tokens, vocabulary) the prefilter was compiled for
+        self.built = False
+
+        # Optional typo/variant fallback for text the exact automaton does not cover
+        self.fuzzy_matcher = None
+        self.fuzzy_max_tokens = None
+        self.fuzzy_min_score = 0.85
+
+    @classmethod
+    def from_dictionaries(cls, final_dir: str = 'data/final') -> 'GazetteerTaggerV2':
+        """Compile every entity of the final dictionaries into one automaton"""
+        tagger = cls()
+        for domain, filename in DICTIONARY_FILES.items():
+            with open(os.path.join(final_dir, filename), 'r') as f:
+                dictionary = json.load(f)
+            canonical_of = {
+                (category, alias): canonical
+                for category, groups in dictionary.get('aliases', {}).items()
+                for canonical, group in groups.items() for alias in group['aliases']
+            }
+            for category, entity_list in dictionary.get('entities', {}).items():
+                for entity in entity_list:
+                    tagger.add(entity, category, domain, canonical_of.get((category, entity)))
+        tagger.build()
+        return tagger
+
+    def enable_fuzzy(self, matcher: Optional[FuzzyMatcherV2] = None, final_dir: str = 'data/final',
+                     max_tokens: Optional[int] = None, min_score: float = 0.85):
+        """Use a fuzzy matcher as fallback for token windows without an exact match"""
+        self.fuzzy_matcher = matcher if matcher is not None else FuzzyMatcherV2.from_dictionaries(final_dir)
+        self.fuzzy_max_tokens = max_tokens
+        self.fuzzy_min_score = min_score
+
+    @classmethod
+    def from_entities(cls, entries: Iterable[Tuple]) -> 'GazetteerTaggerV2':
+        """Compile (entity, category, domain[, canonical]) entries into one automaton"""
+        tagger = cls()
+        for entry in entries:
+            tagger.add(*entry)
+        tagger.build()
+        return tagger
+
+    def add(self, entity: str, category: str, domain: str, canonical: Optional[str] = None):
+        """Insert an entity (or an alias of a canonical entity); the first entry for a surface form wins"""
+        tokens = fold_tokens(entity)
+        if not tokens:
+            return
+
+        state = 0
+        for token in tokens:
+            next_state = self.goto[state].get(token)
+            if next_state is None:
+                next_state = len(self.goto)
+                if self.copied is not None and state not in self.copied:
+                    # Transitions are still shared with the tagger this one was copied from
+                    self.goto[state] = dict(self.goto[state])
+                    self.copied.add(state)
+                self.goto[state][token] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.dict_link.append(0)
+                self.parent.append(state)
+                self.token.append(token)
+                if self.copied_tokens is not None and token not in self.copied_tokens:
+                    self.entering[token] = list(self.entering.get(token, ()))
+                    self.copied_tokens.add(token)
+                self.entering.setdefault(token, []).append(next_state)
+            state = next_state
+            self.vocabulary.add(token)
+            self.max_token_length = max(self.max_token_length, len(token))
+
+        self.max_entity_tokens = max(self.max_entity_tokens, len(tokens))
+        if self.output[state] is None:
+            self.output[state] = (len(tokens), len(self.payloads))
+            self.payloads.append((entity, category, domain, canonical or entity))
+            if self.toggled is not None:
+                self.toggled.add(state)
+        else:
+            self.shadowed.setdefault(state, []).append((entity, category, domain, canonical or entity))
+        if canonical and canonical != entity:
+            self.canonical_of[(category, entity)] = canonical
+        self.built = False
+
+    def state_of(self, entity: str) -> Optional[int]:
+        """Automaton state reached by an entity's tokens, or None if it is not in the trie"""
+        state = 0
+        for token in fold_tokens(entity):
+            state = self.goto[state].get(token)
+            if state is None:
+                return None
+        return state or None
+
+    def with_delta(self, delta: Dict) -> 'GazetteerTaggerV2':
+        """Copy with a release delta applied: the trie is extended rather than rebuilt from the dictionaries
+
+        Only the links a delta can change are recomputed (see relink). The per-state lists are still
+        copied, which is a flat O(states) copy at C speed rather than a Python pass over the automaton.
+        """
+        if not self.built:
+            self.build()
+        tagger = copy.copy(self)
+        # Transition dicts and entering lists stay shared until add() writes to one; the rest is copied up front
+        tagger.goto = list(self.goto)
+        tagger.fail = list(self.fail)
+        tagger.output = list(self.output)
+        tagger.dict_link = list(self.dict_link)
+        tagger.parent = list(self.parent)
+        tagger.token = list(self.token)
+        tagger.entering = dict(self.entering)
+        tagger.payloads = list(self.payloads)
+        tagger.canonical_of = dict(self.canonical_of)
+        tagger.shadowed = dict(self.shadowed)
+        tagger.vocabulary = set(self.vocabulary)
+        tagger.copied = set()
+        tagger.copied_tokens = set()
+        tagger.toggled = set()
+        states_before = len(self.goto)
+
+        for domain, category, entity in delta['entities']['removed']:
+            tagger._update_entry(entity, category, domain, None)
+        for domain, category, entity, canonical in delta['entities']['changed']:
+            tagger._update_entry(entity, category, domain, canonical)
+        for domain, category, entity, canonical in delta['entities']['added']:
+            if not tagger._update_entry(entity, category, domain, canonical):
+                tagger.add(entity, category, domain, canonical)
+
+        if self.fuzzy_matcher is not None:
+            tagger.fuzzy_matcher = self.fuzzy_matcher.with_delta(delta)
+        tagger.relink(range(states_before, len(tagger.goto)), tagger.toggled)
+        tagger.compile_prefilter()
+        tagger.copied = tagger.copied_tokens = tagger.toggled = None
+        tagger.built = True
+        return tagger
+
+    def depth(self, state: int) -> int:
+        """Number of tokens of the string a state stands for"""
+        depth = 0
+        while state:
+            state = self.parent[state]
+            depth += 1
+        return depth
+
+    def ends_with(self, state: int, suffix: int) -> bool:
+        """Whether the token string of state ends with the token string of suffix"""
+        while suffix:
+            if not state or self.token[state] != self.token[suffix]:
+                return False
+            state, suffix = self.parent[state], self.parent[suffix]
+        return True
+
+    def states_ending_with(self, suffix: int) -> Iterator[int]:
+        """States whose token string has that of suffix as a proper suffix, i.e. its subtree of failure links"""
+        for state in self.entering.get(self.token[suffix], ()):
+            if state != suffix and self.ends_with(state, suffix):
+                yield state
+
+    def relink(self, new_states: Iterable[int], toggled: Iterable[int]):
+        """Recompute the failure and dictionary links a delta can change, instead of all of them
+
+        The trie only grows, so a failure link changes only for a new state or a state ending with one,
+        and a dictionary link additionally for states ending with a state whose output appeared or
+        vanished. Those are found through the entering index, so the cost follows the delta and how
+        often its tokens occur, not the automaton size. When the scan would cost as much as relinking
+        everything (small automata, very common tokens), all links are recomputed instead.
+        """
+        new_states, toggled = list(new_states), list(toggled)
+        scan = sum(len(self.entering.get(self.token[state], ())) for state in new_states + toggled)
+        if scan > MAX_RELINK_SCAN * len(self.goto):
+            self.link_all()
+            return
+
+        refail = set(new_states)
+        for state in list(refail):
+            refail.update(self.states_ending_with(state))
+        relinked = set(refail)
+        for state in toggled:
+            relinked.update(self.states_ending_with(state))
+
+        # Shallower first: a state's links depend on those of its parent and of its (shorter) suffixes
+        for state in sorted(relinked, key=self.depth):
+            if state in refail:
+                parent, token = self.parent[state], self.token[state]
+                fallback = self.fail[parent]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[state] = self.goto[fallback].get(token, 0) if parent else 0
+            suffix = self.fail[state]
+            self.dict_link[state] = suffix if self.output[suffix] is not None else self.dict_link[suffix]
+
+    def _update_entry(self, entity: str, category: str, domain: str, canonical: Optional[str]) -> bool:
+        """Set the canonical entity of an existing entry, or remove it when canonical is None; False if absent"""
+        state = self.state_of(entity)
+        if state is None:
+            return False
+        if canonical is None:
+            self.canonical_of.pop((category, entity), None)
+        elif canonical != entity:
+            self.canonical_of[(category, entity)] = canonical
+        else:
+            self.canonical_of.pop((category, entity), None)
+
+        output = self.output[state]
+        if output is not None and self.payloads[output[1]][:3] == (entity, category, domain):
+            if canonical is not None:
+                self.payloads[output[1]] = (entity, category, domain, canonical)
+                return True
+            self.retired += 1
+            shadowed = self.shadowed.pop(state, [])
+            if shadowed:
+                # The next entry with the same surface form takes over
+                self.output[state] = (output[0], len(self.payloads))
+                self.payloads.append(shadowed[0])
+                self.retired -= 1
+                if shadowed[1:]:
+                    self.shadowed[state] = shadowed[1:]
+            else:
+                self.output[state] = None
+                if self.toggled is not None:
+                    self.toggled.add(state)
+            return True
+
+        shadowed = self.shadowed.get(state, [])
+        position = next((i for i, entry in enumerate(shadowed) if entry[:3] == (entity, category, domain)), None)
+        if position is None:
+            return False
+        if canonical is not None:
+            shadowed = list(shadowed)
+            shadowed[position] = (entity, category, domain, canonical)
+            self.shadowed[state] = shadowed
+        elif len(shadowed) > 1:
+            self.shadowed[state] = shadowed[:position] + shadowed[position + 1:]
+        else:
+            del self.shadowed[state]
+        return True
+
+    def build(self):
+        """Compute the links and the prefilter"""
+        self.link_all()
+        self.compile_prefilter()
+        self.built = True
+
+    def link_all(self):
+        """Compute failure and dictionary-suffix links breadth-first"""
+        queue = deque()
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            self.dict_link[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for token, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                suffix = self.fail[child]
+                self.dict_link[child] = suffix if self.output[suffix] is not None else self.dict_link[suffix]
+                queue.append(child)
+
+    def compile_prefilter(self):
+        """Regex over candidate runs, recompiled only when the first-token or vocabulary sets grew"""
+        # Candidate runs: an entity's first token followed by any vocabulary tokens.
+        # Both token sets only ever grow, so unchanged sizes mean the compiled prefilter is still exact
+        prefilter_size = (len(self.goto[0]), len(self.vocabulary))
+        if prefilter_size == self.prefilter_size:
+            pass
+        elif self.goto[0] and len(self.vocabulary) <= MAX_PREFILTER_VOCABULARY:
+            self.prefilter = re.compile(
+                r'\b(?:' + trie_regex(self.goto[0]) + r')\b(?:\W+(?:' + trie_regex(self.vocabulary) + r')\b)*'
+            )
+        else:
+            self.prefilter = None
+        self.prefilter_size = prefilter_size
+
+    def iter_token_matches(self, tokens: Iterable[str]) -> Iterator[Tuple[int, int, int]]:
+        """Yield (first token index, last token index, payload id) for every match"""
+        if not self.built:
+            self.build()
+
+        goto, fail, output, dict_link, vocabulary = self.goto, self.fail, self.output, self.dict_link, self.vocabulary
+        state = 0
+        for i, token in enumerate(tokens):
+            if token not in vocabulary:
+                state = 0
+                continue
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if not state:
+                continue
+
+            match_state = state if output[state] is not None else dict_link[state]
+            while match_state:
+                length, payload = output[match_state]
+                yield i - length + 1, i, payload
+                match_state = dict_link[match_state]
+
+    @staticmethod
+    def resolve_overlaps(matches: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+        """Keep leftmost-longest non-overlapping matches"""
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected = []
+        last_end = -1
+        for match in matches:
+            if match[0] > last_end:
+                selected.append(match)
+                last_end = match[1]
+        return selected
+
+    def _tag_tokens(self, text: str, folded: str) -> List[Span]:
+        """Tag by running the automaton over every token of the document"""
+        if len(folded) != len(text):
+            # Case folding changed lengths; fold per token to keep offsets aligned
+            token_matches = list(TOKEN_RE.finditer(text))
+            tokens = [m.group().lower() for m in token_matches]
+        else:
+            token_matches = list(TOKEN_RE.finditer(folded))
+            tokens = [m.group() for m in token_matches]
+
+        spans = []
+        for first, last, payload in self.resolve_overlaps(list(self.iter_token_matches(tokens))):
+            spans.append(Span(token_matches[first].start(), token_matches[last].end(), *self.payloads[payload]))
+        return spans
+
+    def _fuzzy_fill(self, text: str, spans: List[Span]) -> List[Span]:
+        """Add fuzzy matches for token windows not covered by exact spans"""
+        token_matches = list(TOKEN_RE.finditer(text))
+        covered = [False] * len(token_matches)
+        span_index = 0
+        for i, token in enumerate(token_matches):
+            while span_index < len(spans) and spans[span_index].end <= token.start():
+                span_index += 1
+            if span_index < len(spans) and spans[span_index].start <= token.start():
+                covered[i] = True
+
+        max_tokens = self.fuzzy_max_tokens or self.max_entity_tokens + 1
+        fuzzy_spans = []
+        i = 0
+        while i < len(token_matches):
+            matched = False
+            if not covered[i]:
+                for n in range(min(max_tokens, len(token_matches) - i), 0, -1):
+                    last = i + n - 1
+                    if any(covered[i:last + 1]):
+                        continue
+                    window = text[token_matches[i].start():token_matches[last].end()]
+                    if len(compact_key(window)) < 5:
+                        continue
+                    match = self.fuzzy_matcher.best(window)
+                    # Reject windows whose edge token could be absorbed entirely by edits ("on photo-voltaics")
+                    edge = min(len(token_matches[i].group()), len(token_matches[last].group()))
+                    if match is not None and match.score >= self.fuzzy_min_score and match.distance < edge:
+                        category, domain = match.payload
+                        fuzzy_spans.append(Span(token_matches[i].start(), token_matches[last].end(),
+                                                match.entity, category, domain,
+                                                self.canonical_of.get((category, match.entity), match.entity)))
+                        i = last + 1
+                        matched = True
+                        break
+            if not matched:
+                i += 1
+
+        return sorted(spans + fuzzy_spans)
+
+    def tag(self, text: str) -> List[Span]:
+        """Tag a document in a single pass and return character spans"""
+        spans = self._tag_exact(text)
+        if self.fuzzy_matcher is not None:
+            spans = self._fuzzy_fill(text, spans)
+        return spans
+
+    def _tag_exact(self, text: str) -> List[Span]:
+        """Exact automaton matches, using the run prefilter when possible"""
+        if not self.built:
+            self.build()
+
+        folded = text.lower()
+        if self.prefilter is None or len(folded) != len(text):
+            return self._tag_tokens(text, folded)
+
+        # Only runs that can contain an entity reach the automaton; every run starts in the root state
+        spans = []
+        root, output, payloads = self.goto[0], self.output, self.payloads
+        for run in self.prefilter.finditer(folded):
+            run_text = run.group()
+            run_start = run.start()
+            state = root.get(run_text)
+            if state is not None:
+                # Most runs are a lone first token: a direct root transition decides them
+                if output[state] is not None:
+                    spans.append(Span(run_start, run.end(), *payloads[output[state][1]]))
+                continue
+
+            tokens = TOKEN_RE.findall(run_text)
+            matches = self.resolve_overlaps(list(self.iter_token_matches(tokens)))
+            if not matches:
+                continue
+            token_matches = list(TOKEN_RE.finditer(run_text))
+            for first, last, payload in matches:
+                spans.append(Span(run_start + token_matches[first].start(), run_start + token_matches[last].end(),
+                                  *self.payloads[payload]))
+        return spans
+
+    def iter_segments(self, chunks: Iterable, encoding: str = 'utf-8',
+                      errors: str = 'replace') -> Iterator[Tuple[int, str, int]]:
+        """Decode byte (or str) chunks incrementally into (character offset, segment, limit) pieces that tag
+        independently. Spans starting at or after limit are left to the next segment, which then overlaps this one"""
+        decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        longest = self.max_token_length
+        offset = 0          # document offset of the text not yet yielded
+        held = []           # examined text not yet yielded, all after the last safe cut
+        held_length = 0
+        tail = ''           # a token that may continue in the next chunk, examined again with it
+        run = 0             # complete vocabulary tokens since the last safe cut
+        recent = deque(maxlen=max(self.max_entity_tokens, 1))   # document offsets of the latest of those
+
+        for chunk in chunks:
+            text = tail + (chunk if isinstance(chunk, str) else decoder.decode(chunk))
+            base = offset + held_length
+            cut, scan_end, starts = self._last_safe_cut(text)
+            if cut is not None:
+                # No entity spans the token before the cut, so the automaton is back in its root state there
+                run = 0
+                recent.clear()
+            run += len(starts)
+            recent.extend(base + start for start in starts[-recent.maxlen:])
+
+            partial = len(text) - scan_end
+            if not run or partial > longest:
+                # Nothing before the trailing token can be part of a match that continues into it
+                cut = scan_end
+                run = 0
+                recent.clear()
+                if partial > 2 * longest + 1:
+                    # Cut inside a token longer than any vocabulary token, leaving both pieces too long to match
+                    cut = len(text) - longest - 1
+
+            if cut is not None and held_length + cut:
+                segment = ''.join(held) + text[:cut]
+                yield offset, segment, len(segment)
+                offset += len(segment)
+                held = [text[cut:scan_end]] if cut < scan_end else []
+                held_length = len(held[0]) if held else 0
+                tail = text[max(cut, scan_end):]
+                continue
+
+            held.append(text[:scan_end])
+            held_length += scan_end
+            tail = text[scan_end:]
+            if held_length > MAX_STREAM_CARRY:
+                # A run of vocabulary tokens too long to hold: tag it now and retag its last tokens with what follows
+                segment = ''.join(held)
+                overlap = recent[0] - offset
+                yield offset, segment, overlap
+                offset += overlap
+                held = [segment[overlap:]]
+                held_length = len(held[0])
+
+        text = ''.join(held) + tail + decoder.decode(b'', final=True)
+        if text:
+            yield offset, text, len(text)
+
+    def _last_safe_cut(self, text: str) -> Tuple[Optional[int], int, List[int]]:
+        """(end of the last complete token outside the vocabulary or None, start of a token touching the end of
+        the text, starts of the complete vocabulary tokens after the cut) -- searched backwards from the end"""
+        vocabulary = self.vocabulary
+        scan_end = len(text)
+        window = 1024
+        while True:
+            start = max(0, len(text) - window)
+            starts = []
+            for match in reversed(list(TOKEN_RE.finditer(text, start))):
+                if match.end() == len(text):
+                    scan_end = match.start()
+                    continue
+                if match.start() == start and start:
+                    # May be the end of a longer token; search a larger window
+                    break
+                if match.group().lower() not in vocabulary:
+                    starts.reverse()
+                    return match.end(), scan_end, starts
+                starts.append(match.start())
+            else:
+                if not start:
+                    starts.reverse()
+                    return None, scan_end, starts
+            window *= 4
+
+    def tag_segments(self, chunks: Iterable, encoding: str = 'utf-8',
+                     errors: str = 'replace') -> Iterator[Tuple[int, str, List[Span]]]:
+        """(document offset, segment, spans with offsets within the segment) for a document given as chunks"""
+        if not self.built:
+            self.build()
+        tagged_until = 0    # document offset where the last yielded span ends
+        for offset, segment, limit in self.iter_segments(chunks, encoding, errors):
+            spans = []
+            for span in self.tag(segment):
+                if span.start >= limit:
+                    break
+                if span.start + offset >= tagged_until:
+                    spans.append(span)
+                    tagged_until = span.end + offset
+            yield offset, segment, spans
+
+    def tag_stream(self, chunks: Iterable, encoding: str = 'utf-8', errors: str = 'replace') -> Iterator[Span]:
+        """Tag a document given as chunks, yielding spans with document-wide character offsets.
+        Only the current segment is held in memory; fuzzy windows do not cross segment boundaries"""
+        for offset, segment, spans in self.tag_segments(chunks, encoding, errors):
+            for span in spans:
+                yield span._replace(start=span.start + offset, end=span.end + offset)
+
+    def tag_file(self, path: str, encoding: str = 'utf-8', errors: str = 'replace',
+                 chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Span]:
+        """Tag a file of any size in constant memory"""
+        with open(path, 'rb') as f:
+            yield from self.tag_stream(iter(lambda: f.read(chunk_size), b''), encoding, errors)
+
+    def __len__(self) -> int:
+        return len(self.payloads) - self.retired
+
+if __name__ == "__main__":
+    tagger = GazetteerTaggerV2.from_dictionaries()
+    if '--fuzzy' in sys.argv:
+        sys.argv.remove('--fuzzy')
+        tagger.enable_fuzzy()
+    text = ' '.join(sys.argv[1:]) if len(sys.argv) > 1 else sys.stdin.read()
+    for span in tagger.tag(text):
+        print(json.dumps({
+            'start': span.start,
+            'end': span.end,
+            'text': text[span.start:span.end],
+            'entity': span.entity,
+            'category': span.category,
+            'domain': span.domain,
+            'canonical': span.canonical
+        }))
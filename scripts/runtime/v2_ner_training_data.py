@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+NER Training Data Generator v2
+Projects dictionary matches onto tokens as BIO/BILOU labels and streams sharded CoNLL or JSONL
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import v2_tag_corpus as corpus_tagging
+from v2_tag_corpus import Progress, iter_batches, iter_documents, load_tagger
+
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+(?=[^\s])|\n\s*\n')
+
+def iter_sentences(text: str) -> Iterator[Tuple[int, int]]:
+    """Character ranges of sentences (split after . ! ? and on blank lines)"""
+    start = 0
+    for match in SENTENCE_BREAK_RE.finditer(text):
+        if text[start:match.start()].strip():
+            yield start, match.start()
+        start = match.end()
+    if text[start:].strip():
+        yield start, len(text)
+
+def label_tokens(tokens: List[Tuple[int, int]], spans: List, scheme: str = 'BIO') -> List[str]:
+    """Project entity spans onto token offsets as BIO or BILOU labels"""
+    labels = ['O'] * len(tokens)
+    i = 0
+    for span in spans:
+        while i < len(tokens) and tokens[i][0] < span.start:
+            i += 1
+        inside = []
+        j = i
+        while j < len(tokens) and tokens[j][1] <= span.end:
+            inside.append(j)
+            j += 1
+        if not inside:
+            continue
+        tag = span.category
+        if scheme == 'BILOU' and len(inside) == 1:
+            labels[inside[0]] = f'U-{tag}'
+            continue
+        labels[inside[0]] = f'B-{tag}'
+        for k in inside[1:]:
+            labels[k] = f'I-{tag}'
+        if scheme == 'BILOU':
+            labels[inside[-1]] = f'L-{tag}'
+        i = j
+    return labels
+
+def format_sentence(doc_id: str, tokens: List[str], labels: List[str], output_format: str) -> str:
+    """Serialize one labelled sentence as a CoNLL block or a JSONL line"""
+    if output_format == 'conll':
+        return f"# doc_id = {doc_id}\n" + ''.join(f'{t}\t{l}\n' for t, l in zip(tokens, labels)) + '\n'
+    return json.dumps({'doc_id': doc_id, 'tokens': tokens, 'labels': labels}, ensure_ascii=False) + '\n'
+
+def _label_batch(batch_index: int, batch: List[Tuple[str, str]], scheme: str,
+                 output_format: str) -> Tuple[int, List[Tuple[bytes, Tuple[str, ...], str]], int, int]:
+    """Tokenize, tag and label one batch; returns (dedupe digest, categories, serialized) per sentence"""
+    sentences = []
+    size = 0
+    for doc_id, text in batch:
+        size += len(text.encode('utf-8'))
+        spans = corpus_tagging._TAGGER.tag(text)
+        span_index = 0
+        for start, end in iter_sentences(text):
+            while span_index < len(spans) and spans[span_index].start < start:
+                span_index += 1
+            sentence_spans = []
+            while span_index < len(spans) and spans[span_index].end <= end:
+                sentence_spans.append(spans[span_index])
+                span_index += 1
+
+            matches = list(TOKEN_RE.finditer(text, start, end))
+            if not matches:
+                continue
+            tokens = [m.group() for m in matches]
+            labels = label_tokens([(m.start(), m.end()) for m in matches], sentence_spans, scheme)
+            digest = hashlib.blake2b(' '.join(tokens).casefold().encode('utf-8'), digest_size=16).digest()
+            sentences.append((
+                digest,
+                tuple(sorted({span.category for span in sentence_spans})),
+                format_sentence(doc_id, tokens, labels, output_format)
+            ))
+    return batch_index, sentences, len(batch), size
+
+class BloomFilter:
+    """Fixed-size approximate set used for constant-memory sentence deduplication"""
+
+    def __init__(self, capacity: int = 50_000_000, error_rate: float = 0.001):
+        # Standard sizing: m = -n ln p / (ln 2)^2, k = m/n ln 2
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes) -> bool:
+        """Add a 16-byte key digest; returns False if it was (probably) already present"""
+        present = True
+        for position in self._positions(digest):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return not present
+
+class ShardWriter:
+    """Writes labelled sentences into size-bounded CoNLL or JSONL shards"""
+
+    def __init__(self, output_dir: str, output_format: str = 'conll', shard_size: int = 100000,
+                 prefix: str = 'train'):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.shard_index = 0
+        self.in_shard = 0
+        self.file = None
+        self.shards = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _open_next(self):
+        if self.file is not None:
+            self.file.close()
+        extension = 'conll' if self.output_format == 'conll' else 'jsonl'
+        path = os.path.join(self.output_dir, f'{self.prefix}-{self.shard_index:05d}.{extension}')
+        self.file = open(path, 'w', encoding='utf-8')
+        self.shards.append(path)
+        self.shard_index += 1
+        self.in_shard = 0
+
+    def write(self, serialized: str):
+        """Append one serialized sentence, rolling over to a new shard when full"""
+        if self.file is None or self.in_shard >= self.shard_size:
+            self._open_next()
+        self.file.write(serialized)
+        self.in_shard += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class StratifiedSampler:
+    """Per-category quotas plus a deterministic keep rate for entity-free sentences"""
+
+    def __init__(self, max_per_category: Optional[int] = None, negative_rate: float = 0.1):
+        self.max_per_category = max_per_category
+        self.negative_rate = negative_rate
+        self.category_counts = {}
+        self.negatives = 0
+
+    def accept(self, categories: Tuple[str, ...], digest: bytes) -> bool:
+        if not categories:
+            # Hash-based keep decision so reruns select the same negatives
+            keep = int.from_bytes(digest[8:], 'little') / 2 ** 64 < self.negative_rate
+            self.negatives += keep
+            return keep
+        if self.max_per_category is not None and all(
+                self.category_counts.get(category, 0) >= self.max_per_category for category in categories):
+            return False
+        for category in categories:
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        return True
+
+def generate_training_data(source: str, output_dir: str, final_dir: str = 'data/final', scheme: str = 'BIO',
+                           output_format: str = 'conll', shard_size: int = 100000,
+                           max_per_category: Optional[int] = None, negative_rate: float = 0.1,
+                           dedupe_capacity: int = 50_000_000, workers: Optional[int] = None,
+                           batch_size: int = 256, max_in_flight: Optional[int] = None,
+                           text_field: str = 'text', id_field: str = 'id') -> Dict:
+    """Stream a corpus through tagging, labelling, dedupe and stratified sampling into shards"""
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    tagger = load_tagger(final_dir)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    if context.get_start_method() == 'fork':
+        corpus_tagging._TAGGER = tagger
+
+    seen = BloomFilter(dedupe_capacity)
+    sampler = StratifiedSampler(max_per_category, negative_rate)
+    writer = ShardWriter(output_dir, output_format, shard_size)
+    progress = Progress()
+    stats = {'sentences': 0, 'duplicates': 0, 'written': 0}
+
+    def consume(future):
+        _, sentences, documents, size = future.result()
+        for digest, categories, serialized in sentences:
+            stats['sentences'] += 1
+            if not seen.add(digest):
+                stats['duplicates'] += 1
+                continue
+            if sampler.accept(categories, digest):
+                writer.write(serialized)
+                stats['written'] += 1
+        progress.update(documents, size)
+
+    in_flight = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=corpus_tagging._init_worker, initargs=(final_dir, False)) as pool:
+            for batch_index, batch in iter_batches(iter_documents(source, text_field, id_field), batch_size):
+                in_flight.append(pool.submit(_label_batch, batch_index, batch, scheme, output_format))
+                while len(in_flight) >= max_in_flight:
+                    consume(in_flight.popleft())
+            while in_flight:
+                consume(in_flight.popleft())
+    finally:
+        writer.close()
+
+    progress.update(0, 0, force=True)
+    stats.update({
+        'documents': progress.documents,
+        'seconds': time.perf_counter() - progress.start,
+        'category_counts': sampler.category_counts,
+        'negative_sentences': sampler.negatives,
+        'shards': writer.shards
+    })
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump({**stats, 'scheme': scheme, 'format': output_format,
+                   'tag_types': sorted({payload[1] for payload in tagger.payloads})}, f, indent=2)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate BIO/BILOU NER training data from dictionary matches")
+    parser.add_argument('source', help="JSONL file, directory of .txt files, or '-' for stdin")
+    parser.add_argument('output_dir')
+    parser.add_argument('--final-dir', default='data/final')
+    parser.add_argument('--scheme', choices=['BIO', 'BILOU'], default='BIO')
+    parser.add_argument('--format', choices=['conll', 'jsonl'], default='conll')
+    parser.add_argument('--shard-size', type=int, default=100000, help='Sentences per shard')
+    parser.add_argument('--max-per-category', type=int, default=None,
+                        help='Stop sampling sentences once all their categories reach this count')
+    parser.add_argument('--negative-rate', type=float, default=0.1,
+                        help='Fraction of entity-free sentences to keep')
+    parser.add_argument('--dedupe-capacity', type=int, default=50_000_000,
+                        help='Expected distinct sentences (sizes the fixed-memory dedupe filter)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--id-field', default='id')
+    args = parser.parse_args()
+
+    stats = generate_training_data(args.source, args.output_dir, args.final_dir, args.scheme, args.format,
+                                   args.shard_size, args.max_per_category, args.negative_rate,
+                                   args.dedupe_capacity, args.workers, args.batch_size,
+                                   text_field=args.text_field, id_field=args.id_field)
+    print(f"Wrote {stats['written']} sentences to {len(stats['shards'])} shards "
+          f"({stats['duplicates']} duplicates dropped) in {stats['seconds']:.1f} s")
+    for category, count in sorted(stats['category_counts'].items()):
+        print(f"  {category}: {count}")
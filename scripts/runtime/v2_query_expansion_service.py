@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Cross-Domain Query Expansion Service v2
+Asyncio HTTP service that expands RAG queries with cross-domain dictionary mappings
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from v2_dictionary_lookup import iter_mappings, normalize_entity_text
+from v2_dictionary_releases import HotReloaderV2
+from v2_gazetteer_tagger import GazetteerTaggerV2
+
+# Curated rule-based relationships rank ahead of similarity-derived ones at equal confidence
+RELATIONSHIP_PRIORITY = {
+    'energy_to_transport': 0,
+    'services_to_supply': 0,
+    'equipment_to_efficiency': 0,
+    'performance_to_carbon': 0,
+    'standards_alignment': 0,
+    'semantic_similarity': 1
+}
+
+class ExpansionIndexV2:
+    """Bidirectional mapping indexes plus the tagger used to detect query entities"""
+
+    def __init__(self, final_dir: str = 'data/final', fuzzy: bool = False):
+        self.tagger = GazetteerTaggerV2.from_dictionaries(final_dir)
+        if fuzzy:
+            self.tagger.enable_fuzzy(final_dir=final_dir)
+
+        # normalized entity -> [(term, category, domain, confidence, relationship type)]
+        self.forward = {}
+        self.backward = {}
+        for mapping in iter_mappings(final_dir):
+            forward_key, forward_entry, backward_key, backward_entry = self.mapping_entries(mapping)
+            self.forward.setdefault(forward_key, []).append(forward_entry)
+            self.backward.setdefault(backward_key, []).append(backward_entry)
+
+    @staticmethod
+    def mapping_entries(mapping: Dict) -> Tuple[str, Tuple, str, Tuple]:
+        """Forward and backward index keys and entries of a mapping"""
+        confidence = float(mapping.get('confidence_score', 0.0))
+        rel_type = mapping.get('relationship_type', 'unknown')
+        return (
+            normalize_entity_text(mapping['renewable_energy_entity']),
+            (mapping['green_logistics_entity'], mapping['green_logistics_category'], 'green_logistics',
+             confidence, rel_type),
+            normalize_entity_text(mapping['green_logistics_entity']),
+            (mapping['renewable_energy_entity'], mapping['renewable_energy_category'], 'renewable_energy',
+             confidence, rel_type)
+        )
+
+    def with_delta(self, delta: Dict) -> 'ExpansionIndexV2':
+        """Copy with a release delta applied to the tagger and to the touched mapping entries"""
+        index = copy.copy(self)
+        index.tagger = self.tagger.with_delta(delta)
+        index.forward = dict(self.forward)
+        index.backward = dict(self.backward)
+
+        def discard(table, key, term):
+            entries = [entry for entry in table.get(key, ()) if entry[0] != term]
+            if entries:
+                table[key] = entries
+            else:
+                table.pop(key, None)
+
+        mappings = delta['mappings']
+        stale = [tuple(key) for key in mappings['removed']]
+        stale += [(mapping['renewable_energy_entity'], mapping['green_logistics_entity'])
+                  for mapping in mappings['changed']]
+        for re_entity, gl_entity in stale:
+            discard(index.forward, normalize_entity_text(re_entity), gl_entity)
+            discard(index.backward, normalize_entity_text(gl_entity), re_entity)
+        for mapping in mappings['added'] + mappings['changed']:
+            forward_key, forward_entry, backward_key, backward_entry = self.mapping_entries(mapping)
+            discard(index.forward, forward_key, forward_entry[0])
+            discard(index.backward, backward_key, backward_entry[0])
+            index.forward[forward_key] = index.forward.get(forward_key, []) + [forward_entry]
+            index.backward[backward_key] = index.backward.get(backward_key, []) + [backward_entry]
+        return index
+
+    def expand(self, query: str, limit: int = 10) -> Dict:
+        """Detected entities and ranked expansion terms for one query"""
+        spans = self.tagger.tag(query)
+        # Mappings are keyed by canonical entities; aliases in the query resolve to them
+        detected = {normalize_entity_text(span.canonical or span.entity): span for span in spans}
+
+        best = {}
+        for key, span in detected.items():
+            index = self.forward if span.domain == 'renewable_energy' else self.backward
+            for term, category, domain, confidence, rel_type in index.get(key, ()):
+                term_key = normalize_entity_text(term)
+                if term_key in detected:
+                    continue
+                rank = (-confidence, RELATIONSHIP_PRIORITY.get(rel_type, 2), term)
+                if term_key not in best or rank < best[term_key][0]:
+                    best[term_key] = (rank, {
+                        'term': term,
+                        'category': category,
+                        'domain': domain,
+                        'confidence_score': confidence,
+                        'relationship_type': rel_type,
+                        'source_entity': span.entity
+                    })
+
+        expansions = [item for _, item in sorted(best.values(), key=lambda pair: pair[0])]
+        return {
+            'query': query,
+            'entities': [
+                {'start': s.start, 'end': s.end, 'entity': s.entity, 'category': s.category, 'domain': s.domain}
+                for s in spans
+            ],
+            'expansions': expansions[:limit]
+        }
+
+class LRUCache:
+    """Small ordered-dict LRU with hit/miss counters"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.hits += 1
+            return self.data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+class LatencyRecorder:
+    """Rolling window of request latencies for p50/p99 reporting"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class QueryExpansionServiceV2:
+    """HTTP front end with result caching and micro-batching of concurrent requests"""
+
+    def __init__(self, index: ExpansionIndexV2, cache_size: int = 10000, batch_window: float = 0.002,
+                 max_batch: int = 64, reloader: Optional[HotReloaderV2] = None):
+        self.index = index
+        self.reloader = reloader
+        self.cache = LRUCache(cache_size)
+        self.latency = LatencyRecorder()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue = None
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def _collect(self) -> list:
+        """Next batch: dispatched at once on an idle server, else gathered for up to batch_window"""
+        batch = [await self.queue.get()]
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if len(batch) == 1:
+            return batch
+        # Requests are already queueing up, so a short wait lets the batch fill further
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _expand_all(index: ExpansionIndexV2, keys: list) -> Dict:
+        """Expand distinct (query, limit) keys; runs on a worker thread, reading the index only"""
+        resolved = {}
+        for query, limit in keys:
+            try:
+                resolved[(query, limit)] = (index.expand(query, limit), None)
+            except Exception as e:
+                # Fail this query only; the rest of the batch is unaffected
+                resolved[(query, limit)] = (None, e)
+        return resolved
+
+    async def _batcher(self):
+        """Resolve queued queries in batches: cache hits on the loop, misses in one worker-thread call"""
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.batched_queries += len(batch)
+
+            resolved = {}
+            for query, limit, _ in batch:
+                if (query, limit) not in resolved:
+                    result = self.cache.get((query, limit))
+                    resolved[(query, limit)] = None if result is None else (result, None)
+            misses = [key for key, value in resolved.items() if value is None]
+            if misses:
+                # Off the event loop, so other connections keep being served while the batch runs
+                index = self.index
+                expanded = await asyncio.to_thread(self._expand_all, index, misses)
+                resolved.update(expanded)
+                if index is self.index:    # results of a replaced release are served but not cached
+                    for key, (result, error) in expanded.items():
+                        if error is None:
+                            self.cache.put(key, result)
+
+            for query, limit, future in batch:
+                if future.done():
+                    continue
+                result, error = resolved[(query, limit)]
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    async def _reload_loop(self, poll_seconds: float):
+        """Apply new dictionary releases off the event loop, then swap the index between requests"""
+        while True:
+            await asyncio.sleep(poll_seconds)
+            try:
+                reloaded = await asyncio.to_thread(self.reloader.refresh)
+            except Exception as e:
+                print(f"Dictionary reload failed, still serving release {self.reloader.version}: {e}")
+                continue
+            if reloaded:
+                self.index = self.reloader.current
+                self.cache.data.clear()
+                print(f"Serving dictionary release {self.reloader.version} "
+                      f"(applied in {self.reloader.stats['last_reload_seconds']:.2f} s)")
+
+    async def submit(self, query: str, limit: int = 10) -> Dict:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, limit, future))
+        return await future
+
+    def metrics(self) -> Dict:
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            'requests': self.latency.count,
+            'latency_ms': {
+                'p50': self.latency.percentile(0.50) * 1000,
+                'p99': self.latency.percentile(0.99) * 1000
+            },
+            'cache': {
+                'size': len(self.cache.data),
+                'hits': self.cache.hits,
+                'misses': self.cache.misses,
+                'hit_rate': self.cache.hits / lookups if lookups else 0.0
+            },
+            'batching': {
+                'batches': self.batches,
+                'avg_batch_size': self.batched_queries / self.batches if self.batches else 0.0
+            },
+            'dictionary_release': self.reloader.version if self.reloader is not None else None
+        }
+
+    async def route(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if url.path == '/health':
+            return 200, {'status': 'ok'}
+        if url.path == '/metrics':
+            return 200, self.metrics()
+        if url.path not in ('/expand', '/expand_batch'):
+            return 404, {'error': f'unknown endpoint {url.path}'}
+
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'error': 'request body is not valid JSON'}
+        if not isinstance(payload, dict):
+            return 400, {'error': 'request body must be a JSON object'}
+        limit = payload.get('limit', params.get('limit', [10])[0])
+        if isinstance(limit, bool) or not isinstance(limit, (int, str)) or not str(limit).strip().isdigit():
+            return 400, {'error': 'limit must be a non-negative integer'}
+        limit = int(limit)
+
+        if url.path == '/expand':
+            query = payload.get('query') if method == 'POST' else params.get('q', [''])[0]
+            if not query:
+                return 400, {'error': 'missing query'}
+            if not isinstance(query, str):
+                return 400, {'error': 'query must be a string'}
+            return 200, await self.submit(query, limit)
+        if method == 'POST':
+            queries = payload.get('queries', [])
+            if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+                return 400, {'error': 'queries must be a list of strings'}
+            results = await asyncio.gather(*(self.submit(query, limit) for query in queries))
+            return 200, {'results': list(results)}
+        return 404, {'error': f'unknown endpoint {url.path}'}
+
+    @staticmethod
+    async def respond(writer: asyncio.StreamWriter, status: int, response: Dict, keep_alive: bool):
+        data = json.dumps(response).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+        )
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 handling with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                # A malformed request leaves the stream position unknown, so the connection is closed after the 400
+                if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+                    await self.respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+                method, target, _ = parts
+                length = headers.get('content-length', '0')
+                if not length.isdigit():
+                    await self.respond(writer, 400, {'error': 'invalid Content-Length'}, False)
+                    break
+                body = await reader.readexactly(int(length))
+
+                start = time.perf_counter()
+                try:
+                    status, response = await self.route(method, target, body)
+                except Exception as e:
+                    status, response = 500, {'error': f'{type(e).__name__}: {e}'}
+                if target.startswith('/expand'):
+                    self.latency.record(time.perf_counter() - start)
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, reload_seconds: float = 5.0):
+        self.queue = asyncio.Queue()
+        tasks = [asyncio.create_task(self._batcher())]
+        if self.reloader is not None:
+            tasks.append(asyncio.create_task(self._reload_loop(reload_seconds)))
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Query expansion service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-domain query expansion service for RAG")
+    parser.add_argument('--final-dir', default='data/final')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-size', type=int, default=10000)
+    parser.add_argument('--batch-window-ms', type=float, default=2.0)
+    parser.add_argument('--fuzzy', action='store_true', help='Enable fuzzy entity detection')
+    parser.add_argument('--reload-seconds', type=float, default=0.0,
+                        help='Poll the release log and apply dictionary deltas at this interval (0 disables)')
+    args = parser.parse_args()
+
+    reloader = None
+    if args.reload_seconds > 0:
+        reloader = HotReloaderV2(lambda: ExpansionIndexV2(args.final_dir, args.fuzzy), args.final_dir)
+        index = reloader.current
+    else:
+        index = ExpansionIndexV2(args.final_dir, args.fuzzy)
+    service = QueryExpansionServiceV2(index, args.cache_size, args.batch_window_ms / 1000, reloader=reloader)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.reload_seconds))
+    except KeyboardInterrupt:
+        pass
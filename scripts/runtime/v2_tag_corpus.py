@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Streaming Corpus Tagger v2
+Annotates JSONL corpora or text-file directories with dictionary entities in a process pool,
+or streams a single very large document through the tagger in constant memory
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from v2_gazetteer_tagger import STREAM_CHUNK_SIZE, GazetteerTaggerV2, Span
+
+# Compiled once in the parent; forked workers share it copy-on-write instead of unpickling it per task
+_TAGGER = None
+
+def _init_worker(final_dir: str, fuzzy: bool):
+    """Build the tagger in workers that were not forked from a parent holding one"""
+    global _TAGGER
+    if _TAGGER is None:
+        _TAGGER = load_tagger(final_dir, fuzzy)
+
+def load_tagger(final_dir: str, fuzzy: bool = False) -> GazetteerTaggerV2:
+    tagger = GazetteerTaggerV2.from_dictionaries(final_dir)
+    if fuzzy:
+        tagger.enable_fuzzy(final_dir=final_dir)
+    return tagger
+
+def span_record(span: Span, text: str, offset: int = 0) -> Dict:
+    """JSON record of a span found in text, which starts at offset within its document"""
+    return {
+        'start': span.start + offset,
+        'end': span.end + offset,
+        'text': text[span.start:span.end],
+        'entity': span.entity,
+        'category': span.category,
+        'domain': span.domain
+    }
+
+def annotate(tagger: GazetteerTaggerV2, doc_id: str, text: str) -> Dict:
+    """Annotation record for one document"""
+    return {'id': doc_id, 'spans': [span_record(span, text) for span in tagger.tag(text)]}
+
+def _tag_batch(batch_index: int, batch: List[Tuple[str, str]]) -> Tuple[int, str, int, int]:
+    """Tag one batch; returns (batch index, JSONL block, documents, input bytes)"""
+    lines = []
+    size = 0
+    for doc_id, text in batch:
+        size += len(text.encode('utf-8'))
+        lines.append(json.dumps(annotate(_TAGGER, doc_id, text), ensure_ascii=False))
+    return batch_index, ''.join(line + '\n' for line in lines), len(batch), size
+
+def iter_documents(source: str, text_field: str = 'text', id_field: str = 'id') -> Iterator[Tuple[str, str]]:
+    """Stream (id, text) from a JSONL file, stdin ('-') or a directory of .txt files"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith('.txt'):
+                    path = os.path.join(root, filename)
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        yield os.path.relpath(path, source), f.read()
+        return
+
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(stream):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield str(record.get(id_field, line_number)), record.get(text_field) or ''
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def iter_batches(documents: Iterator[Tuple[str, str]], batch_size: int) -> Iterator[Tuple[int, List]]:
+    batch = []
+    batch_index = 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch_index, batch
+            batch_index += 1
+            batch = []
+    if batch:
+        yield batch_index, batch
+
+class Checkpoint:
+    """Completed batches and output size, so an interrupted run can resume"""
+
+    def __init__(self, path: str, batch_size: int):
+        self.path = path
+        self.batch_size = batch_size
+        self.watermark = 0          # every batch below this index is written
+        self.completed = set()      # written batches at or above the watermark
+        self.output_bytes = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        if data['batch_size'] != self.batch_size:
+            raise ValueError(f"Checkpoint {self.path} used batch size {data['batch_size']}, not {self.batch_size}")
+        self.watermark = data['watermark']
+        self.completed = set(data['completed'])
+        self.output_bytes = data['output_bytes']
+        return True
+
+    def is_done(self, batch_index: int) -> bool:
+        return batch_index < self.watermark or batch_index in self.completed
+
+    def mark(self, batch_index: int, output_bytes: int):
+        self.completed.add(batch_index)
+        while self.watermark in self.completed:
+            self.completed.remove(self.watermark)
+            self.watermark += 1
+        self.output_bytes = output_bytes
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'batch_size': self.batch_size,
+                'watermark': self.watermark,
+                'completed': sorted(self.completed),
+                'output_bytes': self.output_bytes
+            }, f)
+        os.replace(tmp_path, self.path)
+
+class Progress:
+    """Periodic docs/sec and MB/sec readout on stderr"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.documents = 0
+        self.bytes = 0
+
+    def update(self, documents: int, size: int, force: bool = False):
+        self.documents += documents
+        self.bytes += size
+        now = time.perf_counter()
+        if force or now - self.last_report >= self.interval:
+            self.last_report = now
+            elapsed = max(now - self.start, 1e-9)
+            print(f"{self.documents} docs, {self.bytes / 1e6:.1f} MB | "
+                  f"{self.documents / elapsed:,.0f} docs/s, {self.bytes / 1e6 / elapsed:.1f} MB/s",
+                  file=sys.stderr)
+
+def tag_corpus(source: str, output: str, final_dir: str = 'data/final', workers: Optional[int] = None,
+               batch_size: int = 256, max_in_flight: Optional[int] = None, ordered: bool = True,
+               resume: bool = False, fuzzy: bool = False, text_field: str = 'text',
+               id_field: str = 'id') -> Dict:
+    """Tag every document of the source and write JSONL annotations to output"""
+    global _TAGGER
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    checkpoint = Checkpoint(output + '.checkpoint.json', batch_size)
+    if resume and checkpoint.load():
+        # Drop anything written after the last checkpoint
+        with open(output, 'ab') as f:
+            f.truncate(checkpoint.output_bytes)
+        print(f"Resuming after {checkpoint.watermark + len(checkpoint.completed)} completed batches", file=sys.stderr)
+    else:
+        open(output, 'w').close()
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    if context.get_start_method() == 'fork':
+        _TAGGER = load_tagger(final_dir, fuzzy)
+
+    progress = Progress()
+    in_flight = deque()
+    batches = (item for item in iter_batches(iter_documents(source, text_field, id_field), batch_size)
+               if not checkpoint.is_done(item[0]))
+
+    with open(output, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                initializer=_init_worker, initargs=(final_dir, fuzzy)) as pool:
+
+        def write(future):
+            batch_index, block, documents, size = future.result()
+            out.write(block)
+            out.flush()
+            checkpoint.mark(batch_index, out.tell())
+            checkpoint.save()
+            progress.update(documents, size)
+
+        for batch_index, batch in batches:
+            in_flight.append(pool.submit(_tag_batch, batch_index, batch))
+            # Backpressure: never hold more than max_in_flight batches in memory
+            while len(in_flight) >= max_in_flight:
+                if ordered:
+                    write(in_flight.popleft())
+                else:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight.remove(future)
+                        write(future)
+
+        while in_flight:
+            write(in_flight.popleft())
+
+    progress.update(0, 0, force=True)
+    # An input without documents never writes a checkpoint
+    if os.path.exists(checkpoint.path):
+        os.remove(checkpoint.path)
+    return {'documents': progress.documents, 'bytes': progress.bytes,
+            'seconds': time.perf_counter() - progress.start}
+
+def tag_document_stream(source: str, output: str, final_dir: str = 'data/final', fuzzy: bool = False,
+                        doc_id: Optional[str] = None, chunk_size: int = STREAM_CHUNK_SIZE) -> Dict:
+    """Tag one text document of any size chunk by chunk, writing one JSONL record per span"""
+    tagger = load_tagger(final_dir, fuzzy)
+    doc_id = doc_id or ('-' if source == '-' else os.path.basename(source))
+    progress = Progress()
+    spans = 0
+
+    stream = sys.stdin.buffer if source == '-' else open(source, 'rb')
+
+    def chunks():
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            progress.update(0, len(chunk))
+            yield chunk
+
+    try:
+        with open(output, 'w', encoding='utf-8') as out:
+            # Segments are cut where no entity can continue, so only the current one is ever held
+            for offset, segment, segment_spans in tagger.tag_segments(chunks()):
+                for span in segment_spans:
+                    record = {'id': doc_id, **span_record(span, segment, offset)}
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    spans += 1
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+    progress.update(1, 0, force=True)
+    return {'documents': 1, 'spans': spans, 'bytes': progress.bytes,
+            'seconds': time.perf_counter() - progress.start}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag a JSONL corpus or text-file directory with dictionary entities")
+    parser.add_argument('source', help="JSONL file, directory of .txt files, or '-' for stdin")
+    parser.add_argument('output', help='JSONL annotations output file')
+    parser.add_argument('--stream', action='store_true',
+                        help='Tag source as one large text document, writing one record per span')
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE, help='Bytes read per chunk with --stream')
+    parser.add_argument('--final-dir', default='data/final')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='Maximum batches submitted but not yet written (default: 2 x workers)')
+    parser.add_argument('--unordered', action='store_true', help='Write batches as they finish')
+    parser.add_argument('--resume', action='store_true', help='Continue from the output checkpoint')
+    parser.add_argument('--fuzzy', action='store_true', help='Enable fuzzy fallback matching')
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--id-field', default='id')
+    args = parser.parse_args()
+
+    if args.stream:
+        stats = tag_document_stream(args.source, args.output, args.final_dir, args.fuzzy, chunk_size=args.chunk_size)
+        print(f"Tagged {stats['spans']} spans in {stats['bytes'] / 1e6:.1f} MB "
+              f"in {stats['seconds']:.1f} s -> {args.output}")
+        sys.exit(0)
+
+    stats = tag_corpus(args.source, args.output, args.final_dir, args.workers, args.batch_size,
+                       args.max_in_flight, not args.unordered, args.resume, args.fuzzy,
+                       args.text_field, args.id_field)
+    print(f"Tagged {stats['documents']} documents ({stats['bytes'] / 1e6:.1f} MB) "
+          f"in {stats['seconds']:.1f} s -> {args.output}")
@@ -11,6 +11,13 @@ import re
 import time
 from typing import Dict, List, Set
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'processing'))
+
+from v2_alias_table import AliasTableV2
+from v2_instrumentation import StageMetricsV2
+from v2_sqlite_store import configured_store
 
 class GreenLogisticsScraperV2:
     def __init__(self):
@@ -51,6 +58,9 @@ class GreenLogisticsScraperV2:
             ]
         }
 
+        self.metrics = StageMetricsV2('green_logistics_scraper')
+        self.aliases = AliasTableV2()
+
     def scrape_epa_smartway_data(self) -> Dict[str, List[str]]:
         """Scrape EPA SmartWay program data"""
         entities = {'TRANSPORT_MODE': [], 'CARBON_METRIC': [], 'SUPPLY_CHAIN_ELEMENT': [], 'EFFICIENCY_TECHNOLOGY': [], 'ENVIRONMENTAL_STANDARD': []}
@@ -222,24 +232,31 @@ class GreenLogisticsScraperV2:
             
             cleaned[category] = sorted(list(unique_entities))
         
+        # Variant forms stay in the entity lists; downstream stages collapse them through the alias table
+        self.aliases = AliasTableV2.from_entities(cleaned)
         return cleaned
 
     def scrape_all_sources(self) -> Dict[str, List[str]]:
         """Scrape all sources and combine results"""
         print("Scraping EPA SmartWay data...")
-        smartway_data = self.scrape_epa_smartway_data()
+        with self.metrics.step('source:epa_smartway'):
+            smartway_data = self.scrape_epa_smartway_data()
         
         print("Scraping GRI standards data...")
-        gri_data = self.scrape_gri_standards_data()
+        with self.metrics.step('source:gri'):
+            gri_data = self.scrape_gri_standards_data()
         
         print("Scraping ISO standards data...")
-        iso_data = self.scrape_iso_standards_data()
+        with self.metrics.step('source:iso'):
+            iso_data = self.scrape_iso_standards_data()
         
         print("Scraping EU Green Deal data...")
-        eu_data = self.scrape_eu_green_deal_data()
+        with self.metrics.step('source:eu_green_deal'):
+            eu_data = self.scrape_eu_green_deal_data()
         
         print("Scraping CDP data...")
-        cdp_data = self.scrape_cdp_data()
+        with self.metrics.step('source:cdp'):
+            cdp_data = self.scrape_cdp_data()
         
         # Combine all sources
         combined = {}
@@ -252,15 +269,23 @@ class GreenLogisticsScraperV2:
             combined[category].extend(cdp_data.get(category, []))
         
         # Clean and deduplicate
-        return self.clean_and_deduplicate(combined)
+        self.metrics.count('raw_entities', sum(len(v) for v in combined.values()))
+        with self.metrics.step('dedupe', items=sum(len(v) for v in combined.values())):
+            cleaned = self.clean_and_deduplicate(combined)
+        self.metrics.count('entities', sum(len(v) for v in cleaned.values()))
+        self.metrics.count('alias_groups', self.aliases.stats()['alias_groups'])
+        return cleaned
 
     def save_entities(self, entities: Dict[str, List[str]], filename: str):
         """Save entities to JSON file"""
         os.makedirs('data/raw', exist_ok=True)
-        with open(f'data/raw/{filename}', 'w') as f:
-            json.dump(entities, f, indent=2)
+        with self.metrics.step('write', items=sum(len(v) for v in entities.values())):
+            with open(f'data/raw/{filename}', 'w') as f:
+                json.dump(entities, f, indent=2)
         
         print(f"Saved {sum(len(v) for v in entities.values())} entities to {filename}")
+        alias_stats = self.aliases.stats()
+        print(f"  {alias_stats['aliases']} aliases in {alias_stats['alias_groups']} groups")
         for category, entity_list in entities.items():
             print(f"  {category}: {len(entity_list)} entities")
 
@@ -268,3 +293,8 @@ if __name__ == "__main__":
     scraper = GreenLogisticsScraperV2()
     entities = scraper.scrape_all_sources()
     scraper.save_entities(entities, 'v2_green_logistics_entities.json')
+    store = configured_store()
+    if store is not None:
+        with scraper.metrics.step('store_write', items=sum(len(v) for v in entities.values())):
+            store.replace_entities('green_logistics', entities, full=True)
+    scraper.metrics.save()
@@ -11,6 +11,13 @@ import re
 import time
 from typing import Dict, List, Set
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'processing'))
+
+from v2_alias_table import AliasTableV2
+from v2_instrumentation import StageMetricsV2
+from v2_sqlite_store import configured_store
 
 class RenewableEnergyScraperV2:
     def __init__(self):
@@ -59,6 +66,9 @@ class RenewableEnergyScraperV2:
             'https://energy.ec.europa.eu/topics/renewable-energy_en'
         ]
 
+        self.metrics = StageMetricsV2('renewable_energy_scraper')
+        self.aliases = AliasTableV2()
+
     def scrape_irena_data(self) -> Dict[str, List[str]]:
         """Scrape IRENA renewable energy data"""
         entities = {'TECHNOLOGY_TYPE': [], 'SERVICE_CATEGORY': [], 'EQUIPMENT_COMPONENT': [], 'PERFORMANCE_METRIC': [], 'REGULATORY_STANDARD': []}
@@ -75,16 +85,23 @@ class RenewableEnergyScraperV2:
             
             for url in irena_urls:
                 try:
-                    response = requests.get(url, timeout=10)
+                    with self.metrics.step('fetch') as step:
+                        response = requests.get(url, timeout=10)
+                        step['items'] = len(response.content)
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        text = soup.get_text().lower()
+                        with self.metrics.step('parse', items=len(response.content)):
+                            soup = BeautifulSoup(response.content, 'html.parser')
+                            text = soup.get_text().lower()
                         
                         # Extract entities using patterns
-                        for category, patterns in self.patterns.items():
-                            for pattern in patterns:
-                                matches = re.findall(pattern, text, re.IGNORECASE)
-                                entities[category].extend(matches)
+                        with self.metrics.step('extract') as step:
+                            step['items'] = 0
+                            for category, patterns in self.patterns.items():
+                                for pattern in patterns:
+                                    matches = re.findall(pattern, text, re.IGNORECASE)
+                                    entities[category].extend(matches)
+                                    step['items'] += len(matches)
+                        self.metrics.count('pages_fetched')
                         
                         time.sleep(1)  # Rate limiting
                 except Exception as e:
@@ -207,21 +224,27 @@ class RenewableEnergyScraperV2:
             
             cleaned[category] = sorted(list(unique_entities))
         
+        # Variant forms stay in the entity lists; downstream stages collapse them through the alias table
+        self.aliases = AliasTableV2.from_entities(cleaned)
         return cleaned
 
     def scrape_all_sources(self) -> Dict[str, List[str]]:
         """Scrape all sources and combine results"""
         print("Scraping IRENA data...")
-        irena_data = self.scrape_irena_data()
+        with self.metrics.step('source:irena'):
+            irena_data = self.scrape_irena_data()
         
         print("Scraping NREL data...")
-        nrel_data = self.scrape_nrel_data()
+        with self.metrics.step('source:nrel'):
+            nrel_data = self.scrape_nrel_data()
         
         print("Scraping IEA data...")
-        iea_data = self.scrape_iea_data()
+        with self.metrics.step('source:iea'):
+            iea_data = self.scrape_iea_data()
         
         print("Scraping EU data...")
-        eu_data = self.scrape_eu_data()
+        with self.metrics.step('source:eu'):
+            eu_data = self.scrape_eu_data()
         
         # Combine all sources
         combined = {}
@@ -233,15 +256,23 @@ class RenewableEnergyScraperV2:
             combined[category].extend(eu_data.get(category, []))
         
         # Clean and deduplicate
-        return self.clean_and_deduplicate(combined)
+        self.metrics.count('raw_entities', sum(len(v) for v in combined.values()))
+        with self.metrics.step('dedupe', items=sum(len(v) for v in combined.values())):
+            cleaned = self.clean_and_deduplicate(combined)
+        self.metrics.count('entities', sum(len(v) for v in cleaned.values()))
+        self.metrics.count('alias_groups', self.aliases.stats()['alias_groups'])
+        return cleaned
 
     def save_entities(self, entities: Dict[str, List[str]], filename: str):
         """Save entities to JSON file"""
         os.makedirs('data/raw', exist_ok=True)
-        with open(f'data/raw/{filename}', 'w') as f:
-            json.dump(entities, f, indent=2)
+        with self.metrics.step('write', items=sum(len(v) for v in entities.values())):
+            with open(f'data/raw/{filename}', 'w') as f:
+                json.dump(entities, f, indent=2)
         
         print(f"Saved {sum(len(v) for v in entities.values())} entities to {filename}")
+        alias_stats = self.aliases.stats()
+        print(f"  {alias_stats['aliases']} aliases in {alias_stats['alias_groups']} groups")
         for category, entity_list in entities.items():
             print(f"  {category}: {len(entity_list)} entities")
 
@@ -249,3 +280,8 @@ if __name__ == "__main__":
     scraper = RenewableEnergyScraperV2()
     entities = scraper.scrape_all_sources()
     scraper.save_entities(entities, 'v2_renewable_energy_entities.json')
+    store = configured_store()
+    if store is not None:
+        with scraper.metrics.step('store_write', items=sum(len(v) for v in entities.values())):
+            store.replace_entities('renewable_energy', entities, full=True)
+    scraper.metrics.save()
@@ -4,31 +4,158 @@ Enhanced AI-based Semantic Validation for NER Dictionaries v2
 Uses sentence transformers for entity validation without human intervention
 """
 
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
+import argparse
+import hashlib
 import json
 import os
-from typing import Dict, List, Tuple
+import sys
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'processing'))
+
+from v2_alias_table import AliasTableV2
+from v2_instrumentation import StageMetricsV2
+from v2_sqlite_store import configured_store
+
+# Enhanced category reference descriptions
+CATEGORY_REFERENCES = {
+    'TECHNOLOGY_TYPE': 'renewable energy generation technologies including solar photovoltaic wind turbines hydroelectric geothermal biomass energy storage systems',
+    'SERVICE_CATEGORY': 'professional services in renewable energy sector including installation maintenance consulting monitoring grid integration project development',
+    'EQUIPMENT_COMPONENT': 'physical equipment and components used in renewable energy systems such as inverters turbines batteries panels transformers controllers',
+    'PERFORMANCE_METRIC': 'key performance indicators and measurements for renewable energy systems including capacity factor LCOE efficiency ratings energy output',
+    'REGULATORY_STANDARD': 'standards regulations codes and certification programs governing renewable energy sector including ISO IEC IEEE standards',
+    'TRANSPORT_MODE': 'sustainable transportation methods including electric vehicles hydrogen fuel cells rail maritime aviation multimodal transport',
+    'CARBON_METRIC': 'carbon footprint measurement and greenhouse gas emission indicators including CO2 emissions scope emissions carbon intensity',
+    'SUPPLY_CHAIN_ELEMENT': 'sustainable supply chain components including green packaging reverse logistics circular economy sustainable procurement',
+    'EFFICIENCY_TECHNOLOGY': 'technology solutions for logistics efficiency including route optimization fleet management IoT predictive analytics automation',
+    'ENVIRONMENTAL_STANDARD': 'environmental standards and certifications including ISO 14001 LEED GRI CDP TCFD sustainability reporting frameworks'
+}
+
+# Custom JSON encoder for numpy types
+class NumpyEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super().default(obj)
+
+class ValidationCacheV2:
+    """Persistent per-entity validation results used for incremental runs"""
+
+    def __init__(self, path: str = 'data/processed/v2_validation_cache.json'):
+        self.path = path
+        self.embeddings_path = os.path.splitext(path)[0] + '_embeddings.npz'
+        # (entity, category, model, threshold, reference_hash) -> record
+        self.entity_results = {}
+        # (category, model, threshold) -> {(entity1, entity2): similarity}
+        self.duplicate_pairs = {}
+        # (category, model, threshold) -> set of entities whose pairs were scored
+        self.pair_coverage = {}
+        # (entity, category) -> is_valid from the previous run
+        self.last_run = {}
+        # model -> {entity: embedding}
+        self.embeddings = {}
+
+    def load(self):
+        """Load cached results and embeddings if present"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+
+            for record in data.get('entity_results', []):
+                key = (record['entity'], record['category'], record['model'],
+                       record['threshold'], record['reference_hash'])
+                self.entity_results[key] = record
+
+            for group in data.get('duplicate_pairs', []):
+                key = (group['category'], group['model'], group['threshold'])
+                self.duplicate_pairs[key] = {
+                    (pair['entity1'], pair['entity2']): pair['similarity']
+                    for pair in group['pairs']
+                }
+                self.pair_coverage[key] = set(group['entities'])
+
+            self.last_run = {
+                (item['entity'], item['category']): item['is_valid']
+                for item in data.get('last_run', [])
+            }
+
+        if os.path.exists(self.embeddings_path):
+            stored = np.load(self.embeddings_path, allow_pickle=False)
+            for model in set(str(m) for m in stored['models']):
+                mask = stored['models'] == model
+                self.embeddings[model] = dict(zip(
+                    (str(e) for e in stored['entities'][mask]),
+                    stored['vectors'][mask]
+                ))
+
+    def prune(self, entity_keys: Set[Tuple], pair_keys: Set[Tuple], model: str, entities: Set[str]):
+        """Keep only what the current run used, so removed entities and old settings do not pile up"""
+        self.entity_results = {key: record for key, record in self.entity_results.items() if key in entity_keys}
+        self.duplicate_pairs = {key: pairs for key, pairs in self.duplicate_pairs.items() if key in pair_keys}
+        self.pair_coverage = {key: covered for key, covered in self.pair_coverage.items() if key in pair_keys}
+        stored = self.embeddings.get(model, {})
+        self.embeddings = {model: {entity: stored[entity] for entity in entities if entity in stored}}
+
+    def save(self):
+        """Persist cached results and embeddings"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        data = {
+            'entity_results': list(self.entity_results.values()),
+            'duplicate_pairs': [
+                {
+                    'category': category,
+                    'model': model,
+                    'threshold': threshold,
+                    'entities': sorted(self.pair_coverage.get((category, model, threshold), set())),
+                    'pairs': [
+                        {'entity1': e1, 'entity2': e2, 'similarity': similarity}
+                        for (e1, e2), similarity in sorted(pairs.items())
+                    ]
+                }
+                for (category, model, threshold), pairs in self.duplicate_pairs.items()
+            ],
+            'last_run': [
+                {'entity': entity, 'category': category, 'is_valid': is_valid}
+                for (entity, category), is_valid in sorted(self.last_run.items())
+            ]
+        }
+        with open(self.path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+        models, entities, vectors = [], [], []
+        for model, by_entity in self.embeddings.items():
+            for entity, vector in by_entity.items():
+                models.append(model)
+                entities.append(entity)
+                vectors.append(vector)
+        if vectors:
+            np.savez(self.embeddings_path, models=np.array(models), entities=np.array(entities),
+                     vectors=np.vstack(vectors).astype(np.float32))
+        elif os.path.exists(self.embeddings_path):
+            os.remove(self.embeddings_path)
 
 class SemanticValidatorV2:
-    def __init__(self):
-        # Load open-source sentence transformer model
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')  # 22MB model
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', model=None):
+        # Load open-source sentence transformer model (or any object with a compatible encode())
+        self.model_name = model_name
+        if model is None:
+            # Imported here so CATEGORY_REFERENCES and offline encoders work without sentence_transformers
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)  # 22MB model
+        self.model = model
+        self.category_threshold = 0.3
+        self.duplicate_threshold = 0.85
         
         # Enhanced category reference descriptions
-        self.category_references = {
-            'TECHNOLOGY_TYPE': 'renewable energy generation technologies including solar photovoltaic wind turbines hydroelectric geothermal biomass energy storage systems',
-            'SERVICE_CATEGORY': 'professional services in renewable energy sector including installation maintenance consulting monitoring grid integration project development',
-            'EQUIPMENT_COMPONENT': 'physical equipment and components used in renewable energy systems such as inverters turbines batteries panels transformers controllers',
-            'PERFORMANCE_METRIC': 'key performance indicators and measurements for renewable energy systems including capacity factor LCOE efficiency ratings energy output',
-            'REGULATORY_STANDARD': 'standards regulations codes and certification programs governing renewable energy sector including ISO IEC IEEE standards',
-            'TRANSPORT_MODE': 'sustainable transportation methods including electric vehicles hydrogen fuel cells rail maritime aviation multimodal transport',
-            'CARBON_METRIC': 'carbon footprint measurement and greenhouse gas emission indicators including CO2 emissions scope emissions carbon intensity',
-            'SUPPLY_CHAIN_ELEMENT': 'sustainable supply chain components including green packaging reverse logistics circular economy sustainable procurement',
-            'EFFICIENCY_TECHNOLOGY': 'technology solutions for logistics efficiency including route optimization fleet management IoT predictive analytics automation',
-            'ENVIRONMENTAL_STANDARD': 'environmental standards and certifications including ISO 14001 LEED GRI CDP TCFD sustainability reporting frameworks'
-        }
+        self.category_references = dict(CATEGORY_REFERENCES)
+        self.metrics = StageMetricsV2('semantic_validator')
+        self.entity_records = {}    # per-entity scores of the last run, for the SQLite store
     
     def validate_entity_category_fit(self, entity: str, category: str, threshold: float = 0.3) -> Tuple[bool, float]:
         """Validate if entity fits in assigned category using semantic similarity"""
@@ -92,8 +219,157 @@ class SemanticValidatorV2:
         
         return quality_metrics
     
-    def run_validation(self, entities_dict: Dict[str, List[str]]) -> Dict:
-        """Run complete AI validation suite"""
+    def reference_hash(self, category: str) -> str:
+        """Short digest of a category reference description"""
+        reference = self.category_references.get(category, '')
+        return hashlib.sha256(reference.encode('utf-8')).hexdigest()[:16]
+
+    def encode_with_cache(self, entities: List[str], cache: ValidationCacheV2) -> np.ndarray:
+        """Encode entities, reusing embeddings stored in the cache"""
+        stored = cache.embeddings.setdefault(self.model_name, {})
+        missing = [entity for entity in dict.fromkeys(entities) if entity not in stored]
+        if missing:
+            with self.metrics.step('encode', items=len(missing)):
+                for entity, vector in zip(missing, self.model.encode(missing)):
+                    stored[entity] = np.asarray(vector, dtype=np.float32)
+        return np.vstack([stored[entity] for entity in entities])
+
+    def run_incremental_validation(self, entities_dict: Dict[str, List[str]],
+                                   cache: Optional[ValidationCacheV2] = None) -> Dict:
+        """Run validation, re-scoring only entities and pairs missing from the cache"""
+        if cache is None:
+            cache = ValidationCacheV2()
+            cache.load()
+
+        rescored_entities = 0
+        rescored_pairs = 0
+        entity_records = {}
+        duplicates = {}
+        current_run = {}
+        seen_keys, seen_pair_keys, seen_entities = set(), set(), set()
+
+        # Scores are computed once per canonical entity and shared with its aliases
+        aliases = AliasTableV2.from_entities(entities_dict)
+        for category, entities in aliases.canonical_entities(entities_dict).items():
+            ref_hash = self.reference_hash(category)
+            keys = [(entity, category, self.model_name, self.category_threshold, ref_hash)
+                    for entity in entities]
+            new_entities = [key[0] for key in keys if key not in cache.entity_results]
+            seen_keys.update(keys)
+            seen_entities.update(entities)
+
+            # Category fit for added or changed entities, in one batch
+            with self.metrics.step('category_fit', items=len(new_entities)):
+                if new_entities and category in self.category_references:
+                    vectors = self.encode_with_cache(new_entities, cache)
+                    reference = self.model.encode([self.category_references[category]])
+                    scores = cosine_similarity(vectors, reference)[:, 0]
+                else:
+                    scores = [0.0] * len(new_entities)
+
+            for entity, score in zip(new_entities, scores):
+                cache.entity_results[(entity, category, self.model_name, self.category_threshold, ref_hash)] = {
+                    'entity': entity,
+                    'category': category,
+                    'model': self.model_name,
+                    'threshold': self.category_threshold,
+                    'reference_hash': ref_hash,
+                    'similarity': float(score),
+                    'is_valid': bool(score >= self.category_threshold),
+                    'quality': {k: float(v) for k, v in self.assess_entity_quality(entity).items()}
+                }
+            rescored_entities += len(new_entities)
+
+            entity_records[category] = [cache.entity_results[key] for key in keys]
+
+            # Duplicate pairs: only pairs involving an entity not yet covered are scored
+            pair_key = (category, self.model_name, self.duplicate_threshold)
+            covered = cache.pair_coverage.get(pair_key, set())
+            present = set(entities)
+            stored_pairs = {
+                pair: similarity for pair, similarity in cache.duplicate_pairs.get(pair_key, {}).items()
+                if pair[0] in present and pair[1] in present
+            }
+            uncovered = [entity for entity in entities if entity not in covered]
+            if uncovered and len(entities) >= 2:
+                with self.metrics.step('duplicates') as step:
+                    pairs_before = rescored_pairs
+                    new_vectors = self.encode_with_cache(uncovered, cache)
+                    all_vectors = self.encode_with_cache(entities, cache)
+                    similarities = cosine_similarity(new_vectors, all_vectors)
+                    uncovered_set = set(uncovered)
+                    for i, entity in enumerate(uncovered):
+                        for j, other in enumerate(entities):
+                            if other == entity or (other in uncovered_set and other < entity):
+                                continue
+                            rescored_pairs += 1
+                            if similarities[i, j] >= self.duplicate_threshold:
+                                stored_pairs[tuple(sorted((entity, other)))] = float(similarities[i, j])
+                    step['items'] = rescored_pairs - pairs_before
+
+            cache.duplicate_pairs[pair_key] = stored_pairs
+            cache.pair_coverage[pair_key] = present
+            seen_pair_keys.add(pair_key)
+            order = {entity: index for index, entity in enumerate(entities)}
+            duplicates[category] = sorted(
+                ((e1, e2, sim) if order[e1] < order[e2] else (e2, e1, sim)
+                 for (e1, e2), sim in stored_pairs.items()),
+                key=lambda dup: (order[dup[0]], order[dup[1]])
+            )
+
+        with self.metrics.step('summarize', items=sum(len(v) for v in entities_dict.values())):
+            entity_records = self.fan_out_records(aliases, entities_dict, entity_records)
+            for category, records in entity_records.items():
+                for record in records:
+                    current_run[(record['entity'], category)] = record['is_valid']
+            results = self.build_results(entities_dict, entity_records, duplicates)
+            results['validation_diff'] = self.diff_validity(cache.last_run, current_run)
+        results['incremental_stats'] = {
+            'rescored_entities': rescored_entities,
+            'reused_entities': sum(len(v) for v in entities_dict.values()) - rescored_entities,
+            'rescored_pairs': rescored_pairs
+        }
+        cache.last_run = current_run
+        cache.prune(seen_keys, seen_pair_keys, self.model_name, seen_entities)
+        self.metrics.count('entities', sum(len(v) for v in entities_dict.values()))
+        self.metrics.count('rescored_entities', rescored_entities)
+        self.metrics.count('rescored_pairs', rescored_pairs)
+        return results
+
+    def fan_out_records(self, aliases: AliasTableV2, entities_dict: Dict[str, List[str]],
+                        canonical_records: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """Per-entity records for every surface form; aliases share the scores of their canonical entity"""
+        by_entity = {
+            category: {record['entity']: record for record in records}
+            for category, records in canonical_records.items()
+        }
+        entity_records = aliases.fan_out(entities_dict, by_entity)
+        for records in entity_records.values():
+            for record in records:
+                # Quality is a property of the surface form itself
+                if 'canonical' in record:
+                    record['quality'] = {k: float(v) for k, v in self.assess_entity_quality(record['entity']).items()}
+        return entity_records
+
+    def diff_validity(self, previous: Dict[Tuple[str, str], bool],
+                      current: Dict[Tuple[str, str], bool]) -> Dict[str, List[Dict]]:
+        """Report which entities changed validity between two runs"""
+        def entry(key):
+            return {'entity': key[0], 'category': key[1]}
+
+        return {
+            'added': [entry(k) for k in sorted(current.keys() - previous.keys())],
+            'removed': [entry(k) for k in sorted(previous.keys() - current.keys())],
+            'became_valid': [entry(k) for k in sorted(current.keys() & previous.keys())
+                             if current[k] and not previous[k]],
+            'became_invalid': [entry(k) for k in sorted(current.keys() & previous.keys())
+                               if previous[k] and not current[k]]
+        }
+
+    def build_results(self, entities_dict: Dict[str, List[str]], entity_records: Dict[str, List[Dict]],
+                      duplicates: Dict[str, List[Tuple[str, str, float]]]) -> Dict:
+        """Aggregate stored per-entity scores into the validation results layout"""
+        self.entity_records = entity_records
         results = {
             'validation_summary': {},
             'category_validation': {},
@@ -101,11 +377,10 @@ class SemanticValidatorV2:
             'quality_assessment': {},
             'cross_domain_validation': {}
         }
-        
+
         total_entities = sum(len(entities) for entities in entities_dict.values())
         valid_entities = 0
-        
-        # Category validation
+
         for category, entities in entities_dict.items():
             if not entities:  # Skip empty categories
                 results['category_validation'][category] = {
@@ -114,84 +389,251 @@ class SemanticValidatorV2:
                     'total_entities': 0
                 }
                 continue
-                
-            category_scores = []
-            for entity in entities:
-                is_valid, score = self.validate_entity_category_fit(entity, category)
-                category_scores.append(score)
-                if is_valid:
-                    valid_entities += 1
-            
+
+            records = entity_records[category]
+            category_scores = [record['similarity'] for record in records]
+            valid_entities += sum(1 for record in records if record['is_valid'])
+
             results['category_validation'][category] = {
-                'avg_similarity': float(np.mean(category_scores)) if category_scores else 0.0,
+                'avg_similarity': float(np.mean(category_scores)),
                 'valid_entities': sum(1 for score in category_scores if score >= 0.3),
                 'total_entities': len(entities)
             }
-            
-            # Duplicate detection
-            duplicates = self.detect_duplicates(entities)
+
             results['duplicate_detection'][category] = [
                 {'entity1': dup[0], 'entity2': dup[1], 'similarity': float(dup[2])}
-                for dup in duplicates
+                for dup in duplicates.get(category, [])
             ]
-            
-            # Quality assessment
-            quality_scores = []
-            for entity in entities:
-                quality = self.assess_entity_quality(entity)
-                quality_scores.append(quality['overall_quality'])
-            
+
+            quality_scores = [record['quality']['overall_quality'] for record in records]
             results['quality_assessment'][category] = {
-                'avg_quality': float(np.mean(quality_scores)) if quality_scores else 0.0,
+                'avg_quality': float(np.mean(quality_scores)),
                 'high_quality_entities': sum(1 for score in quality_scores if score >= 0.8)
             }
-        
-        # Validation summary
+
         results['validation_summary'] = {
             'total_entities': total_entities,
             'valid_entities': valid_entities,
             'validation_rate': valid_entities / total_entities if total_entities > 0 else 0.0,
             'categories_processed': len(entities_dict),
             'avg_category_similarity': float(np.mean([
-                cat_data['avg_similarity'] 
+                cat_data['avg_similarity']
                 for cat_data in results['category_validation'].values()
                 if cat_data['total_entities'] > 0
             ])) if results['category_validation'] else 0.0
         }
-        
+
         return results
 
+    def iter_category_similarity_blocks(self, entities_dict: Dict[str, List[str]],
+                                        block_size: int = 4096) -> Iterator[Tuple[List[Tuple[str, str]], np.ndarray]]:
+        """Yield (entity, assigned category) blocks with their entity x category similarity matrix"""
+        categories = list(self.category_references.keys())
+        references = self.model.encode([self.category_references[c] for c in categories])
+        references = references / np.linalg.norm(references, axis=1, keepdims=True)
+
+        block = []
+        for category, entities in entities_dict.items():
+            for entity in entities:
+                block.append((entity, category))
+                if len(block) >= block_size:
+                    yield block, self._block_similarity(block, references)
+                    block = []
+        if block:
+            yield block, self._block_similarity(block, references)
+
+    def _block_similarity(self, block: List[Tuple[str, str]], references: np.ndarray) -> np.ndarray:
+        """Cosine similarity of one entity block against all normalized category references"""
+        embeddings = self.model.encode([entity for entity, _ in block])
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1.0, norms)
+        return embeddings @ references.T
+
+    def suggest_category_reassignments(self, entities_dict: Dict[str, List[str]], top_k: int = 3,
+                                       margin: float = 0.05, block_size: int = 4096) -> Dict:
+        """Rank the best-fitting categories per entity and suggest reassignments for misfiled ones"""
+        categories = list(self.category_references.keys())
+        category_index = {category: i for i, category in enumerate(categories)}
+        top_k = min(top_k, len(categories))
+
+        suggestions = []
+        best_category_counts = {category: 0 for category in categories}
+        total_entities = 0
+        misfiled = 0
+
+        for block, similarities in self.iter_category_similarity_blocks(entities_dict, block_size):
+            total_entities += len(block)
+            # Top-k categories per row without a full sort
+            top = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            assigned = np.array([category_index.get(category, -1) for _, category in block])
+            assigned_scores = np.where(
+                assigned >= 0,
+                similarities[np.arange(len(block)), np.maximum(assigned, 0)],
+                0.0
+            )
+            best = top[:, 0]
+            best_scores = top_scores[:, 0]
+            # Misfiled: another category fits better than the assigned one by at least the margin
+            flagged = (best != assigned) & (best_scores - assigned_scores >= margin)
+
+            for i in np.flatnonzero(best >= 0):
+                best_category_counts[categories[best[i]]] += 1
+
+            for i in np.flatnonzero(flagged):
+                misfiled += 1
+                entity, category = block[i]
+                suggestions.append({
+                    'entity': entity,
+                    'assigned_category': category,
+                    'assigned_similarity': float(assigned_scores[i]),
+                    'suggested_category': categories[best[i]],
+                    'suggested_similarity': float(best_scores[i]),
+                    'improvement': float(best_scores[i] - assigned_scores[i]),
+                    'ranked_categories': [
+                        {'category': categories[c], 'similarity': float(score)}
+                        for c, score in zip(top[i], top_scores[i])
+                    ]
+                })
+
+        suggestions.sort(key=lambda item: item['improvement'], reverse=True)
+
+        return {
+            'reassignment_summary': {
+                'total_entities': total_entities,
+                'misfiled_entities': misfiled,
+                'misfiled_rate': misfiled / total_entities if total_entities > 0 else 0.0,
+                'margin': margin,
+                'best_category_counts': best_category_counts
+            },
+            'reassignment_suggestions': suggestions
+        }
+
+    def run_validation(self, entities_dict: Dict[str, List[str]]) -> Dict:
+        """Run complete AI validation suite"""
+        entity_records = {}
+        duplicates = {}
+
+        aliases = AliasTableV2.from_entities(entities_dict)
+        for category, entities in aliases.canonical_entities(entities_dict).items():
+            # Category validation and quality assessment
+            records = []
+            with self.metrics.step('category_fit', items=len(entities)):
+                for entity in entities:
+                    is_valid, score = self.validate_entity_category_fit(entity, category, self.category_threshold)
+                    records.append({
+                        'entity': entity,
+                        'similarity': float(score),
+                        'is_valid': bool(is_valid),
+                        'quality': self.assess_entity_quality(entity)
+                    })
+            entity_records[category] = records
+
+            # Duplicate detection
+            with self.metrics.step('duplicates', items=len(entities) * (len(entities) - 1) // 2):
+                duplicates[category] = self.detect_duplicates(entities, self.duplicate_threshold)
+
+        self.metrics.count('entities', sum(len(v) for v in entities_dict.values()))
+        with self.metrics.step('summarize', items=sum(len(v) for v in entities_dict.values())):
+            return self.merge_results(entities_dict, entity_records, duplicates, aliases)
+
+    def score_entities(self, category: str, entities: List[str]) -> Tuple[List[Dict], np.ndarray]:
+        """Category fit and quality records for a batch of entities, with their embeddings"""
+        vectors = np.asarray(self.model.encode(entities))
+        if category in self.category_references and entities:
+            reference = self.model.encode([self.category_references[category]])
+            scores = cosine_similarity(vectors, reference)[:, 0]
+        else:
+            scores = np.zeros(len(entities))
+        records = [
+            {
+                'entity': entity,
+                'similarity': float(score),
+                'is_valid': bool(score >= self.category_threshold),
+                'quality': {k: float(v) for k, v in self.assess_entity_quality(entity).items()}
+            }
+            for entity, score in zip(entities, scores)
+        ]
+        return records, vectors
+
+    def duplicate_pairs(self, entities: List[str], vectors: np.ndarray, start: int = 0,
+                        stop: Optional[int] = None, block_size: int = 4096) -> List[Tuple[str, str, float]]:
+        """Duplicate pairs (i, j) with j > i for rows start..stop, in detect_duplicates order"""
+        stop = len(entities) if stop is None else stop
+        pairs = []
+        if stop <= start:
+            return pairs
+        # Column blocks keep memory at rows x block_size however large the category is
+        for column_start in range(start, len(entities), block_size):
+            similarities = cosine_similarity(vectors[start:stop], vectors[column_start:column_start + block_size])
+            for row, column in np.argwhere(similarities >= self.duplicate_threshold):
+                if column_start + column > start + row:
+                    pairs.append((start + row, column_start + column, float(similarities[row, column])))
+        pairs.sort()
+        return [(entities[i], entities[j], similarity) for i, j, similarity in pairs]
+
+    def merge_results(self, entities_dict: Dict[str, List[str]], canonical_records: Dict[str, List[Dict]],
+                      duplicates: Dict[str, List[Tuple[str, str, float]]],
+                      aliases: Optional[AliasTableV2] = None) -> Dict:
+        """Results layout from per-canonical-entity records and duplicates, computed here or by workers"""
+        if aliases is None:
+            aliases = AliasTableV2.from_entities(entities_dict)
+        entity_records = self.fan_out_records(aliases, entities_dict, canonical_records)
+        return self.build_results(entities_dict, entity_records, duplicates)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI semantic validation for v2 NER dictionaries")
+    parser.add_argument('--full', action='store_true',
+                        help='Re-score every entity instead of reusing cached results')
+    parser.add_argument('--cache', default='data/processed/v2_validation_cache.json',
+                        help='Per-entity validation cache used for incremental runs')
+    parser.add_argument('--suggest-reassignments', action='store_true',
+                        help='Also rank every category per entity and suggest reassignments')
+    parser.add_argument('--block-size', type=int, default=4096,
+                        help='Entities encoded per block in reassignment mode')
+    args = parser.parse_args()
+
     validator = SemanticValidatorV2()
     print("Running enhanced AI semantic validation...")
     
     # Load v2 entities
-    with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
-        re_data = json.load(f)
-    with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
-        gl_data = json.load(f)
+    store = configured_store()
+    with validator.metrics.step('load'):
+        if store is not None and store.has_entities():
+            re_data = store.load_entities('renewable_energy')
+            gl_data = store.load_entities('green_logistics')
+        else:
+            with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
+                re_data = json.load(f)
+            with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
+                gl_data = json.load(f)
     
     # Combine entities
     all_entities = {**re_data, **gl_data}
     
-    results = validator.run_validation(all_entities)
+    if args.full:
+        results = validator.run_validation(all_entities)
+    else:
+        cache = ValidationCacheV2(args.cache)
+        cache.load()
+        results = validator.run_incremental_validation(all_entities, cache)
+        with validator.metrics.step('cache_write'):
+            cache.save()
     
     output_path = "data/processed/v2_semantic_validation_results.json"
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    # Custom JSON encoder for numpy types
-    class NumpyEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            return super().default(obj)
+    with validator.metrics.step('write', items=results['validation_summary']['total_entities']):
+        with open(output_path, 'w') as f:
+            json.dump(results, f, indent=2, cls=NumpyEncoder)
     
-    with open(output_path, 'w') as f:
-        json.dump(results, f, indent=2, cls=NumpyEncoder)
+    if store is not None:
+        with validator.metrics.step('store_write', items=results['validation_summary']['total_entities']):
+            store.replace_validation(results, validator.entity_records)
     
     print(f"Validation complete. Results saved to {output_path}")
     
@@ -199,3 +641,25 @@ if __name__ == "__main__":
     summary = results['validation_summary']
     print(f"Validated {summary['valid_entities']}/{summary['total_entities']} entities ({summary['validation_rate']:.1%})")
     print(f"Average category similarity: {summary['avg_category_similarity']:.3f}")
+
+    if args.suggest_reassignments:
+        with validator.metrics.step('reassignments', items=sum(len(v) for v in all_entities.values())):
+            reassignments = validator.suggest_category_reassignments(all_entities, block_size=args.block_size)
+        reassignment_path = "data/processed/v2_category_reassignments.json"
+        with open(reassignment_path, 'w') as f:
+            json.dump(reassignments, f, indent=2, cls=NumpyEncoder)
+
+        reassignment_summary = reassignments['reassignment_summary']
+        print(f"Flagged {reassignment_summary['misfiled_entities']}/{reassignment_summary['total_entities']} "
+              f"entities as misfiled. Suggestions saved to {reassignment_path}")
+
+    if 'incremental_stats' in results:
+        stats = results['incremental_stats']
+        diff = results['validation_diff']
+        print(f"Re-scored {stats['rescored_entities']} entities and {stats['rescored_pairs']} pairs "
+              f"(reused {stats['reused_entities']})")
+        print(f"Validity changes: {len(diff['became_valid'])} became valid, "
+              f"{len(diff['became_invalid'])} became invalid, "
+              f"{len(diff['added'])} added, {len(diff['removed'])} removed")
+
+    validator.metrics.save()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+OpenRouter LLM Validation v2
+Asyncio batched LLM validation of entities and mappings with retries, a disk response cache and a local mock endpoint
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'processing'))
+
+from v2_generate_final_dictionaries import atomic_write_bytes
+from v2_instrumentation import StageMetricsV2
+
+API_URL = 'https://openrouter.ai/api/v1/chat/completions'
+DEFAULT_MODEL = 'openai/gpt-4o-mini'
+CACHE_DIR = 'data/processed/v2_llm_cache'
+# Upper bound on a server-supplied Retry-After, so one bad header cannot stall a prompt
+MAX_RETRY_DELAY = 60.0
+NO_VERDICT = 'no verdict returned'
+RESULTS_PATH = 'data/processed/v2_llm_validation_results.json'
+
+SYSTEM_PROMPT = (
+    'You validate named-entity dictionaries for renewable energy and green logistics. '
+    'Answer only with a JSON array containing one object per item: '
+    '{"id": <item id>, "valid": true|false, "confidence": <0..1>, "reason": "<short reason>"}.'
+)
+
+def entity_prompt(category: str, entities: List[str]) -> List[Dict]:
+    items = [{'id': i, 'entity': entity} for i, entity in enumerate(entities)]
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': f'Is each entity a correct, specific member of the category {category}?\n'
+                                    f'Items:\n{json.dumps(items)}'}
+    ]
+
+def mapping_prompt(mappings: List[Dict]) -> List[Dict]:
+    items = [
+        {'id': i, 'source': m['renewable_energy_entity'], 'source_category': m['renewable_energy_category'],
+         'target': m['green_logistics_entity'], 'target_category': m['green_logistics_category'],
+         'relationship': m['relationship_type']}
+        for i, m in enumerate(mappings)
+    ]
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': 'Is each renewable energy -> green logistics relationship meaningful?\n'
+                                    f'Items:\n{json.dumps(items)}'}
+    ]
+
+def parse_verdicts(content: str, count: int) -> Optional[List[Dict]]:
+    """Verdicts by item id from a model reply (code fences tolerated); None if unparseable"""
+    start, end = content.find('['), content.rfind(']')
+    if start < 0 or end < start:
+        return None
+    try:
+        replies = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    verdicts = [{'valid': None, 'confidence': None, 'reason': NO_VERDICT} for _ in range(count)]
+    for reply in replies:
+        if isinstance(reply, dict) and isinstance(reply.get('id'), int) and 0 <= reply['id'] < count:
+            confidence = reply.get('confidence')
+            verdicts[reply['id']] = {
+                'valid': reply.get('valid') if isinstance(reply.get('valid'), bool) else None,
+                'confidence': float(confidence) if isinstance(confidence, (int, float)) else None,
+                'reason': str(reply.get('reason', ''))
+            }
+    return verdicts
+
+def answered(verdicts: List[Dict]) -> int:
+    """Number of items the reply actually gave a verdict for"""
+    return sum(1 for verdict in verdicts if verdict['reason'] != NO_VERDICT)
+
+def reply_content(body) -> Optional[str]:
+    """Message content of a chat completion body, or None if the body has none (error or empty reply)"""
+    try:
+        content = body['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        return None
+    return content if isinstance(content, str) else None
+
+class ResponseCacheV2:
+    """Model replies on disk, one file per prompt hash"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(model: str, messages: List[Dict]) -> str:
+        payload = json.dumps({'model': model, 'messages': messages, 'temperature': 0}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self.path(key), 'r') as f:
+                return json.load(f)['content']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key: str, content: str):
+        atomic_write_bytes(self.path(key), json.dumps({'content': content}).encode('utf-8'))
+
+class OpenRouterValidatorV2:
+    """Packs many items per prompt and runs prompts concurrently under a semaphore
+
+    HTTP calls go through requests on worker threads (one session per thread), so no
+    async HTTP dependency is needed; the semaphore bounds requests in flight.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL, base_url: str = API_URL,
+                 batch_size: int = 25, concurrency: int = 4, max_retries: int = 5, backoff: float = 0.5,
+                 timeout: float = 60.0, cache: Optional[ResponseCacheV2] = None,
+                 max_retry_delay: float = MAX_RETRY_DELAY):
+        self.api_key = api_key if api_key is not None else os.environ.get('OPENROUTER_API_KEY', '')
+        self.model = model
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_retry_delay = max_retry_delay
+        self.timeout = timeout
+        self.cache = cache if cache is not None else ResponseCacheV2()
+        self.local = threading.local()
+        self.metrics = StageMetricsV2('llm_validator')
+        self.stats = {'items': 0, 'prompts': 0, 'cache_hits': 0, 'requests': 0, 'retries': 0,
+                      'failed_prompts': 0, 'unparsed_replies': 0, 'incomplete_replies': 0, 'http_errors': 0}
+        self.semaphore = None
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def post(self, payload: Dict) -> Tuple[int, Dict, Optional[str]]:
+        """Blocking request on a worker thread: (status, body, Retry-After header)"""
+        response = self.session().post(self.base_url, json=payload, timeout=self.timeout, headers={
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        })
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return response.status_code, body, response.headers.get('Retry-After')
+
+    async def complete(self, messages: List[Dict], count: int) -> List[Dict]:
+        """Verdicts for one prompt, from the cache or the API (429/5xx retried with backoff)"""
+        self.stats['prompts'] += 1
+        self.stats['items'] += count
+        key = ResponseCacheV2.key(self.model, messages)
+        content = self.cache.get(key)
+        if content is not None:
+            verdicts = parse_verdicts(content, count)
+            # Entries cached before only complete replies were stored may lack verdicts; ask again
+            if verdicts is not None and answered(verdicts) == count:
+                self.stats['cache_hits'] += 1
+                return verdicts
+
+        payload = {'model': self.model, 'messages': messages, 'temperature': 0}
+        for attempt in range(self.max_retries + 1):
+            async with self.semaphore:
+                self.stats['requests'] += 1
+                try:
+                    status, body, retry_after = await asyncio.to_thread(self.post, payload)
+                except requests.RequestException as e:
+                    status, body, retry_after = None, {'error': str(e)}, None
+
+            if status == 200:
+                content = reply_content(body)
+                verdicts = parse_verdicts(content, count) if content is not None else None
+                if verdicts is None or not answered(verdicts):
+                    self.stats['unparsed_replies'] += 1
+                    break
+                # Only complete replies are cached; a partial one is used now and asked again next run
+                if answered(verdicts) == count:
+                    self.cache.put(key, content)
+                else:
+                    self.stats['incomplete_replies'] += 1
+                return verdicts
+            if status is not None and status != 429 and status < 500:
+                self.stats['http_errors'] += 1
+                print(f"LLM request failed with HTTP {status}: {body}")
+                break
+            if attempt < self.max_retries:
+                self.stats['retries'] += 1
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = self.backoff * 2 ** attempt
+                if not math.isfinite(delay):
+                    delay = self.backoff * 2 ** attempt
+                delay = min(max(delay, 0.0), self.max_retry_delay)
+                await asyncio.sleep(delay + random.uniform(0, self.backoff))
+
+        self.stats['failed_prompts'] += 1
+        return [{'valid': None, 'confidence': None, 'reason': 'request failed'} for _ in range(count)]
+
+    def batches(self, items: List) -> List[List]:
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    async def validate_entities(self, entities_dict: Dict[str, List[str]]) -> Dict[str, List[Dict]]:
+        jobs = [(category, batch) for category, entities in entities_dict.items() for batch in self.batches(entities)]
+        replies = await asyncio.gather(*(self.complete(entity_prompt(category, batch), len(batch))
+                                         for category, batch in jobs))
+        results = {category: [] for category in entities_dict}
+        for (category, batch), verdicts in zip(jobs, replies):
+            results[category].extend({'entity': entity, **verdict} for entity, verdict in zip(batch, verdicts))
+        return results
+
+    async def validate_mappings(self, mappings: List[Dict]) -> List[Dict]:
+        jobs = self.batches(mappings)
+        replies = await asyncio.gather(*(self.complete(mapping_prompt(batch), len(batch)) for batch in jobs))
+        return [
+            {'renewable_energy_entity': mapping['renewable_energy_entity'],
+             'green_logistics_entity': mapping['green_logistics_entity'],
+             'relationship_type': mapping['relationship_type'], **verdict}
+            for batch, verdicts in zip(jobs, replies) for mapping, verdict in zip(batch, verdicts)
+        ]
+
+    async def run(self, entities_dict: Dict[str, List[str]], mappings: Optional[List[Dict]] = None) -> Dict:
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        with self.metrics.step('entities', items=sum(len(v) for v in entities_dict.values())):
+            entity_results = await self.validate_entities(entities_dict)
+        with self.metrics.step('mappings', items=len(mappings or [])):
+            mapping_results = await self.validate_mappings(mappings or [])
+        elapsed = time.perf_counter() - start
+
+        for name, value in self.stats.items():
+            self.metrics.count(name, value)
+        judged = [v for records in entity_results.values() for v in records if v['valid'] is not None]
+        return {
+            'model': self.model,
+            'entity_validation': entity_results,
+            'mapping_validation': mapping_results,
+            'llm_summary': {
+                'entities_judged': len(judged),
+                'entities_valid': sum(1 for v in judged if v['valid']),
+                'mappings_judged': sum(1 for v in mapping_results if v['valid'] is not None),
+                'mappings_valid': sum(1 for v in mapping_results if v['valid'])
+            },
+            'run_stats': {
+                **self.stats,
+                'seconds': elapsed,
+                'items_per_second': self.stats['items'] / elapsed if elapsed > 0 else None,
+                'cache_hit_rate': self.stats['cache_hits'] / self.stats['prompts'] if self.stats['prompts'] else 0.0
+            }
+        }
+
+class MockLLMServerV2:
+    """OpenRouter-compatible chat completions endpoint with deterministic verdicts and a rate limit"""
+
+    def __init__(self, rate_limit: int = 0, latency: float = 0.05, retry_after: str = '1'):
+        self.rate_limit = rate_limit    # requests per second before answering 429 (0 = unlimited)
+        self.latency = latency
+        self.retry_after = retry_after  # Retry-After header value of 429 replies
+        self.window_start = 0.0
+        self.window_requests = 0
+        self.stats = {'requests': 0, 'rate_limited': 0}
+
+    @staticmethod
+    def verdict(item: Dict) -> Dict:
+        digest = hashlib.sha256(json.dumps(item, sort_keys=True).encode('utf-8')).digest()
+        return {'id': item['id'], 'valid': digest[0] % 5 != 0, 'confidence': round(0.5 + digest[1] / 510, 3),
+                'reason': 'mock verdict'}
+
+    def reply(self, request: Dict) -> Dict:
+        content = request['messages'][-1]['content']
+        items = json.loads(content.split('Items:\n', 1)[1])
+        return {
+            'id': 'mock-' + hashlib.sha256(content.encode('utf-8')).hexdigest()[:12],
+            'model': request.get('model', DEFAULT_MODEL),
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                'role': 'assistant',
+                'content': '```json\n' + json.dumps([self.verdict(item) for item in items]) + '\n```'
+            }}]
+        }
+
+    def rate_limited(self) -> bool:
+        now = time.monotonic()
+        if now - self.window_start >= 1.0:
+            self.window_start = now
+            self.window_requests = 0
+        self.window_requests += 1
+        return bool(self.rate_limit) and self.window_requests > self.rate_limit
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 handling with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                self.stats['requests'] += 1
+                extra = ''
+                if self.rate_limited():
+                    self.stats['rate_limited'] += 1
+                    status, response = 429, {'error': {'message': 'Rate limit exceeded'}}
+                    extra = f'Retry-After: {self.retry_after}\r\n'
+                else:
+                    await asyncio.sleep(self.latency)
+                    try:
+                        status, response = 200, self.reply(json.loads(body))
+                    except (ValueError, KeyError, IndexError) as e:
+                        status, response = 400, {'error': {'message': str(e)}}
+
+                data = json.dumps(response).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n{extra}"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        except asyncio.CancelledError:
+            pass    # idle keep-alive connections are cancelled when the server shuts down
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port)
+
+async def run_with_mock(validator: OpenRouterValidatorV2, mock: MockLLMServerV2, entities_dict: Dict,
+                        mappings: List[Dict]) -> Dict:
+    """Point the validator at an in-process mock server for offline runs"""
+    server = await mock.start()
+    port = server.sockets[0].getsockname()[1]
+    validator.base_url = f'http://127.0.0.1:{port}/api/v1/chat/completions'
+    async with server:
+        results = await validator.run(entities_dict, mappings)
+    results['mock_stats'] = dict(mock.stats)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched LLM validation of v2 entities and mappings via OpenRouter")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--batch-size', type=int, default=25, help='Items packed into each prompt')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight')
+    parser.add_argument('--max-retries', type=int, default=5)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--no-mappings', action='store_true', help='Only validate entities')
+    parser.add_argument('--mock', action='store_true', help='Use an in-process mock endpoint (offline)')
+    parser.add_argument('--mock-rate-limit', type=int, default=0, help='Mock requests/s before answering 429')
+    parser.add_argument('--serve-mock', type=int, metavar='PORT', help='Only run the mock endpoint on PORT')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    if args.serve_mock is not None:
+        async def serve_mock():
+            server = await MockLLMServerV2(args.mock_rate_limit).start(port=args.serve_mock)
+            print(f"Mock LLM endpoint on http://127.0.0.1:{args.serve_mock}/api/v1/chat/completions")
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(serve_mock())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if not args.mock and not os.environ.get('OPENROUTER_API_KEY'):
+        parser.error('OPENROUTER_API_KEY is not set (use --mock for an offline run)')
+
+    with open('data/raw/v2_renewable_energy_entities.json', 'r') as f:
+        re_data = json.load(f)
+    with open('data/raw/v2_green_logistics_entities.json', 'r') as f:
+        gl_data = json.load(f)
+    mappings = []
+    if not args.no_mappings and os.path.exists('data/processed/v2_cross_domain_mappings.json'):
+        with open('data/processed/v2_cross_domain_mappings.json', 'r') as f:
+            mappings = json.load(f)
+
+    validator = OpenRouterValidatorV2(model=args.model, batch_size=args.batch_size, concurrency=args.concurrency,
+                                      max_retries=args.max_retries, cache=ResponseCacheV2(args.cache_dir))
+    if args.mock:
+        results = asyncio.run(run_with_mock(validator, MockLLMServerV2(args.mock_rate_limit),
+                                            {**re_data, **gl_data}, mappings))
+    else:
+        results = asyncio.run(validator.run({**re_data, **gl_data}, mappings))
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    validator.metrics.save()
+
+    summary = results['llm_summary']
+    stats = results['run_stats']
+    print(f"LLM validation saved to {args.output}")
+    print(f"Entities: {summary['entities_valid']}/{summary['entities_judged']} valid; "
+          f"mappings: {summary['mappings_valid']}/{summary['mappings_judged']} valid")
+    print(f"{stats['items']} items in {stats['prompts']} prompts, {stats['requests']} requests "
+          f"({stats['retries']} retries), {stats['items_per_second']:.1f} items/s, "
+          f"cache hit rate {stats['cache_hit_rate']:.1%}")
@@ -0,0 +1,123 @@
+"""
+Distributed mapping and validation: local workers, a killed worker and failed dependencies
+"""
+
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for subdir in ('pipeline', 'processing', 'validation', 'runtime'):
+    sys.path.insert(0, os.path.join(ROOT, 'scripts', subdir))
+
+from v2_ai_semantic_validator import NumpyEncoder, SemanticValidatorV2
+from v2_cross_domain_mapper import CrossDomainMapperV2
+from v2_distributed import QUEUE_DB, reduce_run, run_local, submit_run
+from v2_embedding_index import load_encoder
+from v2_job_queue import JobQueueV2
+from v2_pipeline import load_raw_entities
+
+# Holds a lease and never renews it, like a worker that was killed mid-job
+STUCK_WORKER = """
+import sys, time
+sys.path.insert(0, {pipeline!r})
+from v2_job_queue import JobQueueV2
+with JobQueueV2({queue!r}) as queue:
+    job = queue.claim('stuck-worker', {lease!r})
+    print(job.id, flush=True)
+    time.sleep(600)
+"""
+
+def assert_same(actual, expected, path='$'):
+    """Equal JSON documents, allowing for float rounding"""
+    if isinstance(expected, float):
+        assert math.isclose(actual, expected, rel_tol=1e-6, abs_tol=1e-9), path
+    elif isinstance(expected, dict):
+        assert sorted(actual) == sorted(expected), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f'{path}.{key}')
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_same(a, e, f'{path}[{i}]')
+    else:
+        assert actual == expected, path
+
+def read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Stage metrics are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def test_killed_worker_matches_single_process(workdir):
+    raw = load_raw_entities(os.path.join(ROOT, 'data', 'raw'))
+    re_entities, gl_entities = raw['renewable_energy'], raw['green_logistics']
+    queue_dir = str(workdir / 'queue')
+    submit_run(queue_dir, re_entities, gl_entities, model_name='hashing', map_chunk=50, fit_chunk=10, pair_rows=10)
+
+    stuck = subprocess.Popen(
+        [sys.executable, '-c', STUCK_WORKER.format(pipeline=os.path.join(ROOT, 'scripts', 'pipeline'),
+                                                   queue=os.path.join(queue_dir, QUEUE_DB), lease=2.0)],
+        stdout=subprocess.PIPE, text=True)
+    stuck_job = stuck.stdout.readline().strip()
+    assert stuck_job
+    stuck.send_signal(signal.SIGKILL)
+    stuck.wait()
+
+    start = time.perf_counter()
+    assert run_local(queue_dir, workers=3, lease_seconds=2.0) == [0, 0, 0]
+    assert time.perf_counter() - start < 120
+    with JobQueueV2(os.path.join(queue_dir, QUEUE_DB)) as queue:
+        assert queue.unfinished() == 0
+        assert queue.failures() == []
+        attempts, worker = queue.connection.execute(
+            'SELECT attempts, worker FROM jobs WHERE id = ?', (stuck_job,)).fetchone()
+    assert attempts == 2 and worker != 'stuck-worker'
+
+    distributed_dir = str(workdir / 'distributed')
+    reduce_run(queue_dir, distributed_dir)
+
+    single_dir = str(workdir / 'single')
+    mapper = CrossDomainMapperV2()
+    mapper.generate_mappings(re_entities, gl_entities)
+    mapper.save_results(single_dir)
+    validator = SemanticValidatorV2('hashing', model=load_encoder('hashing'))
+    results = validator.run_validation({**re_entities, **gl_entities})
+    with open(os.path.join(single_dir, 'v2_semantic_validation_results.json'), 'w') as f:
+        json.dump(results, f, indent=2, cls=NumpyEncoder)
+
+    for name in ('v2_cross_domain_mappings.json', 'v2_entity_relationships.csv'):
+        with open(os.path.join(distributed_dir, name), 'rb') as a, open(os.path.join(single_dir, name), 'rb') as b:
+            assert a.read() == b.read(), name
+    assert_same(read_json(os.path.join(distributed_dir, 'v2_semantic_validation_results.json')),
+                read_json(os.path.join(single_dir, 'v2_semantic_validation_results.json')))
+
+def test_failed_dependency_fails_dependents(tmp_path):
+    with JobQueueV2(str(tmp_path / 'jobs.db'), max_attempts=1) as queue:
+        queue.submit('fit', 'fit', {})
+        queue.submit('duplicates', 'duplicates', {}, requires=['fit'])
+        queue.submit('summary', 'summary', {}, requires=['duplicates'])
+
+        job = queue.claim('worker', 60)
+        assert job.id == 'fit'
+        queue.fail(job.id, 'worker', 'boom')
+        assert queue.counts() == {'duplicates': {'failed': 1}, 'fit': {'failed': 1}, 'summary': {'failed': 1}}
+        assert queue.unfinished() == 0
+        assert queue.claim('worker', 60) is None
+
+        queue.submit('late', 'late', {}, requires=['fit'])
+        assert queue.statuses(['late']) == {'late': 'failed'}
+
+        assert queue.retry_failed() == 4
+        assert queue.claim('worker', 60).id == 'fit'
+        assert queue.claim('worker', 60) is None
@@ -0,0 +1,99 @@
+"""
+Release deltas applied to the gazetteer tagger: links match a full rebuild, tagging matches a fresh load
+"""
+
+import copy
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'runtime'))
+
+import v2_gazetteer_tagger
+from v2_gazetteer_tagger import GazetteerTaggerV2
+
+WORDS = ['solar', 'panel', 'wind', 'turbine', 'grid', 'storage', 'battery', 'electric', 'vehicle', 'carbon',
+         'hydrogen', 'fuel', 'cell', 'rail', 'freight', 'smart', 'energy', 'system']
+CATEGORIES = [('TECHNOLOGY_TYPE', 'renewable_energy'), ('EQUIPMENT_COMPONENT', 'renewable_energy'),
+              ('TRANSPORT_MODE', 'green_logistics')]
+
+def random_entities(rng, count, taken):
+    entities = []
+    while len(entities) < count:
+        entity = ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 4)))
+        if entity.lower() not in taken:
+            taken.add(entity.lower())
+            category, domain = rng.choice(CATEGORIES)
+            entities.append((entity, category, domain, entity))
+    return entities
+
+def random_delta(rng, entries):
+    """Delta over distinct surface forms: removals, canonical changes and additions (often suffixes of entries)"""
+    taken = {entry[0].lower() for entry in entries}
+    removed = rng.sample(entries, len(entries) // 10)
+    kept = [entry for entry in entries if entry not in removed]
+    changed = [(entity, category, domain, rng.choice(kept)[0]) for entity, category, domain, _ in
+               rng.sample(kept, len(kept) // 10)]
+    added = random_entities(rng, 10, taken)
+    for entity, category, domain, _ in rng.sample(kept, 5):
+        suffix = ' '.join(entity.split()[1:])
+        if suffix and suffix.lower() not in taken:
+            taken.add(suffix.lower())
+            added.append((suffix, category, domain, suffix))
+    delta = {'entities': {
+        'added': [[domain, category, entity, canonical] for entity, category, domain, canonical in added],
+        'removed': [[domain, category, entity] for entity, category, domain, _ in removed],
+        'changed': [[domain, category, entity, canonical] for entity, category, domain, canonical in changed]
+    }}
+    changed_canonical = {entry[:3]: entry[3] for entry in changed}
+    result = [(entity, category, domain, changed_canonical.get((entity, category, domain), canonical))
+              for entity, category, domain, canonical in kept] + added
+    return delta, result
+
+def random_text(rng, words=400):
+    return ' '.join(rng.choice(WORDS + ['the', 'of', 'and', '.']) for _ in range(words))
+
+def test_delta_links_match_full_rebuild(monkeypatch):
+    # These automata are small enough that the default budget would relink everything
+    monkeypatch.setattr(v2_gazetteer_tagger, 'MAX_RELINK_SCAN', float('inf'))
+    rng = random.Random(7)
+    for _ in range(20):
+        entries = random_entities(rng, 200, set())
+        tagger = GazetteerTaggerV2.from_entities(entries)
+        before = [tagger.tag(random_text(random.Random(i))) for i in range(3)]
+
+        delta, result = random_delta(rng, entries)
+        updated = tagger.with_delta(delta)
+        rebuilt = copy.copy(updated)
+        rebuilt.fail, rebuilt.dict_link = list(updated.fail), list(updated.dict_link)
+        rebuilt.build()
+        assert updated.fail == rebuilt.fail
+        assert updated.dict_link == rebuilt.dict_link
+
+        fresh = GazetteerTaggerV2.from_entities(result)
+        for seed in range(3):
+            text = random_text(random.Random(seed))
+            assert updated.tag(text) == fresh.tag(text)
+        # The tagger the delta was applied to keeps serving the previous release
+        assert [tagger.tag(random_text(random.Random(i))) for i in range(3)] == before
+
+def test_delta_relinks_only_affected_states(monkeypatch):
+    rng = random.Random(3)
+    entries = random_entities(rng, 20000, set())
+    tagger = GazetteerTaggerV2.from_entities(entries)
+    relinked = []
+    depth = GazetteerTaggerV2.depth
+    monkeypatch.setattr(GazetteerTaggerV2, 'depth', lambda self, state: relinked.append(state) or depth(self, state))
+
+    entity, category, domain, _ = next(entry for entry in entries if len(entry[0].split()) == 4)
+    delta = {'entities': {
+        'added': [['renewable_energy', 'TECHNOLOGY_TYPE', 'Tidal Lagoon Array', 'Tidal Lagoon Array']],
+        'removed': [[domain, category, entity]],
+        'changed': []
+    }}
+    updated = tagger.with_delta(delta)
+    # The three new states plus the few states ending with the removed entity, out of ~50k
+    assert 3 <= len(relinked) < len(tagger.goto) // 100
+    assert entity not in [span.entity for span in updated.tag(entity)]
+    assert entity in [span.entity for span in tagger.tag(entity)]
+    assert [span.entity for span in updated.tag('a tidal lagoon array')] == ['Tidal Lagoon Array']
@@ -0,0 +1,88 @@
+"""
+Streaming tagging: chunk boundaries, token-free input, oversized tokens and the carry cap
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'runtime'))
+
+import v2_gazetteer_tagger
+from v2_gazetteer_tagger import GazetteerTaggerV2
+
+ENTRIES = [
+    ('Solar Panel', 'EQUIPMENT_COMPONENT', 'renewable_energy'),
+    ('Solar', 'TECHNOLOGY_TYPE', 'renewable_energy'),
+    ('Solar Panel Inverter System', 'EQUIPMENT_COMPONENT', 'renewable_energy'),
+    ('Wind Turbine', 'TECHNOLOGY_TYPE', 'renewable_energy'),
+    ('Electric Vehicle', 'TRANSPORT_MODE', 'green_logistics'),
+    ('Ev', 'TRANSPORT_MODE', 'green_logistics', 'Electric Vehicle'),
+    ('Iso 14001', 'ENVIRONMENTAL_STANDARD', 'green_logistics'),
+    ('Naïve Bayes Forecasting', 'EFFICIENCY_TECHNOLOGY', 'green_logistics'),
+]
+FILLER = ['the', 'of', 'report', 'annual', 'Ünïcödé', 'İstanbul', '日本語', '—', '.', ',', '\n\n']
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def document(seed, words=4000):
+    rng = random.Random(seed)
+    phrases = ['solar panel', 'Solar Panel Inverter System', 'wind  turbine', 'EV', 'iso 14001', 'solar',
+               'naïve bayes forecasting', 'electric\nvehicle', 'solar panel inverter']
+    return ' '.join(rng.choice(phrases) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(words))
+
+@pytest.fixture(scope='module')
+def tagger():
+    return GazetteerTaggerV2.from_entities(ENTRIES)
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 1000, 1 << 20])
+def test_chunk_boundaries_match_whole_text(tagger, size):
+    text = document(size)
+    expected = tagger.tag(text)
+    assert expected
+    assert list(tagger.tag_stream(chunked(text.encode('utf-8'), size))) == expected
+    assert list(tagger.tag_stream(chunked(text, size))) == expected
+
+def test_segments_cover_the_document(tagger):
+    text = document(1)
+    pieces = list(tagger.iter_segments(chunked(text.encode('utf-8'), 100)))
+    assert ''.join(segment for _, segment, _ in pieces) == text
+    assert [offset for offset, _, _ in pieces] == [sum(len(s) for _, s, _ in pieces[:i]) for i in range(len(pieces))]
+
+def test_token_free_input_is_not_held(tagger):
+    chunk = b'. \n' * (1 << 18)
+    segments = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _, segment, _ in tagger.iter_segments(chunk for _ in range(32)):
+        segments += 1
+        assert len(segment) <= len(chunk)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert segments >= 32
+    assert peak < 8 * len(chunk)
+    assert seconds < 10
+
+def test_oversized_token_is_cut(tagger):
+    blob = 'Qm9i' * (1 << 16)
+    text = 'solar panel ' + blob + ' wind turbine solar'
+    pieces = list(tagger.iter_segments(chunked(text.encode('ascii'), 1000)))
+    assert max(len(segment) for _, segment, _ in pieces) <= 1000 + 2 * tagger.max_token_length + 2
+    assert list(tagger.tag_stream(chunked(text.encode('ascii'), 1000))) == tagger.tag(text)
+    # A piece of the blob spelling a vocabulary token must not match
+    assert list(tagger.tag_stream(chunked('x' * 5000 + 'solar' + 'y' * 5000, 4999))) == []
+
+def test_vocabulary_run_beyond_carry_cap(tagger, monkeypatch):
+    monkeypatch.setattr(v2_gazetteer_tagger, 'MAX_STREAM_CARRY', 500)
+    text = ' '.join(['solar panel inverter system', 'solar', 'panel'] * 2000) + ' the end'
+    expected = tagger.tag(text)
+    pieces = list(tagger.iter_segments(chunked(text, 300)))
+    assert len(pieces) > 10
+    assert max(len(segment) for _, segment, _ in pieces) < 1000
+    assert list(tagger.tag_stream(chunked(text.encode('utf-8'), 300))) == expected
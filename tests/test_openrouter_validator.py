@@ -0,0 +1,108 @@
+"""
+LLM validation against the mock endpoint: rate limiting, retries, the response cache and malformed or partial replies
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'validation'))
+
+from v2_openrouter_validator import MockLLMServerV2, OpenRouterValidatorV2, ResponseCacheV2, run_with_mock
+
+ENTITIES = {
+    'TECHNOLOGY_TYPE': ['Solar Photovoltaic', 'Wind Turbine', 'Geothermal Energy', 'Tidal Power', 'Biomass'],
+    'TRANSPORT_MODE': ['Electric Vehicle', 'Rail Freight', 'Cargo Bike', 'Hydrogen Truck'],
+}
+MAPPINGS = [
+    {'renewable_energy_entity': 'Solar Photovoltaic', 'renewable_energy_category': 'TECHNOLOGY_TYPE',
+     'green_logistics_entity': 'Electric Vehicle', 'green_logistics_category': 'TRANSPORT_MODE',
+     'relationship_type': 'energy_supply'},
+]
+
+class EmptyReplyServer(MockLLMServerV2):
+    """Answers 200 with a body that has no choices"""
+
+    def reply(self, request):
+        return {'error': {'message': 'upstream provider returned nothing'}}
+
+def validator(tmp_path, **options):
+    return OpenRouterValidatorV2(api_key='test', batch_size=2, backoff=0.01,
+                                 cache=ResponseCacheV2(str(tmp_path / 'cache')), **options)
+
+def test_rate_limited_run_retries_then_hits_cache(tmp_path):
+    first = validator(tmp_path, concurrency=4)
+    mock = MockLLMServerV2(rate_limit=2, latency=0.0)
+    results = asyncio.run(run_with_mock(first, mock, ENTITIES, MAPPINGS))
+
+    stats = results['run_stats']
+    assert mock.stats['rate_limited'] > 0
+    assert stats['retries'] >= mock.stats['rate_limited']
+    assert stats['failed_prompts'] == 0 and stats['cache_hits'] == 0
+    assert results['llm_summary']['entities_judged'] == sum(len(v) for v in ENTITIES.values())
+    assert results['llm_summary']['mappings_judged'] == len(MAPPINGS)
+    for category, entities in ENTITIES.items():
+        assert [record['entity'] for record in results['entity_validation'][category]] == entities
+
+    second = validator(tmp_path)
+    cached_mock = MockLLMServerV2(latency=0.0)
+    cached = asyncio.run(run_with_mock(second, cached_mock, ENTITIES, MAPPINGS))
+    assert cached_mock.stats['requests'] == 0
+    assert cached['run_stats']['cache_hits'] == cached['run_stats']['prompts'] == stats['prompts']
+    assert cached['entity_validation'] == results['entity_validation']
+    assert cached['mapping_validation'] == results['mapping_validation']
+
+def test_malformed_reply_fails_only_its_prompt(tmp_path):
+    llm = validator(tmp_path)
+    results = asyncio.run(run_with_mock(llm, EmptyReplyServer(latency=0.0), ENTITIES, MAPPINGS))
+    stats = results['run_stats']
+    assert stats['unparsed_replies'] == stats['failed_prompts'] == stats['prompts']
+    assert all(record['valid'] is None for records in results['entity_validation'].values() for record in records)
+    # Failed prompts are not cached, so a later run asks again
+    assert not os.path.exists(tmp_path / 'cache')
+
+def test_client_errors_are_counted(tmp_path):
+    class RejectingServer(MockLLMServerV2):
+        def reply(self, request):
+            raise KeyError('messages')
+
+    llm = validator(tmp_path)
+    results = asyncio.run(run_with_mock(llm, RejectingServer(latency=0.0), ENTITIES, []))
+    assert results['run_stats']['http_errors'] == results['run_stats']['prompts']
+    assert results['run_stats']['retries'] == 0
+
+def test_replies_without_all_verdicts_are_not_cached(tmp_path):
+    class PartialReplyServer(MockLLMServerV2):
+        """Drops the verdict of item 0 and answers an empty array for single-item prompts"""
+
+        def reply(self, request):
+            body = super().reply(request)
+            content = body['choices'][0]['message']['content']
+            verdicts = json.loads(content.strip('`').removeprefix('json'))
+            body['choices'][0]['message']['content'] = json.dumps(verdicts[1:])
+            return body
+
+    entities = {'TECHNOLOGY_TYPE': ENTITIES['TECHNOLOGY_TYPE'][:3]}    # prompts of 2 and 1 items
+    results = asyncio.run(run_with_mock(validator(tmp_path), PartialReplyServer(latency=0.0), entities, []))
+    stats = results['run_stats']
+    assert stats['incomplete_replies'] == 1 and stats['unparsed_replies'] == 1 and stats['failed_prompts'] == 1
+    assert [record['valid'] is None for record in results['entity_validation']['TECHNOLOGY_TYPE']] == \
+        [True, False, True]
+
+    # Nothing was cached, so the full server is asked again and its complete replies are
+    rerun = asyncio.run(run_with_mock(validator(tmp_path), MockLLMServerV2(latency=0.0), entities, []))
+    assert rerun['run_stats']['cache_hits'] == 0 and rerun['mock_stats']['requests'] == 2
+    cached = asyncio.run(run_with_mock(validator(tmp_path), MockLLMServerV2(latency=0.0), entities, []))
+    assert cached['run_stats']['cache_hits'] == 2 and cached['mock_stats']['requests'] == 0
+
+def test_retry_after_is_capped(tmp_path):
+    # Uncapped, the first 429 would sleep for an hour
+    llm = validator(tmp_path, concurrency=4, max_retries=100, max_retry_delay=0.05)
+    mock = MockLLMServerV2(rate_limit=3, latency=0.0, retry_after='3600')
+    start = time.perf_counter()
+    results = asyncio.run(run_with_mock(llm, mock, ENTITIES, []))
+    assert mock.stats['rate_limited'] > 0
+    assert results['run_stats']['failed_prompts'] == 0
+    assert time.perf_counter() - start < 30